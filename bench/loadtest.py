@@ -0,0 +1,458 @@
+"""
+Webhook yo'lining yuklama testi (end-to-end).
+
+Sintetik Telegram update larini berilgan tezlikda botning aiohttp ilovasiga POST qiladi,
+botning Bot API so'rovlariga esa lokal stub server javob beradi.
+Natija: o'tkazuvchanlik, webhook javobi va bot javobi uchun p50/p95/p99, xatolar ulushi.
+
+Misollar (repo ildizidan):
+    # main.py alohida jarayonda, lokal mongod bilan
+    python -m bench.loadtest --rate 200 --duration 30 --mongo-url mongodb://localhost:27017
+    # bitta jarayonda, mongomock_motor bilan (mongod kerak emas)
+    python -m bench.loadtest --inprocess --mongomock
+    # update larni yozib olish va boshqa commit'da xuddi shularni qayta yuborish
+    python -m bench.loadtest --record updates.jsonl --json-out before.json
+    python -m bench.loadtest --replay updates.jsonl --json-out after.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import signal
+import string
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from itertools import accumulate
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector, web
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BOT_TOKEN = "123456:LOADTEST"
+ADMIN_ID = 1
+# Foydalanuvchi update lari uchun chat id lari shu sondan boshlanadi (har bir hodisa — alohida chat)
+USER_CHAT_BASE = 10_000_000
+# Bot javobini kutish chegarasi (soniya)
+REPLY_TIMEOUT = 10.0
+
+# Hodisalar aralashmasi (ulushlar): mashhur raqamli kodlar, matnli triggerlar,
+# xatoli yozilgan matnlar, topilmaydigan xabarlar va admin menyusi oqimlari
+DEFAULT_MIX = {"hot": 0.6, "text": 0.15, "fuzzy": 0.05, "miss": 0.15, "admin": 0.05}
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    # nearest-rank usuli
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+def random_word(rng: random.Random, low: int = 4, high: int = 9) -> str:
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(low, high)))
+
+# --- STUB BOT API ---
+
+class StubBotAPI:
+    """
+    Bot API o'rnini bosuvchi lokal server: har qanday metodga muvaffaqiyatli javob qaytaradi
+    va chat bo'yicha kutilayotgan bot javoblarini belgilaydi.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls: Counter = Counter()
+        # chat_id -> bot javobini kutayotgan future
+        self.pending: Dict[int, asyncio.Future] = {}
+        self._message_id = 0
+
+    def expect_reply(self, chat_id: int) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self.pending[chat_id] = future
+        return future
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        return app
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls[method] += 1
+        if request.content_type == "application/json":
+            params = await request.json()
+        else:
+            params = dict(await request.post())
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        chat_id = params.get("chat_id")
+        if chat_id is not None:
+            future = self.pending.pop(int(chat_id), None)
+            if future is not None and not future.done():
+                future.set_result(time.perf_counter())
+        return web.json_response({"ok": True, "result": self._result(method.lower(), chat_id)})
+
+    def _result(self, method: str, chat_id: Any) -> Any:
+        if method == "getme":
+            return {"id": 42, "is_bot": True, "first_name": "LoadTest", "username": "loadtest_bot"}
+        if method == "getwebhookinfo":
+            return {"url": "", "has_custom_certificate": False, "pending_update_count": 0}
+        if method == "getfile":
+            return {"file_id": "stub", "file_unique_id": "stub", "file_path": "stub"}
+        if chat_id is not None and method.startswith(("send", "edit", "copy", "forward")):
+            self._message_id += 1
+            return {
+                "message_id": self._message_id,
+                "date": int(time.time()),
+                "chat": {"id": int(chat_id), "type": "private"},
+                "text": "ok",
+            }
+        return True
+
+# --- SINTETIK UPDATE LAR ---
+
+class UpdateFactory:
+    """Hodisa turiga qarab Telegram update lari (admin oqimi bir nechta update dan iborat)."""
+
+    def __init__(self, rng: random.Random, numeric: int, text_triggers: List[str], categories: List[str]):
+        self.rng = rng
+        self.numeric = numeric
+        self.text_triggers = text_triggers
+        self.categories = categories
+        self.update_id = 0
+        # Zipf taqsimoti: kichik kodlar ko'proq so'raladi
+        self._codes = range(1, numeric + 1)
+        self._cum_weights = list(accumulate(1 / rank for rank in self._codes))
+
+    def _next_id(self) -> int:
+        self.update_id += 1
+        return self.update_id
+
+    def message(self, chat_id: int, text: str) -> Dict[str, Any]:
+        update_id = self._next_id()
+        return {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": chat_id, "is_bot": False, "first_name": "Load"},
+                "text": text,
+            },
+        }
+
+    def callback(self, chat_id: int, data: str) -> Dict[str, Any]:
+        update_id = self._next_id()
+        user = {"id": chat_id, "is_bot": False, "first_name": "Admin"}
+        return {
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id),
+                "from": user,
+                "chat_instance": "loadtest",
+                "data": data,
+                "message": {
+                    "message_id": update_id,
+                    "date": int(time.time()),
+                    "chat": {"id": chat_id, "type": "private"},
+                    "from": {"id": 42, "is_bot": True, "first_name": "LoadTest"},
+                    "text": "menu",
+                },
+            },
+        }
+
+    def event(self, kind: str, index: int) -> Dict[str, Any]:
+        chat_id = USER_CHAT_BASE + index
+        if kind == "hot":
+            code = self.rng.choices(self._codes, cum_weights=self._cum_weights)[0]
+            updates = [self.message(chat_id, str(code))]
+        elif kind == "text":
+            updates = [self.message(chat_id, self.rng.choice(self.text_triggers))]
+        elif kind == "fuzzy":
+            word = self.rng.choice(self.text_triggers)
+            position = self.rng.randrange(len(word))
+            updates = [self.message(chat_id, word[:position] + "x" + word[position + 1:] + "!")]
+        elif kind == "miss":
+            updates = [self.message(chat_id, random_word(self.rng, 10, 14))]
+        else:
+            # Admin: /start -> bo'limlar -> bitta bo'lim ro'yxati (javob kuzatilmaydi)
+            chat_id = ADMIN_ID
+            category = self.rng.choice(self.categories) if self.categories else "1-25"
+            updates = [
+                self.message(chat_id, "/start"),
+                self.callback(chat_id, "admin_cats"),
+                self.callback(chat_id, f"cat:{category}"),
+            ]
+        return {"kind": kind, "chat_id": chat_id, "updates": updates}
+
+def generate_events(factory: UpdateFactory, rate: float, duration: float, mix: Dict[str, float]) -> Iterator[Dict[str, Any]]:
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    total = int(rate * duration)
+    for index in range(total):
+        kind = factory.rng.choices(kinds, weights=weights)[0]
+        event = factory.event(kind, index)
+        event["t"] = index / rate
+        yield event
+
+def load_replay(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as stream:
+        return [json.loads(line) for line in stream if line.strip()]
+
+# --- YUKLAMA ---
+
+class Results:
+    def __init__(self):
+        self.ack: Dict[str, List[float]] = defaultdict(list)
+        self.reply: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+        self.events = 0
+        self.requests = 0
+        self.elapsed = 0.0
+
+    def report(self, stub: StubBotAPI) -> Dict[str, Any]:
+        def summary(values: List[float]) -> Dict[str, Any]:
+            return {
+                "count": len(values),
+                "p50_ms": _ms(percentile(values, 50)),
+                "p95_ms": _ms(percentile(values, 95)),
+                "p99_ms": _ms(percentile(values, 99)),
+            }
+
+        all_ack = [value for values in self.ack.values() for value in values]
+        all_reply = [value for values in self.reply.values() for value in values]
+        failed = sum(self.errors.values())
+        return {
+            "events": self.events,
+            "requests": self.requests,
+            "elapsed_s": round(self.elapsed, 3),
+            "throughput_rps": round(self.requests / self.elapsed, 1) if self.elapsed else 0.0,
+            "error_rate": round(failed / self.requests, 4) if self.requests else 0.0,
+            "errors": dict(self.errors),
+            "ack": summary(all_ack),
+            "reply": summary(all_reply),
+            "by_kind": {
+                kind: {"ack": summary(self.ack[kind]), "reply": summary(self.reply.get(kind, []))}
+                for kind in sorted(self.ack)
+            },
+            "bot_api_calls": dict(stub.calls),
+        }
+
+def _ms(value: Optional[float]) -> Optional[float]:
+    return round(value * 1000, 2) if value is not None else None
+
+async def send_event(http: ClientSession, url: str, stub: StubBotAPI, event: Dict[str, Any], results: Results):
+    kind = event["kind"]
+    track_reply = kind != "admin"
+    for update in event["updates"]:
+        reply = stub.expect_reply(event["chat_id"]) if track_reply else None
+        started = time.perf_counter()
+        results.requests += 1
+        try:
+            async with http.post(url, json=update) as response:
+                await response.read()
+                status = response.status
+        except Exception as e:
+            results.errors[type(e).__name__] += 1
+            stub.pending.pop(event["chat_id"], None)
+            return
+        results.ack[kind].append(time.perf_counter() - started)
+        if status != 200:
+            results.errors[f"http_{status}"] += 1
+            stub.pending.pop(event["chat_id"], None)
+            return
+        if reply is not None:
+            try:
+                replied_at = await asyncio.wait_for(reply, REPLY_TIMEOUT)
+            except asyncio.TimeoutError:
+                results.errors["reply_timeout"] += 1
+                stub.pending.pop(event["chat_id"], None)
+                return
+            results.reply[kind].append(replied_at - started)
+
+async def run_load(url: str, stub: StubBotAPI, events: List[Dict[str, Any]], concurrency: int) -> Results:
+    """Ochiq tsikl: har bir hodisa o'z vaqtida yuboriladi, oldingisining javobini kutmasdan."""
+    results = Results()
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = []
+
+    async def guarded(event: Dict[str, Any]):
+        async with semaphore:
+            await send_event(http, url, stub, event, results)
+
+    connector = TCPConnector(limit=concurrency)
+    async with ClientSession(connector=connector, timeout=ClientTimeout(total=30)) as http:
+        started = time.perf_counter()
+        for event in events:
+            delay = started + event["t"] - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            results.events += 1
+            tasks.append(asyncio.create_task(guarded(event)))
+        await asyncio.gather(*tasks)
+        results.elapsed = time.perf_counter() - started
+    return results
+
+# --- BOT ILOVASI VA MA'LUMOTLAR ---
+
+def bot_environment(args: argparse.Namespace, stub_url: str) -> Dict[str, str]:
+    """Bot CONFIG i uchun muhit: stub Bot API, test bazasi va yuborish limitlari o'chirilgan."""
+    env = {
+        "BOT_TOKEN": BOT_TOKEN,
+        "ADMIN_IDS": str(ADMIN_ID),
+        "RAILWAY_PUBLIC_DOMAIN": "loadtest.invalid",
+        "PORT": str(args.port),
+        "WEB_SERVER_HOST": "127.0.0.1",
+        "MONGO_URL": args.mongo_url,
+        "MONGO_DATABASE": args.mongo_db,
+        "TELEGRAM_API_URL": stub_url,
+        "WEBHOOK_MODE": args.webhook_mode,
+    }
+    if not args.real_limits:
+        # Aks holda o'lchov Bot API rate limitini o'lchab qo'yadi
+        env.update({"SEND_GLOBAL_RATE": "1000000", "SEND_CHAT_RATE": "1000000", "SEND_CHAT_BURST": "1000000"})
+        # Sintetik foydalanuvchilar ko'p xabar yuboradi: foydalanuvchi limiti ham o'chiriladi
+        env["THROTTLE_RATE"] = "0"
+    return env
+
+async def seed_triggers(service, rng: random.Random, numeric: int, text_count: int) -> Tuple[List[str], List[str]]:
+    """
+    Test bazasiga raqamli va matnli triggerlarni yozish (upsert, qayta ishga tushirish xavfsiz).
+    (matnli triggerlar, bo'limlar) qaytaradi.
+    """
+    from db.models import ContentType, Trigger, TriggerType
+    from utils.category_calc import get_category_name
+
+    text_triggers = sorted({random_word(rng) for _ in range(text_count)})
+    triggers = [
+        Trigger(trigger=str(code), trigger_type=TriggerType.NUMERIC, content_type=ContentType.TEXT,
+                file_id=f"Javob {code}", category=get_category_name(code))
+        for code in range(1, numeric + 1)
+    ]
+    triggers += [
+        Trigger(trigger=word, trigger_type=TriggerType.TEXT, content_type=ContentType.TEXT, file_id=f"Javob {word}")
+        for word in text_triggers
+    ]
+    await service.create_indexes()
+    for start in range(0, len(triggers), 1000):
+        await service.bulk_upsert_triggers(triggers[start:start + 1000])
+    categories = sorted({trigger.category for trigger in triggers if trigger.category})
+    return text_triggers, categories
+
+def use_mongomock():
+    """Motor o'rniga mongomock_motor (faqat --inprocess rejimida)."""
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        sys.exit("--mongomock uchun: pip install mongomock-motor")
+    import db.mongo
+    db.mongo.AsyncIOMotorClient = AsyncMongoMockClient
+
+async def wait_for_port(url: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    async with ClientSession() as http:
+        while time.monotonic() < deadline:
+            try:
+                async with http.get(url) as response:
+                    if response.status < 500:
+                        return
+            except OSError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Bot {timeout} soniyada ishga tushmadi: {url}")
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    stub = StubBotAPI(latency=args.api_latency)
+    stub_runner = web.AppRunner(stub.app())
+    await stub_runner.setup()
+    await web.TCPSite(stub_runner, "127.0.0.1", args.api_port).start()
+    stub_url = f"http://127.0.0.1:{args.api_port}"
+
+    env = bot_environment(args, stub_url)
+    os.environ.update(env)
+    if args.mongomock:
+        use_mongomock()
+
+    # Replay ham bir xil seed bilan bir xil ma'lumotlar ustida ishlaydi
+    sys.path.insert(0, ROOT)
+    from db.mongo import MongoService
+    # --inprocess rejimida bot ham shu servisdan foydalanadi (mongomock ma'lumotlari bitta klientda)
+    service = MongoService()
+    rng = random.Random(args.seed)
+    text_triggers, categories = await seed_triggers(service, rng, args.numeric, args.text)
+    if args.replay:
+        events = load_replay(args.replay)
+    else:
+        factory = UpdateFactory(rng, args.numeric, text_triggers, categories)
+        events = list(generate_events(factory, args.rate, args.duration, DEFAULT_MIX))
+    if args.record:
+        with open(args.record, "w", encoding="utf-8") as stream:
+            for event in events:
+                stream.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+    process = None
+    app_runner = None
+    if args.inprocess:
+        import main as bot_main
+        from config import Settings
+        app_runner = web.AppRunner(bot_main.create_app(Settings(), db=service))
+        await app_runner.setup()
+        await web.TCPSite(app_runner, "127.0.0.1", args.port).start()
+    else:
+        process = subprocess.Popen([sys.executable, "main.py"], cwd=ROOT, env={**os.environ, **env})
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        await wait_for_port(base_url + "/metrics")
+        results = await run_load(base_url + "/webhook", stub, events, args.concurrency)
+    finally:
+        if app_runner is not None:
+            await app_runner.cleanup()
+        if process is not None:
+            process.send_signal(signal.SIGTERM)
+            process.wait(timeout=30)
+        await stub_runner.cleanup()
+        service.close()
+    return results.report(stub)
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Webhook yo'li uchun yuklama testi")
+    parser.add_argument("--rate", type=float, default=100.0, help="soniyasiga hodisalar")
+    parser.add_argument("--duration", type=float, default=20.0, help="test davomiyligi (soniya)")
+    parser.add_argument("--concurrency", type=int, default=256, help="bir vaqtdagi so'rovlar chegarasi")
+    parser.add_argument("--numeric", type=int, default=2000, help="raqamli triggerlar soni")
+    parser.add_argument("--text", type=int, default=2000, help="matnli triggerlar soni")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--port", type=int, default=18080, help="bot webhook porti")
+    parser.add_argument("--api-port", type=int, default=18081, help="stub Bot API porti")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="stub Bot API javob kechikishi (soniya)")
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017")
+    parser.add_argument("--mongo-db", default="auto_reply_bot_loadtest")
+    parser.add_argument("--mongomock", action="store_true", help="mongod o'rniga mongomock_motor (--inprocess bilan)")
+    parser.add_argument("--inprocess", action="store_true", help="botni shu jarayonda ishga tushirish")
+    parser.add_argument("--webhook-mode", choices=["simple", "queue"], default="simple")
+    parser.add_argument("--real-limits", action="store_true", help="SEND_* rate limitlarini o'chirmaslik")
+    parser.add_argument("--record", help="yuborilgan update larni JSONL ga yozish")
+    parser.add_argument("--replay", help="yozib olingan JSONL update larni qayta yuborish")
+    parser.add_argument("--json-out", help="natijani JSON faylga yozish (commit'larni solishtirish uchun)")
+    args = parser.parse_args(argv)
+    if args.mongomock and not args.inprocess:
+        parser.error("--mongomock faqat --inprocess bilan ishlaydi")
+    return args
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    report = asyncio.run(main_async(args))
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    print(text)
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as stream:
+            stream.write(text + "\n")
+
+if __name__ == "__main__":
+    main()
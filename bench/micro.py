@@ -0,0 +1,264 @@
+"""
+Issiq nuqtalar uchun mikro-benchmarklar (pyperf uslubida, qo'shimcha paketsiz).
+
+Har bir benchmark bir necha marta takrorlanadi, natija — bitta chaqiruv vaqtining medianasi.
+Natijalar JSON baseline bilan solishtiriladi va chegaradan sekinlashganlar regressiya deb belgilanadi.
+
+Misollar (repo ildizidan):
+    python -m bench.micro --save                 # bench/baseline.json ni yangilash
+    python -m bench.micro --compare              # baseline bilan solishtirish (regressiya bo'lsa exit code 1)
+    python -m bench.micro --sizes 1000,10000 --mongomock --filter mongo
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import string
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(ROOT, "bench", "baseline.json")
+# Median shuncha foizdan ko'p sekinlashsa — regressiya
+DEFAULT_THRESHOLD = 10.0
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+REPEATS = 7
+# Bitta takrorlash kamida shuncha davom etishi uchun sikl soni tanlanadi (soniya)
+MIN_REPEAT_TIME = 0.1
+
+# Benchmark importlari uchun CONFIG talab qiladigan qiymatlar (haqiqiy .env bo'lmasa)
+BENCH_ENV = {
+    "BOT_TOKEN": "123456:BENCH",
+    "ADMIN_IDS": "1",
+    "RAILWAY_PUBLIC_DOMAIN": "bench.invalid",
+    "MONGO_URL": "mongodb://localhost:27017",
+}
+
+def _words(rng: random.Random, count: int) -> List[str]:
+    return ["".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 10))) for _ in range(count)]
+
+# --- O'LCHASH ---
+
+def _calibrate(run_loops: Callable[[int], float]) -> int:
+    loops = 1
+    while True:
+        if run_loops(loops) >= MIN_REPEAT_TIME or loops >= 1 << 20:
+            return loops
+        loops *= 2
+
+def measure(func: Callable[[], Any]) -> Dict[str, Any]:
+    """Sinxron funksiya: bitta chaqiruv vaqti (soniya) bo'yicha statistika."""
+    def run_loops(loops: int) -> float:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        return time.perf_counter() - started
+
+    loops = _calibrate(run_loops)
+    samples = [run_loops(loops) / loops for _ in range(REPEATS)]
+    return _stats(samples, loops)
+
+async def measure_async(func: Callable[[], Awaitable[Any]]) -> Dict[str, Any]:
+    """Asinxron funksiya: ketma-ket await qilingan chaqiruvlar (DB so'rovlari kabi)."""
+    async def run_loops(loops: int) -> float:
+        started = time.perf_counter()
+        for _ in range(loops):
+            await func()
+        return time.perf_counter() - started
+
+    loops = 1
+    while await run_loops(loops) < MIN_REPEAT_TIME and loops < 1 << 16:
+        loops *= 2
+    samples = [await run_loops(loops) / loops for _ in range(REPEATS)]
+    return _stats(samples, loops)
+
+def _stats(samples: List[float], loops: int) -> Dict[str, Any]:
+    return {
+        "median_us": round(statistics.median(samples) * 1e6, 3),
+        "min_us": round(min(samples) * 1e6, 3),
+        "stdev_us": round(statistics.stdev(samples) * 1e6, 3) if len(samples) > 1 else 0.0,
+        "loops": loops,
+    }
+
+# --- BENCHMARKLAR ---
+
+def bench_cpu(rng: random.Random) -> Dict[str, Callable[[], Any]]:
+    """DB siz benchmarklar: validatsiya, normallashtirish, klaviaturalar, bo'limlar."""
+    from db.models import SCHEMA_VERSION, Trigger, TriggerPage, TriggerRecord
+    from keyboards.admin_main import get_categories_keyboard
+    from keyboards.trigger_list import get_trigger_list_keyboard
+    from utils.category_calc import get_all_categories, get_category_name
+    from utils.normalize import normalize_trigger
+    from utils.text_index import TextMatcher
+    from bson import ObjectId
+
+    document = {
+        "trigger": "1234", "trigger_type": "numeric", "content_type": "video",
+        "file_id": "BAACAgIAAxkBAAIBQ2Zb" * 3, "category": "1226-1250",
+    }
+    versioned = {**document, "schema_version": SCHEMA_VERSION}
+    counts = {get_category_name(code): 25 for code in range(1, 100_001, 25)}
+    pages = {
+        size: TriggerPage([str(code) for code in range(1, size + 1)], [ObjectId() for _ in range(size)], True, True)
+        for size in (25, 100)
+    }
+    words = _words(rng, 100_000)
+    matcher = TextMatcher()
+    matcher.replace_all({"_id": index, "trigger": word} for index, word in enumerate(words))
+    typo = words[0][:-1] + "x"
+
+    return {
+        "model_validate": lambda: Trigger.model_validate(document),
+        "TriggerRecord.decode": lambda: TriggerRecord.decode(versioned),
+        "normalize_trigger": lambda: normalize_trigger("№ 25-qism 🔥"),
+        "get_category_name": lambda: get_category_name(98_765),
+        "get_all_categories[4000]": lambda: get_all_categories(counts),
+        "get_categories_keyboard[4000]": lambda: get_categories_keyboard(get_all_categories(counts)),
+        "get_trigger_list_keyboard[25]": lambda: get_trigger_list_keyboard(pages[25], "1-25"),
+        "get_trigger_list_keyboard[100]": lambda: get_trigger_list_keyboard(pages[100], "1-100"),
+        "text_matcher.match[100k]": lambda: matcher.match(typo),
+    }
+
+async def seed_store(service, size: int):
+    """size ta raqamli trigger (idempotent: hajm mos bo'lsa qayta yozilmaydi)."""
+    from db.models import ContentType, Trigger, TriggerType
+    from utils.category_calc import get_category_name
+
+    await service.create_indexes()
+    if await service.collection.count_documents({}) == size:
+        return
+    await service.collection.delete_many({})
+    batch = []
+    for code in range(1, size + 1):
+        batch.append(Trigger(
+            trigger=str(code), trigger_type=TriggerType.NUMERIC, content_type=ContentType.TEXT,
+            file_id=f"Javob {code}", category=get_category_name(code),
+        ))
+        if len(batch) == 1000:
+            await service.bulk_upsert_triggers(batch)
+            batch = []
+    await service.bulk_upsert_triggers(batch)
+
+async def bench_mongo(rng: random.Random, sizes: List[int], db_prefix: str) -> Dict[str, Dict[str, Any]]:
+    """MongoService so'rovlari har bir kolleksiya hajmida."""
+    from config import CONFIG
+    from db.mongo import MongoService
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for size in sizes:
+        CONFIG.MONGO_DATABASE = f"{db_prefix}_{size}"
+        service = MongoService()
+        await seed_store(service, size)
+        codes = [str(rng.randint(1, size)) for _ in range(1024)]
+        position = 0
+
+        def next_code() -> str:
+            nonlocal position
+            position = (position + 1) % len(codes)
+            return codes[position]
+
+        def lookup_uncached():
+            # Foydalanuvchi xabarining keshga tushmagan yo'li: kalitlar + bitta $in so'rovi
+            service.cache.clear()
+            return service.lookup_trigger(next_code())
+
+        cases = {
+            f"lookup_trigger[{size}]": lookup_uncached,
+            f"lookup_trigger.cached[{size}]": lambda: service.lookup_trigger(codes[0]),
+            f"get_trigger_page[{size}]": lambda: service.get_trigger_page("1-25"),
+            f"get_trigger_page.after[{size}]": lambda: service.get_trigger_page("1-25", page_size=10, after="12"),
+        }
+        for name, func in cases.items():
+            results[name] = await measure_async(func)
+            _print_result(name, results[name])
+        service.client.close()
+    return results
+
+# --- BASELINE ---
+
+def compare(current: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], threshold: float) -> List[str]:
+    """Median threshold foizdan ko'p oshgan benchmarklar ro'yxati."""
+    regressions = []
+    for name, result in sorted(current.items()):
+        old = baseline.get(name)
+        if not old or not old.get("median_us"):
+            continue
+        change = (result["median_us"] / old["median_us"] - 1) * 100
+        mark = "REGRESSIYA" if change > threshold else ""
+        print(f"{name:45} {old['median_us']:>12.3f} -> {result['median_us']:>12.3f} us  {change:+7.1f}%  {mark}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+def _print_result(name: str, result: Dict[str, Any]):
+    print(f"{name:45} {result['median_us']:>12.3f} us  (±{result['stdev_us']:.3f}, {result['loops']} loops)")
+
+def _use_mongomock():
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        sys.exit("--mongomock uchun: pip install mongomock-motor")
+    import db.mongo
+    db.mongo.AsyncIOMotorClient = AsyncMongoMockClient
+
+async def run(args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    rng = random.Random(args.seed)
+    results: Dict[str, Dict[str, Any]] = {}
+    for name, func in bench_cpu(rng).items():
+        if args.filter and args.filter not in name:
+            continue
+        results[name] = measure(func)
+        _print_result(name, results[name])
+    if not args.no_mongo and (not args.filter or args.filter == "mongo"):
+        if args.mongomock:
+            _use_mongomock()
+        results.update(await bench_mongo(rng, args.sizes, args.mongo_db))
+    return results
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Trigger qidiruvi, validatsiya va klaviaturalar mikro-benchmarklari")
+    parser.add_argument("--sizes", type=lambda value: [int(size) for size in value.split(",")], default=list(DEFAULT_SIZES))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--filter", help="faqat nomida shu matn bor benchmarklar ('mongo' — faqat DB)")
+    parser.add_argument("--no-mongo", action="store_true", help="DB benchmarklarini o'tkazib yuborish")
+    parser.add_argument("--mongomock", action="store_true", help="mongod o'rniga mongomock_motor")
+    parser.add_argument("--mongo-db", default="auto_reply_bot_bench", help="hajm qo'shimchasi bilan baza nomi")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="natijalarni baseline sifatida saqlash")
+    parser.add_argument("--compare", action="store_true", help="baseline bilan solishtirish")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="regressiya chegarasi (foiz)")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    for key, value in BENCH_ENV.items():
+        os.environ.setdefault(key, value)
+    sys.path.insert(0, ROOT)
+
+    results = asyncio.run(run(args))
+
+    if args.compare:
+        with open(args.baseline, encoding="utf-8") as stream:
+            baseline = json.load(stream)
+        regressions = compare(results, baseline.get("results", {}), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} ta benchmark {args.threshold}% dan ko'p sekinlashdi: {', '.join(regressions)}")
+            sys.exit(1)
+    if args.save:
+        payload = {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "results": results,
+        }
+        with open(args.baseline, "w", encoding="utf-8") as stream:
+            json.dump(payload, stream, indent=2, ensure_ascii=False)
+            stream.write("\n")
+        print(f"Baseline saqlandi: {args.baseline}")
+
+if __name__ == "__main__":
+    main()
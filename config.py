@@ -1,5 +1,5 @@
-from typing import List
-from pydantic import Field, field_validator
+from typing import List, Literal, Optional
+from pydantic import Field, field_validator, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -17,18 +17,142 @@ class Settings(BaseSettings):
     BOT_TOKEN: str
     ADMIN_IDS: List[int]
 
+    # Bot API manzili (lokal telegram-bot-api server yoki yuklama testidagi stub uchun), bo'sh bo'lsa api.telegram.org
+    TELEGRAM_API_URL: Optional[str] = None
+
     # --- Webhook Settings (RAILWAY_PUBLIC_DOMAIN dan foydalanish) ---
     # WEBHOOK_HOST uchun Railway'ning avtomatik domenini ishlatamiz
     WEBHOOK_HOST: str = Field(..., alias="RAILWAY_PUBLIC_DOMAIN") 
     WEBHOOK_PATH: str = "/webhook"
     WEB_SERVER_HOST: str = "0.0.0.0"
     WEB_SERVER_PORT: int = Field(default=8080, alias="PORT")
+    # 1 dan katta bo'lsa, supervisor shuncha worker jarayonini fork qiladi (bitta umumiy port)
+    WEB_WORKERS: int = 1
+    # simple — aiogram SimpleRequestHandler; queue — update lar cheklangan navbat orqali fonda bajariladi
+    WEBHOOK_MODE: Literal["simple", "queue"] = "simple"
+    # queue rejimi: worker'lar soni, navbat hajmi va navbat to'lgandagi xatti-harakat
+    UPDATE_WORKERS: int = 16
+    UPDATE_QUEUE_SIZE: int = 10_000
+    UPDATE_OVERLOAD: Literal["reject", "shed"] = "reject"
+    # SIGTERM dan keyin ishlayotgan update larni tugatish uchun maksimal vaqt (soniya)
+    SHUTDOWN_TIMEOUT: float = 20.0
+    # Prometheus metrikalari manzili
+    METRICS_PATH: str = "/metrics"
+    # WEB_WORKERS > 1: har bir worker o'z hisoblagichlariga ega, shuning uchun metrikalar umumiy portda emas,
+    # METRICS_PORT + worker raqami portida (worker="N" label bilan) beriladi. Bo'sh bo'lsa, prefork rejimida metrikalar o'chiq
+    METRICS_PORT: Optional[int] = None
 
     # --- Database Settings (MONGO_URL ni to'g'ridan-to'g'ri MONGO_URL ga bog'lash) ---
     # Bu MONGO_URL ni qo'lda kiritish o'rniga, Railway'ning avtomatik MongoDB servisidan olishga urinadi.
     # Agar bu ishlamasa, u MONGO_PUBLIC_URL ni qidiradi.
     MONGO_URL: str = Field(..., alias="MONGO_URL") 
     MONGO_DATABASE: str = "auto_reply_bot_db"
+    # Ulanishlar puli (har bir jarayon uchun) va timeoutlar (millisekund)
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_MAX_IDLE_TIME_MS: Optional[int] = 300_000
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 5_000
+    MONGO_CONNECT_TIMEOUT_MS: int = 5_000
+    MONGO_SOCKET_TIMEOUT_MS: Optional[int] = None
+    # Tarmoq trafigini siqish, masalan "zstd,snappy" (bo'sh — siqilmaydi)
+    MONGO_COMPRESSORS: str = ""
+    # O'qishlar: foydalanuvchi javoblari va admin ro'yxatlari secondary'dan (replica set bo'lmasa primary ishlatiladi)
+    MONGO_USER_READ_PREFERENCE: Literal["primary", "primaryPreferred", "secondary", "secondaryPreferred", "nearest"] = "secondaryPreferred"
+    MONGO_USER_READ_CONCERN: Literal["local", "available", "majority"] = "local"
+    MONGO_ADMIN_READ_PREFERENCE: Literal["primary", "primaryPreferred", "secondary", "secondaryPreferred", "nearest"] = "secondaryPreferred"
+    MONGO_ADMIN_READ_CONCERN: Literal["local", "available", "majority"] = "local"
+    # Secondary primary'dan shuncha soniyadan ko'p orqada qolsa ishlatilmaydi (kamida 90, bo'sh — cheklovsiz)
+    MONGO_MAX_STALENESS_SECONDS: Optional[int] = None
+    # Trigger yozuvlari: write concern ("majority" yoki tugunlar soni), kutish chegarasi va journal
+    MONGO_WRITE_CONCERN: str = "majority"
+    MONGO_WRITE_TIMEOUT_MS: int = 5_000
+    MONGO_JOURNAL: bool = True
+
+    # --- Trigger Cache Settings ---
+    # Keshda saqlanadigan triggerlar soni (LRU bo'yicha eng eskisi chiqarib yuboriladi)
+    TRIGGER_CACHE_SIZE: int = 10_000
+    # Topilgan trigger keshda necha soniya yashaydi
+    TRIGGER_CACHE_TTL: float = 300.0
+    # Topilmagan kalitlar (miss) keshda necha soniya yashaydi
+    TRIGGER_CACHE_MISS_TTL: float = 30.0
+
+    # --- Trigger Preload Settings ---
+    # True bo'lsa, butun kolleksiya ishga tushishda xotiraga yuklanadi
+    TRIGGER_PRELOAD: bool = False
+    # Change stream bo'lmasa, updated_at bo'yicha o'zgarishlarni necha soniyada tekshirish
+    TRIGGER_INDEX_REFRESH: float = 30.0
+    # O'chirilgan triggerlarni aniqlash uchun to'liq qayta yuklash oralig'i (soniya)
+    TRIGGER_INDEX_FULL_RELOAD: float = 600.0
+
+    # --- Fuzzy Matching Settings ---
+    # Matnli triggerlar uchun xatoli/prefiks qidiruv (indeks xotirada quriladi)
+    TRIGGER_FUZZY: bool = True
+    # Aniq javob topilmaganda ko'rsatiladigan takliflar soni
+    TRIGGER_SUGGESTIONS: int = 5
+
+    # --- Category Settings ---
+    # Raqamli triggerlar bo'limi kengligi (25 -> '1-25', '26-50', ...)
+    CATEGORY_SIZE: int = 25
+    # Trigger ro'yxati sahifalari klaviaturalari keshi (LRU) va yozuv muddati (soniya)
+    KEYBOARD_CACHE_SIZE: int = 512
+    KEYBOARD_CACHE_TTL: float = 300.0
+
+    # --- Trigger Stats Settings ---
+    # Hit/miss hisoblagichlari xotirada yig'ilib, shuncha soniyada bir MongoDB ga yoziladi
+    TRIGGER_STATS_FLUSH_INTERVAL: float = 5.0
+    # Soatlik va kunlik rollup'lar necha kun saqlanadi
+    TRIGGER_STATS_HOURLY_DAYS: int = 14
+    TRIGGER_STATS_DAILY_DAYS: int = 400
+
+    # --- Users & Broadcast Settings ---
+    # Foydalanuvchilar ro'yxati xotirada yig'ilib, shuncha soniyada bir MongoDB ga yoziladi
+    USERS_FLUSH_INTERVAL: float = 5.0
+    # E'lon: bir vaqtda yuborilayotgan xabarlar (tezlikni SEND_GLOBAL_RATE cheklaydi)
+    BROADCAST_CONCURRENCY: int = 25
+    # Kursordan o'qiladigan qabul qiluvchilar to'plami hajmi
+    BROADCAST_BATCH_SIZE: int = 100
+    # Holat xabarini yangilash va progressni (checkpoint) saqlash oralig'i (soniya)
+    BROADCAST_PROGRESS_INTERVAL: float = 5.0
+    # Replika to'xtab qolsa, e'lonni boshqa replika shuncha soniyadan keyin davom ettiradi
+    BROADCAST_LEASE_SECONDS: float = 60.0
+
+    # --- Media Cache Settings ---
+    # Trigger media fayllarining lokal nusxalari saqlanadigan papka
+    MEDIA_CACHE_DIR: str = "media_cache"
+    # Bir vaqtda yuklab olinadigan fayllar soni
+    MEDIA_WORKERS: int = 4
+    # file_id lar yaroqliligini tekshirish oralig'i (soniya)
+    MEDIA_VERIFY_INTERVAL: float = 6 * 60 * 60
+    # Qayta yuklangan fayllar yuboriladigan chat (ko'rsatilmasa — birinchi admin)
+    MEDIA_STORAGE_CHAT_ID: Optional[int] = None
+
+    # --- Outgoing Send Queue Settings ---
+    # Telegram limitlari: umumiy ~30 xabar/s, bitta chatga ~1 xabar/s
+    SEND_GLOBAL_RATE: float = 30.0
+    SEND_CHAT_RATE: float = 1.0
+    # Bitta chatga ketma-ket darhol yuborilishi mumkin bo'lgan xabarlar soni
+    SEND_CHAT_BURST: float = 3.0
+    # Bir vaqtda bajariladigan so'rovlar soni
+    SEND_WORKERS: int = 8
+    # 429 (retry_after) dan keyin qayta urinishlar soni
+    SEND_MAX_RETRIES: int = 3
+
+    # --- FSM Storage Settings ---
+    # memory — bitta jarayon uchun; redis/mongo — bir nechta replika uchun
+    FSM_STORAGE: Literal["memory", "redis", "mongo"] = "memory"
+    REDIS_URL: Optional[str] = None
+    # Tashlab ketilgan wizard holatlari necha soniyadan keyin o'chadi
+    FSM_STATE_TTL: int = 24 * 60 * 60
+
+    # --- Throttling Settings ---
+    # Foydalanuvchi THROTTLE_WINDOW soniyada THROTTLE_RATE tadan ko'p update yubora olmaydi (0 — cheklovsiz)
+    THROTTLE_RATE: int = 20
+    THROTTLE_WINDOW: float = 10.0
+    # memory — bitta jarayon uchun; redis — replikalar orasida umumiy (REDIS_URL kerak)
+    THROTTLE_BACKEND: Literal["memory", "redis"] = "memory"
+    # Takroriy update_id lar shuncha soniya (va ko'pi bilan shuncha dona) eslab qolinadi
+    DEDUP_TTL: float = 300.0
+    DEDUP_MAX_SIZE: int = 100_000
 
     # --- Validators ---
     @field_validator("ADMIN_IDS", mode="before")
@@ -43,11 +167,44 @@ class Settings(BaseSettings):
                 raise ValueError("ADMIN_IDS butun sonlardan iborat bo'lishi kerak.")
         return []
 
+    @model_validator(mode="after")
+    def check_redis_url(self) -> "Settings":
+        if self.FSM_STORAGE == "redis" and not self.REDIS_URL:
+            raise ValueError("FSM_STORAGE=redis uchun REDIS_URL ko'rsatilishi kerak.")
+        if self.THROTTLE_BACKEND == "redis" and not self.REDIS_URL:
+            raise ValueError("THROTTLE_BACKEND=redis uchun REDIS_URL ko'rsatilishi kerak.")
+        return self
+
     @property
     def WEBHOOK_URL(self) -> str:
         # WEBHOOK_HOST dan 'https://'ni olib tashlash kerak emas, Railway uni o'zi to'g'ri beradi.
         host = self.WEBHOOK_HOST.rstrip('/')
         return f"https://{host}{self.WEBHOOK_PATH}" 
 
-# Sozlamalarni yuklaymiz va global obyekt yaratamiz
-CONFIG = Settings()
\ No newline at end of file
+class LazySettings:
+    """
+    Settings ning kechiktirilgan nusxasi: .env va muhit o'zgaruvchilari birinchi murojaatda o'qiladi.
+    Shu sababli modullarni (handlerlar, benchmarklar) sozlamalarsiz import qilish mumkin.
+    create_app(settings) o'z sozlamalarini configure() orqali o'rnatadi.
+    """
+
+    def __init__(self):
+        object.__setattr__(self, "_settings", None)
+
+    def configure(self, settings: Settings) -> Settings:
+        object.__setattr__(self, "_settings", settings)
+        return settings
+
+    def get(self) -> Settings:
+        if self._settings is None:
+            self.configure(Settings())
+        return self._settings
+
+    def __getattr__(self, name: str):
+        return getattr(self.get(), name)
+
+    def __setattr__(self, name: str, value):
+        setattr(self.get(), name, value)
+
+# Global obyekt: sozlamalar birinchi CONFIG.X murojaatida yuklanadi
+CONFIG = LazySettings()
\ No newline at end of file
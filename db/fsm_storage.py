@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from config import CONFIG
+from db.mongo import MongoService
+
+class MongoStorage(BaseStorage):
+    """
+    FSM holatlarini MongoDB da saqlash (bir nechta replika uchun).
+    Har bir hujjatda 'expires_at' maydoni bor, TTL indeks tashlab ketilgan wizardlarni o'chiradi.
+    """
+
+    def __init__(self, mongo: MongoService, collection_name: str, state_ttl: int):
+        self.mongo = mongo
+        self.collection_name = collection_name
+        self.state_ttl = state_ttl
+
+    @property
+    def collection(self) -> AsyncIOMotorCollection:
+        # Klient qayta yaratilishi mumkin (fork), shuning uchun har safar MongoService dan olamiz
+        return self.mongo.db[self.collection_name]
+
+    async def create_indexes(self):
+        """Muddati o'tgan holatlarni MongoDB o'zi o'chirishi uchun TTL indeks."""
+        await self.collection.create_index("expires_at", expireAfterSeconds=0, name="fsm_ttl_index")
+
+    @staticmethod
+    def _build_key(key: StorageKey) -> str:
+        parts = [
+            str(key.bot_id),
+            str(key.chat_id),
+            str(key.user_id),
+            str(getattr(key, "thread_id", None) or ""),
+            str(getattr(key, "business_connection_id", None) or ""),
+            key.destiny,
+        ]
+        return ":".join(parts)
+
+    async def _get_document(self, key: StorageKey) -> Optional[Dict[str, Any]]:
+        document = await self.collection.find_one({"_id": self._build_key(key)})
+        # TTL monitor hujjatlarni taxminan har 60 soniyada o'chiradi, shuning uchun o'zimiz ham tekshiramiz
+        if document and document.get("expires_at") and document["expires_at"] < datetime.utcnow():
+            return None
+        return document
+
+    async def _write(self, key: StorageKey, field: str, value: Any):
+        """state yoki data ni yozib, muddatni uzaytirish."""
+        doc_id = self._build_key(key)
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.state_ttl)
+        # Odatiy holat — hujjat tirik: bitta yozuv
+        result = await self.collection.update_one(
+            {"_id": doc_id, "expires_at": {"$gt": now}},
+            {"$set": {field: value, "expires_at": expires_at}},
+        )
+        if result.matched_count:
+            return
+        # Hujjat yo'q yoki muddati o'tgan (TTL hali o'chirmagan): tashlab ketilgan wizardning
+        # ikkinchi maydoni yangi muddat bilan qaytib kelmasligi uchun u ham tozalanadi
+        other, empty = ("data", {}) if field == "state" else ("state", None)
+        await self.collection.update_one(
+            {"_id": doc_id},
+            {"$set": {field: value, other: empty, "expires_at": expires_at}},
+            upsert=True,
+        )
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        value = state.state if isinstance(state, State) else state
+        await self._write(key, "state", value)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        document = await self._get_document(key)
+        return document.get("state") if document else None
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        await self._write(key, "data", data)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        document = await self._get_document(key)
+        return dict(document.get("data") or {}) if document else {}
+
+    async def close(self) -> None:
+        # Ulanish MongoService ga tegishli, uni bu yerda yopmaymiz
+        pass
+
+def create_fsm_storage(mongo: MongoService) -> BaseStorage:
+    """CONFIG.FSM_STORAGE bo'yicha FSM storage tanlash."""
+    if CONFIG.FSM_STORAGE == "redis":
+        # redis paketi faqat shu rejimda kerak
+        from aiogram.fsm.storage.redis import RedisStorage
+        return RedisStorage.from_url(
+            CONFIG.REDIS_URL,
+            state_ttl=CONFIG.FSM_STATE_TTL,
+            data_ttl=CONFIG.FSM_STATE_TTL,
+        )
+    if CONFIG.FSM_STORAGE == "mongo":
+        return MongoStorage(mongo, "fsm_states", state_ttl=CONFIG.FSM_STATE_TTL)
+    return MemoryStorage()
\ No newline at end of file
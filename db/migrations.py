@@ -0,0 +1,210 @@
+import asyncio
+import sys
+from datetime import datetime
+from typing import List
+
+from pydantic import ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from db.models import SCHEMA_VERSION, Trigger, normalized_key
+from db.mongo import DUPLICATE_KEY, MongoService
+
+MIGRATION_BATCH_SIZE = 1000
+# --dedupe: bir xil 'normalized' kalitli ortiqcha triggerlar shu kolleksiyaga ko'chiriladi (o'chirib yuborilmaydi)
+CONFLICTS_COLLECTION = "triggers_conflicts"
+# Ishga tushishda logga yoziladigan to'qnashuvlar chegarasi
+MAX_REPORTED_CONFLICTS = 20
+
+async def _bulk_write(service: MongoService, operations: List[UpdateOne]) -> int:
+    """
+    Partiyani yozib, o'zgargan hujjatlar sonini qaytarish.
+    Unique indeks bor bo'lsa, kaliti band bo'lib qolgan hujjatlar eski kalitda qoladi va sanab chiqiladi.
+    """
+    try:
+        result = await service.writes.bulk_write(operations, ordered=False)
+        return result.modified_count
+    except BulkWriteError as e:
+        conflicts = sum(1 for error in e.details.get("writeErrors", []) if error.get("code") == DUPLICATE_KEY)
+        if conflicts:
+            print(f"MongoDB: {conflicts} ta trigger kaliti boshqa trigger bilan bir xil, o'zgartirilmadi.")
+        if conflicts < len(e.details.get("writeErrors", [])):
+            raise
+        return e.details.get("nModified", 0)
+
+async def backfill_normalized(service: MongoService, batch_size: int = MIGRATION_BATCH_SIZE, recompute: bool = False) -> int:
+    """
+    Eski hujjatlarga 'normalized' maydonini partiyalab yozish.
+    recompute=True bo'lsa, barcha hujjatlar qayta hisoblanadi (normalize_trigger o'zgarganda).
+    Bir necha marta (yoki bir vaqtda bir nechta jarayonda) ishga tushirish xavfsiz.
+    Yangilangan hujjatlar sonini qaytaradi.
+    """
+    query = {} if recompute else {"normalized": {"$exists": False}}
+    operations: List[UpdateOne] = []
+    updated = 0
+
+    async def flush():
+        nonlocal updated
+        if not operations:
+            return
+        updated += await _bulk_write(service, operations)
+        operations.clear()
+
+    projection = {"trigger": 1, "trigger_type": 1, "normalized": 1}
+    async for document in service.iter_triggers(projection=projection, batch_size=batch_size, query=query):
+        value = normalized_key(str(document.get("trigger") or ""), document.get("trigger_type"))
+        if document.get("normalized") == value:
+            continue
+        # updated_at preload rejimidagi delta so'rovlar o'zgarishni ko'rishi uchun
+        operations.append(UpdateOne(
+            {"_id": document["_id"]},
+            {"$set": {"normalized": value, "updated_at": datetime.now()}},
+        ))
+        if len(operations) >= batch_size:
+            await flush()
+    await flush()
+
+    if updated:
+        await service.refresh_after_bulk_change()
+        print(f"MongoDB: {updated} ta triggerga 'normalized' maydoni yozildi.")
+    return updated
+
+async def upgrade_schema(service: MongoService, batch_size: int = MIGRATION_BATCH_SIZE) -> int:
+    """
+    Joriy SCHEMA_VERSION dan eski hujjatlarni to'liq model bilan tekshirib, versiya belgisini qo'yish.
+    Shundan keyin o'qish yo'li ularni validatsiyasiz ishlatadi.
+    Yaroqsiz hujjatlar o'zgartirilmaydi (o'qishda ham tashlab ketiladi) va sanab chiqiladi.
+    """
+    operations: List[UpdateOne] = []
+    upgraded = 0
+    invalid = 0
+
+    async def flush():
+        nonlocal upgraded
+        if not operations:
+            return
+        upgraded += await _bulk_write(service, operations)
+        operations.clear()
+
+    query = {"schema_version": {"$ne": SCHEMA_VERSION}}
+    async for document in service.iter_triggers(batch_size=batch_size, query=query):
+        doc_id = document.pop("_id")
+        try:
+            trigger = Trigger.model_validate(document)
+        except ValidationError:
+            invalid += 1
+            continue
+        operations.append(UpdateOne(
+            {"_id": doc_id},
+            {"$set": {
+                "normalized": trigger.normalized,
+                "schema_version": trigger.schema_version,
+                "updated_at": datetime.now(),
+            }},
+        ))
+        if len(operations) >= batch_size:
+            await flush()
+    await flush()
+
+    if invalid:
+        print(f"MongoDB: {invalid} ta hujjat Trigger sxemasiga mos emas, o'tkazib yuborildi.")
+    if upgraded:
+        await service.refresh_after_bulk_change()
+        print(f"MongoDB: {upgraded} ta hujjat sxema v{SCHEMA_VERSION} ga o'tkazildi.")
+    return upgraded
+
+def _conflict_groups(service: MongoService):
+    """Bir xil 'normalized' kalitli triggerlar guruhlari; ids — oxirgi yangilangani birinchi."""
+    pipeline = [
+        {"$match": {"normalized": {"$type": "string"}}},
+        {"$sort": {"updated_at": -1, "_id": -1}},
+        {"$group": {"_id": "$normalized", "ids": {"$push": "$_id"}, "triggers": {"$push": "$trigger"}}},
+        {"$match": {"ids.1": {"$exists": True}}},
+    ]
+    return service.collection.aggregate(pipeline, allowDiskUse=True)
+
+async def normalized_index_unique(service: MongoService) -> bool:
+    index = (await service.collection.index_information()).get("normalized_index")
+    return bool(index and index.get("unique"))
+
+async def report_normalized_conflicts(service: MongoService, limit: int = MAX_REPORTED_CONFLICTS) -> int:
+    """
+    Bir xil 'normalized' kalitli triggerlarni ("Salom"/"salom", "007"/"7") faqat logga yozish.
+    Hech narsa o'zgartirilmaydi: to'qnashuvlar hal qilinmaguncha indeks unique bo'lmaydi.
+    To'qnashgan kalitlar sonini qaytaradi.
+    """
+    groups = 0
+    async for group in _conflict_groups(service):
+        groups += 1
+        if groups <= limit:
+            triggers = ", ".join(f"'{trigger}'" for trigger in group["triggers"])
+            print(f"MongoDB: '{group['_id']}' kaliti bir nechta triggerda: {triggers}")
+    if groups:
+        print(
+            f"MongoDB: {groups} ta kalit takrorlangan, 'normalized' indeksi unique emas. "
+            "Triggerlarni admin paneldan tuzating yoki 'python -m db.migrations --dedupe' ni ishga tushiring."
+        )
+    return groups
+
+async def dedupe_normalized(service: MongoService) -> int:
+    """
+    Bir xil 'normalized' kalitli triggerlardan faqat oxirgi yangilanganini qoldirish.
+    Qolganlari CONFLICTS_COLLECTION ga (conflict_with — qoldirilgan trigger _id si) ko'chiriladi,
+    admin ularni keyin ko'rib chiqishi mumkin. Ko'chirilganlar sonini qaytaradi.
+    Ma'lumotni o'chiradi, shuning uchun faqat qo'lda ('--dedupe') ishga tushiriladi.
+    """
+    conflicts = service.db[CONFLICTS_COLLECTION]
+    moved = 0
+    async for group in _conflict_groups(service):
+        keep, *duplicates = group["ids"]
+        documents = await service.collection.find({"_id": {"$in": duplicates}}).to_list(length=None)
+        now = datetime.now()
+        for document in documents:
+            document["conflict_with"] = keep
+            document["moved_at"] = now
+        try:
+            await conflicts.insert_many(documents, ordered=False)
+        except BulkWriteError:
+            # Oldingi (uzilib qolgan) ishga tushirishda allaqachon ko'chirilgan
+            pass
+        result = await service.writes.delete_many({"_id": {"$in": duplicates}})
+        moved += result.deleted_count
+        print(f"MongoDB: '{group['_id']}' kaliti — {len(duplicates)} ta dublikat {CONFLICTS_COLLECTION} ga ko'chirildi.")
+
+    if moved:
+        await service.refresh_after_bulk_change()
+    return moved
+
+async def make_normalized_unique(service: MongoService):
+    """Dublikatlarni ajratib, 'normalized' indeksini unique qilish (python -m db.migrations --dedupe)."""
+    if await normalized_index_unique(service):
+        print("MongoDB: 'normalized' indeksi allaqachon unique.")
+        return
+    await dedupe_normalized(service)
+    await service.ensure_normalized_index(replace=True)
+    print("MongoDB: 'normalized' unique indeksi yaratildi.")
+
+async def run_migrations(service: MongoService, recompute: bool = False):
+    """
+    Ishga tushishda chaqiriladi: bajariladigan ish bo'lmasa, bir nechta bo'sh so'rov bilan tugaydi.
+    Faqat qo'shimcha maydonlarni yozadi; kalit to'qnashuvlari faqat hisobot qilinadi.
+    """
+    await upgrade_schema(service)
+    await backfill_normalized(service, recompute=recompute)
+    if not await normalized_index_unique(service):
+        await report_normalized_conflicts(service)
+
+async def _main(recompute: bool, dedupe: bool):
+    service = MongoService()
+    await service.create_indexes()
+    await run_migrations(service, recompute=recompute)
+    if dedupe:
+        await make_normalized_unique(service)
+    service.close()
+
+if __name__ == "__main__":
+    # python -m db.migrations [--all] [--dedupe]
+    #   --all    — barcha hujjatlarda 'normalized' ni qayta hisoblash
+    #   --dedupe — takrorlangan kalitlarni triggers_conflicts ga ko'chirib, indeksni unique qilish
+    args = sys.argv[1:]
+    asyncio.run(_main(recompute="--all" in args, dedupe="--dedupe" in args))
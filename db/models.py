@@ -1,6 +1,17 @@
-from pydantic import BaseModel, Field
+import base64
+import binascii
+from bson import ObjectId
+from bson.errors import InvalidId
+from pydantic import BaseModel, Field, model_validator
 from datetime import datetime
-from typing import Optional
+from typing import Any, List, NamedTuple, Optional
+
+from utils.normalize import normalize_trigger
+
+# Hujjat sxemasi versiyasi: shu versiyadagi hujjatlar yozishda validatsiyadan o'tgan,
+# o'qishda pydantic modelisiz to'g'ridan-to'g'ri TriggerRecord ga o'giriladi.
+# 2 — 'normalized' raqamlarni faqat raqamli triggerlarda qisqartiradi (migratsiya qayta hisoblaydi)
+SCHEMA_VERSION = 2
 
 # Botda qo'llab-quvvatlanadigan kontent turlari
 class ContentType:
@@ -17,6 +28,10 @@ class TriggerType:
     NUMERIC = "numeric"
     TEXT = "text"
 
+def normalized_key(trigger: str, trigger_type: Optional[str]) -> str:
+    """Hujjatda saqlanadigan qidiruv kaliti (unique): "№ 25" -> "25" faqat raqamli triggerlar uchun."""
+    return normalize_trigger(trigger, collapse_numbers=trigger_type != TriggerType.TEXT)
+
 class Trigger(BaseModel):
     """Ma'lumotlar bazasida saqlanadigan trigger obyekti."""
     
@@ -35,13 +50,93 @@ class Trigger(BaseModel):
     # Trigger bo'limi (faqat raqamli triggerlar uchun, masalan '1-25')
     category: Optional[str] = Field(None, description="Triggerni ajratish uchun bo'lim.")
     
+    # Qidiruv kaliti (normalized_key): raqamli triggerlarda "№ 25", "25-qism" va "25" bir xil kalit beradi.
+    # Har doim trigger dan hisoblanadi, tashqaridan kelgan qiymat e'tiborga olinmaydi. Kolleksiyada unique.
+    normalized: Optional[str] = Field(None, description="Foydalanuvchi matni solishtiriladigan normallashtirilgan kalit.")
+
+    # Hujjat qaysi sxema bo'yicha validatsiyadan o'tib yozilgani (har doim joriy versiya qo'yiladi)
+    schema_version: int = Field(SCHEMA_VERSION, description="Hujjat sxemasi versiyasi.")
+
     # Yaratilgan vaqt
     created_at: datetime = Field(default_factory=datetime.now)
     
     # Oxirgi yangilangan vaqt
     updated_at: Optional[datetime] = None
 
+    @model_validator(mode="after")
+    def fill_derived(self):
+        self.normalized = normalized_key(self.trigger, self.trigger_type)
+        self.schema_version = SCHEMA_VERSION
+        return self
+
     # MongoDB obyektini Pydantic modelga moslash
     class Config:
         from_attributes = True
-        populate_by_name = True
\ No newline at end of file
+        populate_by_name = True
+
+class TriggerRecord:
+    """
+    Xotiradagi indeks uchun yengil trigger yozuvi.
+    To'liq pydantic model o'rniga faqat javob berish uchun kerakli maydonlar saqlanadi.
+    """
+    __slots__ = ("trigger", "trigger_type", "content_type", "file_id", "category")
+
+    def __init__(self, trigger: str, trigger_type: str, content_type: str, file_id: str, category: Optional[str] = None):
+        self.trigger = trigger
+        self.trigger_type = trigger_type
+        self.content_type = content_type
+        self.file_id = file_id
+        self.category = category
+
+    # MongoDB dan faqat shu maydonlar o'qiladi (created_at/updated_at kabi maydonlar tarmoqdan kelmaydi)
+    PROJECTION = {
+        "_id": 0, "trigger": 1, "trigger_type": 1, "content_type": 1,
+        "file_id": 1, "category": 1, "schema_version": 1,
+    }
+
+    @classmethod
+    def from_document(cls, document: dict) -> "TriggerRecord":
+        """MongoDB hujjatidan yozuv yaratish (majburiy maydon bo'lmasa KeyError)."""
+        return cls(
+            document["trigger"],
+            document["trigger_type"],
+            document["content_type"],
+            document["file_id"],
+            document.get("category"),
+        )
+
+    @classmethod
+    def decode(cls, document: dict) -> Optional["TriggerRecord"]:
+        """
+        Joriy sxemadagi hujjat validatsiyasiz o'qiladi.
+        Eski (migratsiya qilinmagan) hujjat to'liq model orqali tekshiriladi; yaroqsiz bo'lsa None.
+        """
+        if document.get("schema_version") == SCHEMA_VERSION:
+            try:
+                return cls.from_document(document)
+            except KeyError:
+                return None
+        try:
+            trigger = Trigger.model_validate(document)
+        except ValueError:
+            return None
+        return cls(trigger.trigger, trigger.trigger_type, trigger.content_type, trigger.file_id, trigger.category)
+
+
+class TriggerPage(NamedTuple):
+    """Bo'lim ro'yxatining bitta sahifasi: trigger kalitlari, ularning _id lari va qo'shni sahifalar bayroqlari."""
+    triggers: List[str]
+    ids: List[Any]
+    has_next: bool
+    has_prev: bool
+
+def pack_id(doc_id: ObjectId) -> str:
+    """ObjectId (12 bayt) -> 16 belgili base64url satr (callback_data uchun)."""
+    return base64.urlsafe_b64encode(doc_id.binary).decode("ascii")
+
+def unpack_id(value: str) -> Optional[ObjectId]:
+    """pack_id ning teskarisi; buzilgan qiymat uchun None."""
+    try:
+        return ObjectId(base64.urlsafe_b64decode(value.encode("ascii")))
+    except (binascii.Error, InvalidId, TypeError, ValueError):
+        return None
\ No newline at end of file
@@ -1,73 +1,826 @@
-from motor.motor_asyncio import AsyncIOMotorClient
-from typing import List, Optional
-from datetime import datetime
+import asyncio
+import time
+from collections import OrderedDict
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection, AsyncIOMotorDatabase
+from pymongo.collation import Collation
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure, PyMongoError
+from pymongo.read_concern import ReadConcern
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+from pymongo.write_concern import WriteConcern
+from types import MappingProxyType
+from typing import Any, AsyncIterator, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+from datetime import datetime, timedelta
 from pydantic import ValidationError
 
 # Config faylidan sozlamalarni olamiz
 from config import CONFIG
-from db.models import Trigger
+from db.models import Trigger, TriggerPage, TriggerRecord, TriggerType, normalized_key
+from utils.category_calc import CategoryCounter, CategoryVersions
+from utils.metrics import MONGO_LATENCY
+from utils.normalize import lookup_keys
+from utils.text_index import MatchResult, TextMatcher
+
+# Standalone mongod change stream'ni qo'llab-quvvatlamaydi (faqat replica set)
+CHANGE_STREAM_NOT_SUPPORTED = 40573
+# Unique indeks buzilganda (normalized kaliti band)
+DUPLICATE_KEY = 11000
+
+# Yengil yozuv uchun proyeksiya; _id kesh va indeks invalidatsiyasi uchun kerak
+RECORD_PROJECTION = {**TriggerRecord.PROJECTION, "_id": 1}
+# lookup_trigger bir nechta kalitni bitta so'rovda tekshiradi: natija kalit bo'yicha ajratiladi
+LOOKUP_PROJECTION = {**RECORD_PROJECTION, "normalized": 1}
+# Preload indeksi qo'shimcha ravishda kalit va delta so'rovlar uchun vaqtni o'qiydi
+INDEX_PROJECTION = {**RECORD_PROJECTION, "normalized": 1, "updated_at": 1}
+
+# Ommaviy upsert'da qiymati None bo'lsa, mavjud hujjatdan o'chiriladigan maydonlar
+UNSETTABLE_FIELDS = ("category",)
+
+# Triggerlar satr sifatida saqlanadi; "2" < "10" bo'lishi uchun raqamli tartiblash
+NUMERIC_COLLATION = Collation(locale="en", numericOrdering=True)
+
+READ_PREFERENCES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+def read_preference(mode: str) -> Any:
+    """Sozlamadagi nomdan pymongo read preference (secondary uchun max staleness bilan)."""
+    if mode == "primary":
+        return Primary()
+    return READ_PREFERENCES[mode](max_staleness=CONFIG.MONGO_MAX_STALENESS_SECONDS or -1)
+
+def write_concern() -> WriteConcern:
+    w = CONFIG.MONGO_WRITE_CONCERN
+    return WriteConcern(
+        w=int(w) if w.isdigit() else w,
+        wtimeout=CONFIG.MONGO_WRITE_TIMEOUT_MS,
+        j=CONFIG.MONGO_JOURNAL,
+    )
+
+def client_options() -> Dict[str, Any]:
+    """AsyncIOMotorClient parametrlari: pul hajmi, timeoutlar va siqish."""
+    options: Dict[str, Any] = {
+        "maxPoolSize": CONFIG.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": CONFIG.MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": CONFIG.MONGO_MAX_IDLE_TIME_MS,
+        "serverSelectionTimeoutMS": CONFIG.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": CONFIG.MONGO_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": CONFIG.MONGO_SOCKET_TIMEOUT_MS,
+        # Socketlar birinchi so'rovda ochiladi (import va fork'dan oldin tarmoqqa chiqilmaydi)
+        "connect": False,
+    }
+    if CONFIG.MONGO_COMPRESSORS:
+        # zstd — zstandard, snappy — python-snappy paketi kerak
+        options["compressors"] = CONFIG.MONGO_COMPRESSORS
+    return options
+
+class TriggerCache:
+    """
+    Triggerlar uchun jarayon ichidagi LRU + TTL keshi.
+    Topilmagan kalitlar ham (None qiymat bilan) keshlanadi.
+    """
+
+    def __init__(self, max_size: int, ttl: float, miss_ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.miss_ttl = miss_ttl
+        # kalit -> (tugash vaqti, hujjat _id si, trigger yoki None)
+        self._data: "OrderedDict[str, Tuple[float, Any, Optional[TriggerRecord]]]" = OrderedDict()
+        # hujjat _id -> kalit (delete hodisalarida faqat _id keladi)
+        self._ids: Dict[Any, str] = {}
+        # Har bir invalidatsiyada oshadi: DB so'rovi davomida o'zgargan qiymat keshga yozilmaydi
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Tuple[bool, Optional[TriggerRecord]]:
+        """(topildimi, qiymat) qaytaradi. Qiymat None bo'lsa — keshlangan 'miss'."""
+        entry = self._data.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            return False, None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return True, entry[2]
+
+    def put(self, key: str, value: Optional[TriggerRecord], doc_id: Any = None, generation: Optional[int] = None):
+        # So'rov paytida kesh invalidatsiya qilingan bo'lsa, eskirgan natijani saqlamaymiz
+        if generation is not None and generation != self.generation:
+            return
+        self._drop(key)
+        ttl = self.ttl if value is not None else self.miss_ttl
+        self._data[key] = (time.monotonic() + ttl, doc_id, value)
+        if doc_id is not None:
+            self._ids[doc_id] = key
+        while len(self._data) > self.max_size:
+            oldest = next(iter(self._data))
+            self._drop(oldest)
+
+    def invalidate(self, key: str):
+        self.generation += 1
+        self._drop(key)
+
+    def invalidate_id(self, doc_id: Any):
+        self.generation += 1
+        key = self._ids.get(doc_id)
+        if key is not None:
+            self._drop(key)
+
+    def clear(self):
+        self.generation += 1
+        self._data.clear()
+        self._ids.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+    def _drop(self, key: str):
+        entry = self._data.pop(key, None)
+        if entry is not None and entry[1] is not None:
+            self._ids.pop(entry[1], None)
+
+class TriggerIndex:
+    """
+    Butun triggers kolleksiyasining xotiradagi nusxasi.
+    Lug'at hech qachon joyida o'zgartirilmaydi: har bir o'zgarishda yangi nusxa
+    yaratilib almashtiriladi, shuning uchun o'quvchilar doim butun holatni ko'radi.
+    """
+
+    # Soatlar farqi tufayli o'zgarish o'tkazib yuborilmasligi uchun zaxira (soniya)
+    WATERMARK_OVERLAP = 5
+
+    def __init__(self):
+        self._records: Mapping[str, TriggerRecord] = MappingProxyType({})
+        self._ids: Dict[Any, str] = {}
+        self.loaded = False
+        # Eng oxirgi ko'rilgan updated_at (delta so'rovlar uchun)
+        self.watermark: Optional[datetime] = None
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def get(self, key: str) -> Optional[TriggerRecord]:
+        """key — saqlangan qidiruv kaliti (normalized_key natijasi)."""
+        return self._records.get(key)
+
+    def get_by_id(self, doc_id: Any) -> Optional[TriggerRecord]:
+        key = self._ids.get(doc_id)
+        return self._records.get(key) if key is not None else None
+
+    def replace_all(self, documents: Iterable[Dict[str, Any]]):
+        """Indeksni to'liq yangi hujjatlar to'plami bilan almashtirish."""
+        records: Dict[str, TriggerRecord] = {}
+        ids: Dict[Any, str] = {}
+        watermark = None
+        for document in documents:
+            record = self._to_record(document)
+            if record is None:
+                continue
+            key = self._key(document)
+            records[key] = record
+            ids[document.get("_id")] = key
+            watermark = self._max_time(watermark, document.get("updated_at"))
+        self._records = MappingProxyType(records)
+        self._ids = ids
+        self.watermark = watermark
+        self.loaded = True
+
+    def apply(self, upserts: Iterable[Dict[str, Any]] = (), deleted_ids: Iterable[Any] = ()):
+        """Delta o'zgarishlarni qo'llash (yangi nusxa ustida)."""
+        records = dict(self._records)
+        ids = dict(self._ids)
+        for doc_id in deleted_ids:
+            key = ids.pop(doc_id, None)
+            if key is not None:
+                records.pop(key, None)
+        for document in upserts:
+            record = self._to_record(document)
+            if record is None:
+                continue
+            # Trigger kaliti o'zgargan bo'lsa, eski kalitni olib tashlaymiz
+            old_key = ids.get(document.get("_id"))
+            if old_key is not None:
+                records.pop(old_key, None)
+            key = self._key(document)
+            records[key] = record
+            ids[document.get("_id")] = key
+            self.watermark = self._max_time(self.watermark, document.get("updated_at"))
+        self._records = MappingProxyType(records)
+        self._ids = ids
+
+    def delta_since(self) -> Optional[datetime]:
+        if self.watermark is None:
+            return None
+        return self.watermark - timedelta(seconds=self.WATERMARK_OVERLAP)
+
+    @staticmethod
+    def _key(document: Dict[str, Any]) -> str:
+        # Migratsiya hali yetib bormagan hujjatlar uchun kalitni shu yerda hisoblaymiz
+        return document.get("normalized") or normalized_key(document["trigger"], document.get("trigger_type"))
+
+    @staticmethod
+    def _to_record(document: Dict[str, Any]) -> Optional[TriggerRecord]:
+        return TriggerRecord.decode(document)
+
+    @staticmethod
+    def _max_time(current: Optional[datetime], value: Optional[datetime]) -> Optional[datetime]:
+        if value is None:
+            return current
+        if current is None or value > current:
+            return value
+        return current
 
 class MongoService:
     """MongoDB bilan ishlash uchun yagona sinf."""
-    
+
     def __init__(self):
+        self.collection_name = "triggers"
+        # Klient birinchi murojaatda yaratiladi (import paytida socket ochilmaydi)
+        self._client: Optional[AsyncIOMotorClient] = None
+        # lookup_trigger oldidagi kesh, normallashtirilgan kalit bo'yicha (hot kodlar uchun tarmoqqa chiqmaslik)
+        self.cache = TriggerCache(
+            max_size=CONFIG.TRIGGER_CACHE_SIZE,
+            ttl=CONFIG.TRIGGER_CACHE_TTL,
+            miss_ttl=CONFIG.TRIGGER_CACHE_MISS_TTL,
+        )
+        # Preload rejimida butun kolleksiyaning xotiradagi nusxasi
+        self.index = TriggerIndex()
+        # Bo'limlar bo'yicha triggerlar soni (admin menyusi uchun)
+        self.categories = CategoryCounter()
+        # Bo'lim tarkibi versiyalari (admin ro'yxat sahifalari keshi uchun)
+        self.category_versions = CategoryVersions()
+        # Matnli triggerlar uchun prefiks/xatoli qidiruv indeksi
+        self.matcher = TextMatcher()
+        # Change stream ochiq bo'lsa, hisoblagichlar faqat stream hodisalaridan yangilanadi
+        self._stream_active = False
+        self._preload = False
+        self._watch_task: Optional[asyncio.Task] = None
+        self._poll_task: Optional[asyncio.Task] = None
+
+    def connect(self):
+        """
+        Yangi MongoDB klientini yaratish (eski klient bo'lsa tashlab yuboriladi).
+        Odatda chaqirish shart emas: client/collection birinchi murojaatda o'zi yaratiladi.
+        """
         # MongoDB ga ulanish
-        self.client = AsyncIOMotorClient(CONFIG.MONGO_URL)
+        self._client = AsyncIOMotorClient(CONFIG.MONGO_URL, **client_options())
         # Ma'lumotlar bazasini tanlash
-        self.db = self.client[CONFIG.MONGO_DATABASE]
-        # Triggers kolleksiyasini tanlash
-        self.collection = self.db.triggers
-        self.collection_name = "triggers"
-    
+        self._db = self._client[CONFIG.MONGO_DATABASE]
+        # Triggers kolleksiyasi: fon sinxronizatsiyasi va migratsiyalar uchun (primary)
+        self._collection = self._db[self.collection_name]
+        # Operatsiya turlari bo'yicha sozlangan nusxalar (bitta ulanishlar puli)
+        self._user_reads = self._collection.with_options(
+            read_preference=read_preference(CONFIG.MONGO_USER_READ_PREFERENCE),
+            read_concern=ReadConcern(CONFIG.MONGO_USER_READ_CONCERN),
+        )
+        self._admin_reads = self._collection.with_options(
+            read_preference=read_preference(CONFIG.MONGO_ADMIN_READ_PREFERENCE),
+            read_concern=ReadConcern(CONFIG.MONGO_ADMIN_READ_CONCERN),
+        )
+        self._writes = self._collection.with_options(write_concern=write_concern())
+
+    def close(self):
+        """
+        Klientni yopish. Keyingi murojaat yangi klient yaratadi:
+        fork qilingan worker ota-jarayon klientini ishlatmaydi.
+        """
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def _connected(self) -> "MongoService":
+        if self._client is None:
+            self.connect()
+        return self
+
+    @property
+    def client(self) -> AsyncIOMotorClient:
+        return self._connected()._client
+
+    @property
+    def db(self) -> AsyncIOMotorDatabase:
+        return self._connected()._db
+
+    @property
+    def collection(self) -> AsyncIOMotorCollection:
+        return self._connected()._collection
+
+    @property
+    def user_reads(self) -> AsyncIOMotorCollection:
+        """Foydalanuvchi xabarlariga javob qidirish (odatda secondary)."""
+        return self._connected()._user_reads
+
+    @property
+    def admin_reads(self) -> AsyncIOMotorCollection:
+        """Admin ro'yxatlari va tafsilotlari (odatda secondary)."""
+        return self._connected()._admin_reads
+
+    @property
+    def writes(self) -> AsyncIOMotorCollection:
+        """Yozuvlar: aniq write concern bilan."""
+        return self._connected()._writes
+
     async def create_indexes(self):
         """Kolleksiyaga tezkor qidiruv va takrorlanmaslik uchun indekslarni o'rnatish."""
         # Trigger maydoni bo'yicha noyob (unique) indeks yaratish
         await self.collection.create_index(
-            "trigger", 
-            unique=True, 
+            "trigger",
+            unique=True,
             name="trigger_unique_index"
         )
+        # Bo'lim ro'yxatini sahifalash uchun (collation so'rovdagi bilan bir xil bo'lishi shart)
+        await self.collection.create_index(
+            [("category", 1), ("trigger", 1)],
+            collation=NUMERIC_COLLATION,
+            name="category_trigger_index"
+        )
+        # Foydalanuvchi matni bo'yicha qidiruv (bitta tenglik so'rovi); har bir kalitga bitta trigger
+        try:
+            await self.ensure_normalized_index()
+        except OperationFailure as e:
+            # Eski dublikatlar bor: qidiruv uchun oddiy indeks, ular 'python -m db.migrations --dedupe' bilan hal qilinadi
+            print(f"MongoDB: 'normalized' unique indeksini hozircha yaratib bo'lmadi: {e}")
+            await self.collection.create_index("normalized", name="normalized_index")
+        # Preload rejimida delta so'rovlar uchun
+        await self.collection.create_index("updated_at", name="updated_at_index")
         print(f"MongoDB: '{self.collection_name}' kolleksiyasida indekslar yaratildi.")
 
+    async def ensure_normalized_index(self, replace: bool = False):
+        """
+        normalized bo'yicha unique indeks.
+        Avvalgi (unique bo'lmagan) indeks faqat replace=True da almashtiriladi — dublikatlar
+        qo'lda tozalangandan keyin (python -m db.migrations --dedupe); aks holda u qidiruv uchun ishlatilib turadi.
+        """
+        index = (await self.collection.index_information()).get("normalized_index")
+        if index is not None and index.get("unique"):
+            return
+        if index is not None:
+            if not replace:
+                return
+            await self.collection.drop_index("normalized_index")
+        await self.collection.create_index("normalized", unique=True, name="normalized_index")
+
+    def _invalidate_key(self, trigger_key: str):
+        # Trigger turi noma'lum: uning kaliti bo'lishi mumkin bo'lgan barcha kalitlar
+        for key in lookup_keys(trigger_key):
+            self.cache.invalidate(key)
+
     async def add_trigger(self, data: Trigger) -> bool:
         """Yangi triggerni ma'lumotlar bazasiga qo'shish."""
         try:
             # Pydantic modelni dict ga o'tkazamiz
             document = data.model_dump(by_alias=True, exclude_none=True)
-            result = await self.collection.insert_one(document)
+            # Preload rejimidagi delta so'rovlar updated_at ga tayanadi
+            document.setdefault("updated_at", datetime.now())
+            with MONGO_LATENCY.time(operation="insert"):
+                result = await self.writes.insert_one(document)
+            if self.index.loaded:
+                self.index.apply(upserts=[document])
+            if self.matcher.loaded and document.get("trigger_type") == TriggerType.TEXT:
+                self.matcher.add(result.inserted_id, document["trigger"])
+            if not self._stream_active:
+                self.categories.increment(document.get("category"))
+            self.category_versions.bump(document.get("category"))
             return result.inserted_id is not None
         except Exception as e:
             print(f"Trigger qo'shishda xato (ehtimol trigger mavjud): {e}")
             return False
+        finally:
+            # Keshlangan "topilmadi" javobini o'chiramiz
+            self.cache.invalidate(data.normalized)
 
-    async def get_trigger(self, trigger_key: str) -> Optional[Trigger]:
-        """Trigger kaliti bo'yicha javobni topish."""
-        document = await self.collection.find_one({"trigger": trigger_key})
-        if document:
-            document.pop('_id', None) 
-            try:
-                return Trigger.model_validate(document)
-            except ValidationError as e:
-                print(f"Model validatsiya xatosi: {e}")
-                return None
+    async def lookup_trigger(self, text: str) -> Optional[TriggerRecord]:
+        """
+        Foydalanuvchi xabariga javob topish uchun tezkor yo'l.
+        Matn normallashtiriladi ("САЛОМ", "Salom!", "№ 25" va h.k.) va indeksli so'rov bilan qidiriladi.
+        Kalitlar lookup_keys tartibida: "Kino 2" matnli trigger bo'lsa u, bo'lmasa raqamli "2".
+        Faqat javob uchun kerakli maydonlar o'qiladi va pydantic modelisiz yengil yozuvga o'giriladi.
+        Indeks yuklangan bo'lsa, DB ga umuman murojaat qilinmaydi.
+        """
+        keys = lookup_keys(text)
+        if not keys:
+            return None
+        if self.index.loaded:
+            for key in keys:
+                record = self.index.get(key)
+                if record is not None:
+                    return record
+            return None
+
+        # Kesh har bir kalit bo'yicha alohida (yozuvda aynan shu kalit invalidatsiya qilinadi)
+        results: Dict[str, Optional[TriggerRecord]] = {}
+        missing: List[str] = []
+        for key in keys:
+            found, cached = self.cache.get(key)
+            if found:
+                results[key] = cached
+            else:
+                missing.append(key)
+
+        if missing:
+            generation = self.cache.generation
+            with MONGO_LATENCY.time(operation="find"):
+                documents = await self.user_reads.find(
+                    {"normalized": {"$in": missing}}, projection=LOOKUP_PROJECTION
+                ).to_list(length=len(missing))
+            by_key = {document["normalized"]: document for document in documents}
+            for key in missing:
+                document = by_key.get(key)
+                record = TriggerRecord.decode(document) if document else None
+                self.cache.put(key, record, doc_id=document["_id"] if document else None, generation=generation)
+                results[key] = record
+
+        for key in keys:
+            if results[key] is not None:
+                return results[key]
         return None
 
-    async def get_triggers_by_category(self, category_name: str) -> List[Trigger]:
-        """Bo'lim nomi bo'yicha triggerlarni yuklash (masalan, '1-25')."""
-        triggers: List[Trigger] = []
-        cursor = self.collection.find({"category": category_name})
+    async def find_by_normalized(self, key: str) -> Optional[str]:
+        """Shu saqlanadigan kalitni band qilgan trigger (primary'dan, yangi trigger qo'shishdan oldin)."""
+        with MONGO_LATENCY.time(operation="find_one"):
+            document = await self.collection.find_one({"normalized": key}, {"_id": 0, "trigger": 1})
+        return document["trigger"] if document else None
+
+    async def get_trigger_by_id(self, doc_id: Any) -> Optional[Trigger]:
+        """_id bo'yicha to'liq model (admin klaviaturalaridagi qisqa havolalar uchun)."""
+        with MONGO_LATENCY.time(operation="find_one"):
+            document = await self.admin_reads.find_one({"_id": doc_id})
+        return self._to_model(document)[0]
+
+    @staticmethod
+    def _to_model(document: Optional[Dict[str, Any]]) -> Tuple[Optional[Trigger], Any]:
+        """MongoDB hujjatidan (model, _id) juftligi; validatsiyadan o'tmasa model None."""
+        if not document:
+            return None, None
+        doc_id = document.pop('_id', None)
+        try:
+            return Trigger.model_validate(document), doc_id
+        except ValidationError as e:
+            print(f"Model validatsiya xatosi: {e}")
+            return None, doc_id
+
+    def suggest_triggers(self, text: str) -> MatchResult:
+        """
+        Aniq moslik bo'lmaganda matnli triggerlar ichidan eng yaqinini qidirish.
+        Faqat xotiradagi indeksdan foydalanadi (DB da $regex skaner qilinmaydi).
+        """
+        if not self.matcher.loaded:
+            return MatchResult(None, [])
+        return self.matcher.match(text, limit=CONFIG.TRIGGER_SUGGESTIONS)
+
+    async def iter_triggers(
+        self,
+        projection: Optional[Dict[str, Any]] = None,
+        batch_size: int = 1000,
+        query: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Kolleksiyani kursor orqali partiyalab o'qish (xotirada faqat bitta partiya)."""
+        cursor = self.collection.find(query or {}, projection=projection).batch_size(batch_size)
         async for document in cursor:
-            document.pop('_id', None)
-            try:
-                triggers.append(Trigger.model_validate(document))
-            except ValidationError as e:
-                continue
-        return triggers
+            yield document
+
+    async def replace_file_id(self, trigger_key: str, old_file_id: str, new_file_id: str) -> bool:
+        """
+        Trigger file_id sini atomar almashtirish.
+        Faqat file_id hali eski qiymatda bo'lsa yangilanadi (boshqa jarayon o'zgartirgan bo'lsa — yo'q).
+        """
+        with MONGO_LATENCY.time(operation="update"):
+            document = await self.writes.find_one_and_update(
+                {"trigger": trigger_key, "file_id": old_file_id},
+                {"$set": {"file_id": new_file_id, "updated_at": datetime.now()}},
+                return_document=ReturnDocument.AFTER,
+            )
+        self._invalidate_key(trigger_key)
+        if document is None:
+            return False
+        if self.index.loaded:
+            self.index.apply(upserts=[document])
+        return True
+
+    async def get_file_id(self, trigger_key: str) -> Optional[str]:
+        """Triggerning joriy file_id si primary'dan (almashtirish boshqa jarayonda yutgan bo'lsa)."""
+        with MONGO_LATENCY.time(operation="find_one"):
+            document = await self.collection.find_one({"trigger": trigger_key}, {"_id": 0, "file_id": 1})
+        return document["file_id"] if document else None
+
+    async def get_trigger_page(
+        self,
+        category_name: str,
+        page_size: int = 25,
+        after: Optional[str] = None,
+        before: Optional[str] = None,
+        primary: bool = False,
+    ) -> TriggerPage:
+        """
+        Bo'limdagi triggerlarni keyset usulida sahifalab olish.
+        after — keyingi sahifa (shu kalitdan kattalari), before — oldingi sahifa.
+        Faqat _id va 'trigger' maydonlari o'qiladi va (category, trigger) indeksidan foydalaniladi.
+        primary=True — secondary kechikishisiz (natija keshlanadigan bo'lsa).
+        """
+        query: Dict[str, Any] = {"category": category_name}
+        direction = 1
+        if after is not None:
+            query["trigger"] = {"$gt": after}
+        elif before is not None:
+            query["trigger"] = {"$lt": before}
+            direction = -1
+
+        reads = self.collection if primary else self.admin_reads
+        cursor = reads.find(
+            query,
+            projection={"trigger": 1},
+            collation=NUMERIC_COLLATION,
+        ).sort("trigger", direction).limit(page_size + 1)
+        with MONGO_LATENCY.time(operation="find"):
+            documents = await cursor.to_list(length=page_size + 1)
+
+        # Bitta ortiqcha hujjat o'qib, shu yo'nalishda yana sahifa borligini bilamiz
+        has_more = len(documents) > page_size
+        documents = documents[:page_size]
+        if before is not None:
+            documents.reverse()
+        keys = [document["trigger"] for document in documents]
+        ids = [document["_id"] for document in documents]
+        if before is not None:
+            return TriggerPage(triggers=keys, ids=ids, has_next=True, has_prev=has_more)
+        return TriggerPage(triggers=keys, ids=ids, has_next=has_more, has_prev=after is not None)
 
     async def delete_trigger(self, trigger_key: str) -> bool:
         """Triggerni ma'lumotlar bazasidan o'chirish."""
-        result = await self.collection.delete_one({"trigger": trigger_key})
-        return result.deleted_count > 0
+        with MONGO_LATENCY.time(operation="delete"):
+            document = await self.writes.find_one_and_delete(
+                {"trigger": trigger_key},
+                projection={"_id": 1, "category": 1},
+            )
+        self._invalidate_key(trigger_key)
+        if document is None:
+            return False
+        if not self._stream_active:
+            self.categories.increment(document.get("category"), -1)
+        self.category_versions.bump(document.get("category"))
+        if self.index.loaded:
+            self.index.apply(deleted_ids=[document["_id"]])
+        self.matcher.remove(document["_id"])
+        return True
+
+    async def bulk_upsert_triggers(self, triggers: List[Trigger]) -> Tuple[int, int, Dict[int, str]]:
+        """
+        Triggerlarni bitta tartibsiz (unordered) bulk_write bilan yozish.
+        Mavjud trigger yangilanadi, yo'g'i qo'shiladi.
+        Kaliti ('normalized') boshqa trigger bilan bir xil qatorlar yozilmaydi (unique indeks hali
+        yoqilmagan bazada ham), xato sifatida qaytadi.
+        (qo'shilganlar, yangilanganlar, {ro'yxatdagi indeks: xato}) qaytaradi.
+        """
+        if not triggers:
+            return 0, 0, {}
+        errors: Dict[int, str] = {}
+        # kalit -> shu kalitdagi triggerlar (bazada va partiyaning oldingi qatorlarida)
+        owners: Dict[str, Set[str]] = {}
+        with MONGO_LATENCY.time(operation="find"):
+            cursor = self.collection.find(
+                {"normalized": {"$in": list({trigger.normalized for trigger in triggers})}},
+                {"_id": 0, "trigger": 1, "normalized": 1},
+            )
+            async for document in cursor:
+                owners.setdefault(document["normalized"], set()).add(document["trigger"])
+
+        now = datetime.now()
+        operations = []
+        # bulk_write dagi operatsiya indeksi -> triggers dagi indeks
+        positions: List[int] = []
+        for position, trigger in enumerate(triggers):
+            taken = owners.setdefault(trigger.normalized, set())
+            if taken and trigger.trigger not in taken:
+                other = next(iter(taken))
+                errors[position] = f"'{trigger.normalized}' kaliti '{other}' triggeri bilan bir xil"
+                continue
+            taken.add(trigger.trigger)
+            positions.append(position)
+            document = trigger.model_dump(by_alias=True, exclude_none=True)
+            created_at = document.pop("created_at", now)
+            document["updated_at"] = now
+            update = {"$set": document, "$setOnInsert": {"created_at": created_at}}
+            # Bo'sh maydonlar eski hujjatdan o'chiriladi (masalan, raqamli trigger matnga aylansa — category)
+            unset = {name: "" for name in UNSETTABLE_FIELDS if name not in document}
+            if unset:
+                update["$unset"] = unset
+            operations.append(UpdateOne({"trigger": trigger.trigger}, update, upsert=True))
+        if not operations:
+            return 0, 0, errors
+
+        try:
+            with MONGO_LATENCY.time(operation="bulk_write"):
+                result = await self.writes.bulk_write(operations, ordered=False)
+            details = result.bulk_api_result
+        except BulkWriteError as e:
+            details = e.details
+            for error in details.get("writeErrors", []):
+                position = positions[error["index"]]
+                if error.get("code") == DUPLICATE_KEY:
+                    # Tekshiruvdan keyin parallel yozilgan trigger xuddi shu kalitni oldi: "Salom"/"salom", "007"/"7"
+                    errors[position] = f"'{triggers[position].normalized}' kaliti boshqa trigger bilan bir xil"
+                else:
+                    errors[position] = error.get("errmsg", "yozishda xato")
+        return details.get("nUpserted", 0), details.get("nModified", 0), errors
+
+    async def refresh_after_bulk_change(self):
+        """Ommaviy yozuvdan keyin kesh, hisoblagichlar va indeksni yangilash."""
+        self.cache.clear()
+        self.categories.invalidate()
+        self.category_versions.bump_all()
+        # Change stream ochiq bo'lsa, indeks hodisalar orqali o'zi yangilanadi
+        if self.index.loaded and not self._stream_active:
+            await self._sync_index_delta()
+        if self.matcher.loaded and not self._stream_active:
+            await self._load_matcher()
+
+    async def get_category_counts(self) -> Dict[str, int]:
+        """
+        Bo'limlar bo'yicha triggerlar soni.
+        Aggregatsiya faqat birinchi marta (yoki invalidatsiyadan keyin) bajariladi.
+        """
+        if not self.categories.loaded:
+            pipeline = [
+                {"$match": {"category": {"$ne": None}}},
+                {"$group": {"_id": "$category", "count": {"$sum": 1}}},
+            ]
+            with MONGO_LATENCY.time(operation="aggregate"):
+                rows = await self.admin_reads.aggregate(pipeline).to_list(length=None)
+            self.categories.load(rows)
+        return self.categories.snapshot()
+
+    # --- PRELOAD (butun kolleksiyani xotiraga yuklash) ---
+
+    async def _load_index(self):
+        """Butun kolleksiyani bitta so'rov bilan o'qib, indeksni almashtirish."""
+        documents = await self.collection.find({}, projection=INDEX_PROJECTION).to_list(length=None)
+        self.index.replace_all(documents)
+        print(f"MongoDB: {len(self.index)} ta trigger xotiraga yuklandi.")
+
+    async def _load_matcher(self):
+        """Matnli triggerlar qidiruv indeksini to'liq qurish (faqat _id va trigger o'qiladi)."""
+        if not CONFIG.TRIGGER_FUZZY:
+            return
+        documents = [
+            document async for document in self.iter_triggers(
+                projection={"trigger": 1},
+                query={"trigger_type": TriggerType.TEXT},
+            )
+        ]
+        self.matcher.replace_all(documents)
+        print(f"MongoDB: {len(self.matcher)} ta matnli trigger qidiruv indeksiga qo'shildi.")
+
+    async def _sync_index_delta(self):
+        """Oxirgi sinxronizatsiyadan beri o'zgargan hujjatlarni qo'llash."""
+        since = self.index.delta_since()
+        query = {"updated_at": {"$gt": since}} if since is not None else {"updated_at": {"$ne": None}}
+        documents = await self.collection.find(query, projection=INDEX_PROJECTION).to_list(length=None)
+        if documents:
+            self.index.apply(upserts=documents)
+
+    async def _poll_index(self):
+        """
+        Change stream mavjud bo'lmaganda indeksni davriy yangilab turish.
+        O'chirilgan hujjatlar faqat to'liq qayta yuklashda aniqlanadi.
+        """
+        last_full_reload = time.monotonic()
+        while True:
+            await asyncio.sleep(CONFIG.TRIGGER_INDEX_REFRESH)
+            try:
+                if time.monotonic() - last_full_reload >= CONFIG.TRIGGER_INDEX_FULL_RELOAD:
+                    await self._load_index()
+                    await self._load_matcher()
+                    last_full_reload = time.monotonic()
+                else:
+                    await self._sync_index_delta()
+            except PyMongoError as e:
+                # DB ishlamasa ham eski (stale) javoblar bilan ishlashda davom etamiz
+                print(f"Trigger indeksini yangilashda xato: {e}")
+
+    # --- CHANGE STREAM (bir nechta replika uchun kesh sinxronizatsiyasi) ---
+
+    def start_watching(self, preload: bool = False):
+        """
+        Change stream kuzatuvchisini fon vazifasi sifatida ishga tushirish.
+        preload=True bo'lsa, stream ochilgach butun kolleksiya xotiraga yuklanadi.
+        """
+        self._preload = preload
+        if self._watch_task is None or self._watch_task.done():
+            self._watch_task = asyncio.create_task(self._watch_changes())
+
+    async def stop_watching(self):
+        for task in (self._watch_task, self._poll_task):
+            if task is None:
+                continue
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._watch_task = None
+        self._poll_task = None
+        self._stream_active = False
+
+    async def _watch_changes(self):
+        while True:
+            try:
+                async with self.collection.watch(full_document="updateLookup") as stream:
+                    # (Qayta) ulanish oralig'ida o'tkazib yuborilgan hodisalar bo'lishi mumkin.
+                    # Stream allaqachon ochiq, shuning uchun yuklash vaqtidagi hodisalar ham keyin keladi.
+                    self.cache.clear()
+                    self.categories.invalidate()
+                    self.category_versions.bump_all()
+                    self._stream_active = True
+                    if self._preload or self.index.loaded:
+                        await self._load_index()
+                    await self._load_matcher()
+                    async for change in stream:
+                        self._apply_change(change)
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                self._stream_active = False
+                if e.code == CHANGE_STREAM_NOT_SUPPORTED:
+                    print("MongoDB: change stream qo'llab-quvvatlanmaydi, kesh faqat TTL bo'yicha yangilanadi.")
+                    if not self.matcher.loaded:
+                        await self._load_matcher()
+                    if self._preload:
+                        await self._start_polling()
+                    return
+                print(f"Change stream xatosi: {e}")
+                await asyncio.sleep(5)
+            except PyMongoError as e:
+                self._stream_active = False
+                print(f"Change stream uzildi, qayta ulanamiz: {e}")
+                await asyncio.sleep(5)
+
+    async def _start_polling(self):
+        while not self.index.loaded:
+            try:
+                await self._load_index()
+            except PyMongoError as e:
+                print(f"Triggerlarni xotiraga yuklab bo'lmadi: {e}")
+                await asyncio.sleep(5)
+        self._poll_task = asyncio.create_task(self._poll_index())
+
+    def _apply_change(self, change: Dict[str, Any]):
+        """Change stream hodisasiga ko'ra kesh va indeksni yangilash."""
+        op = change.get("operationType")
+        doc_id = change.get("documentKey", {}).get("_id")
+        if op == "insert":
+            category = (change.get("fullDocument") or {}).get("category")
+            self.categories.increment(category)
+            self.category_versions.bump(category)
+        elif op == "delete":
+            # Delete hodisasida faqat _id keladi: bo'limni xotiradagi nusxadan topamiz
+            record = self.index.get_by_id(doc_id) if self.index.loaded else None
+            if record is not None:
+                self.categories.increment(record.category, -1)
+                self.category_versions.bump(record.category)
+            else:
+                self.categories.invalidate()
+                self.category_versions.bump_all()
+        elif op in ("replace", "update"):
+            # Bo'lim o'zgargan bo'lishi mumkin
+            self.categories.invalidate()
+            self.category_versions.bump_all()
+        else:
+            self.category_versions.bump_all()
 
-# Global obyekt yaratamiz, shunda boshqa fayllarda `from db.mongo import db_service` deb ishlata olamiz
-db_service = MongoService()
\ No newline at end of file
+        if op in ("insert", "replace", "update"):
+            document = change.get("fullDocument") or {}
+            if document.get("trigger") is not None:
+                self.cache.invalidate(document.get("normalized") or normalized_key(document["trigger"], document.get("trigger_type")))
+            self.cache.invalidate_id(doc_id)
+            if self.index.loaded:
+                if document:
+                    self.index.apply(upserts=[document])
+                else:
+                    # updateLookup paytida hujjat allaqachon o'chirilgan
+                    self.index.apply(deleted_ids=[doc_id])
+            if self.matcher.loaded:
+                if document.get("trigger_type") == TriggerType.TEXT:
+                    self.matcher.add(doc_id, document["trigger"])
+                else:
+                    self.matcher.remove(doc_id)
+        elif op == "delete":
+            self.cache.invalidate_id(doc_id)
+            if self.index.loaded:
+                self.index.apply(deleted_ids=[doc_id])
+            self.matcher.remove(doc_id)
+        else:
+            # drop, rename, invalidate va h.k. — keshni tozalaymiz,
+            # indeks esa stream qayta ochilganda to'liq qayta yuklanadi
+            self.cache.clear()
\ No newline at end of file
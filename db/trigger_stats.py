@@ -0,0 +1,214 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from config import CONFIG
+from db.mongo import MongoService
+from utils.metrics import MONGO_LATENCY
+from utils.normalize import normalize_trigger
+
+# Rollup davrlari
+PERIOD_HOUR = "hour"
+PERIOD_DAY = "day"
+
+# Topilmagan so'rovlar kaliti shu uzunlikda kesiladi (uzun matnlar kolleksiyani shishirmasin)
+MAX_MISS_KEY_LENGTH = 64
+# Bir vaqtda ikki jarayon bir xil rollup'ni upsert qilsa — qayta urinish kifoya
+DUPLICATE_KEY = 11000
+
+# (davr, davr boshi, kalit)
+Rollup = Tuple[str, datetime, str]
+
+class TriggerStats:
+    """
+    Triggerlar bo'yicha hit/miss hisoblagichlari (write-behind).
+    Har bir so'rov faqat xotiradagi buferni oshiradi; bufer har flush_interval soniyada
+    bitta tartibsiz bulk_write ($inc) bilan soatlik va kunlik rollup hujjatlariga yoziladi.
+    Admin "top triggerlar" ekrani xom hodisalarni emas, shu rollup'larni o'qiydi.
+    """
+
+    def __init__(
+        self,
+        mongo: MongoService,
+        collection_name: str,
+        flush_interval: float,
+        hourly_days: int,
+        daily_days: int,
+        max_keys: int = 50_000,
+    ):
+        self.mongo = mongo
+        self.collection_name = collection_name
+        self.flush_interval = flush_interval
+        self.hourly_days = hourly_days
+        self.daily_days = daily_days
+        self.max_keys = max_keys
+        # (soat boshi, kalit) -> [hits, misses]
+        self._buffer: Dict[Tuple[datetime, str], List[int]] = {}
+        # Oldingi flush'da yozilmay qolgan rollup'lar -> [hits, misses]
+        self._retry: Dict[Rollup, List[int]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        # Bufer to'lib qolganda tashlab yuborilgan hisoblar
+        self.dropped = 0
+
+    @property
+    def collection(self) -> AsyncIOMotorCollection:
+        # Klient qayta yaratilishi mumkin (fork), shuning uchun har safar MongoService dan olamiz
+        return self.mongo.db[self.collection_name]
+
+    async def create_indexes(self):
+        # Upsert filtri va top so'rovi (period, start) prefiksidan foydalanadi
+        await self.collection.create_index(
+            [("period", 1), ("start", 1), ("trigger", 1)],
+            unique=True,
+            name="period_start_trigger_unique",
+        )
+        # Eski rollup'larni MongoDB o'zi o'chiradi
+        await self.collection.create_index("expires_at", expireAfterSeconds=0, name="stats_ttl_index")
+
+    # --- HISOBLASH (tarmoqsiz) ---
+
+    def record_hit(self, trigger: str):
+        """Topilgan trigger (aniq yoki fuzzy moslik)."""
+        self._add(trigger, 0)
+
+    def record_miss(self, text: str):
+        """Topilmagan so'rov: normallashtirilgan matn bo'yicha hisoblanadi."""
+        key = normalize_trigger(text)[:MAX_MISS_KEY_LENGTH]
+        if key:
+            self._add(key, 1)
+
+    def _add(self, key: str, field: int):
+        bucket = (datetime.utcnow().replace(minute=0, second=0, microsecond=0), key)
+        counts = self._buffer.get(bucket)
+        if counts is None:
+            if len(self._buffer) >= self.max_keys:
+                self.dropped += 1
+                return
+            counts = self._buffer[bucket] = [0, 0]
+        counts[field] += 1
+
+    # --- FLUSH ---
+
+    def start(self):
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Fon vazifasini to'xtatib, qolgan hisoblarni yozib qo'yish."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+        if self.dropped:
+            logging.warning(f"Trigger statistikasi: {self.dropped} ta hisob bufer to'lgani sababli yozilmadi")
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    @staticmethod
+    def _rollups(buffer: Dict[Tuple[datetime, str], List[int]]) -> Dict[Rollup, List[int]]:
+        """Soatlik buferdan soatlik va kunlik rollup'lar: bitta flush — har kalitga bitta kunlik $inc."""
+        rows: Dict[Rollup, List[int]] = {}
+        for (hour, key), (hits, misses) in buffer.items():
+            rows[(PERIOD_HOUR, hour, key)] = [hits, misses]
+        for (hour, key), (hits, misses) in buffer.items():
+            counts = rows.setdefault((PERIOD_DAY, hour.replace(hour=0), key), [0, 0])
+            counts[0] += hits
+            counts[1] += misses
+        return rows
+
+    def _operations(self, rows: Dict[Rollup, List[int]]) -> List[UpdateOne]:
+        """Rollup'lar uchun $inc upsert'lar, rows tartibida (bulk_write xato indekslari shunga mos)."""
+        retention = {PERIOD_HOUR: timedelta(days=self.hourly_days), PERIOD_DAY: timedelta(days=self.daily_days)}
+        return [
+            UpdateOne(
+                {"period": period, "start": start, "trigger": key},
+                {
+                    "$inc": {"hits": hits, "misses": misses},
+                    "$setOnInsert": {"expires_at": start + retention[period]},
+                },
+                upsert=True,
+            )
+            for (period, start, key), (hits, misses) in rows.items()
+        ]
+
+    def _requeue(self, rows: Dict[Rollup, List[int]]):
+        for row, (hits, misses) in rows.items():
+            counts = self._retry.setdefault(row, [0, 0])
+            counts[0] += hits
+            counts[1] += misses
+
+    async def flush(self):
+        """
+        Buferni rollup'larga yozish.
+        Tartibsiz bulk_write qisman yozilishi mumkin: BulkWriteError da faqat yozilmagan rollup'lar
+        qayta navbatga qo'yiladi (yozilganlari ikki marta sanalmaydi).
+        """
+        async with self._flush_lock:
+            if not self._buffer and not self._retry:
+                return
+            buffer, self._buffer = self._buffer, {}
+            rows = self._rollups(buffer)
+            retry, self._retry = self._retry, {}
+            for row, (hits, misses) in retry.items():
+                counts = rows.setdefault(row, [0, 0])
+                counts[0] += hits
+                counts[1] += misses
+
+            keys = list(rows)
+            try:
+                with MONGO_LATENCY.time(operation="bulk_write"):
+                    await self.collection.bulk_write(self._operations(rows), ordered=False)
+            except BulkWriteError as e:
+                failed = [keys[error["index"]] for error in e.details.get("writeErrors", [])]
+                retried = {keys[error["index"]] for error in e.details.get("writeErrors", []) if error.get("code") == DUPLICATE_KEY}
+                # Boshqa xatolar qayta urinishda ham takrorlanadi: bu hisoblar tashlanadi
+                logging.warning(
+                    f"Trigger statistikasi: {len(failed)} ta rollup yozilmadi, "
+                    f"{len(retried)} tasi qayta uriniladi: {e}"
+                )
+                self._requeue({row: rows[row] for row in retried})
+            except PyMongoError as e:
+                # Server javob bermadi (tarmoq, tanlov timeouti): hech narsa tasdiqlanmagan, hammasi qayta uriniladi
+                logging.warning(f"Trigger statistikasini yozib bo'lmadi: {e}")
+                self._requeue(rows)
+
+    # --- O'QISH ---
+
+    async def top(self, days: int, field: str = "hits", limit: int = 10) -> List[Tuple[str, int]]:
+        """
+        Oxirgi days kun bo'yicha eng ko'p hit (yoki miss) bo'lgan kalitlar.
+        1 kun soatlik rollup'lardan (oxirgi 24 soat), qolganlari kunlik rollup'lardan hisoblanadi.
+        """
+        now = datetime.utcnow()
+        if days <= 1:
+            period, since = PERIOD_HOUR, now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=23)
+        else:
+            period, since = PERIOD_DAY, now.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days - 1)
+        pipeline = [
+            {"$match": {"period": period, "start": {"$gte": since}, field: {"$gt": 0}}},
+            {"$group": {"_id": "$trigger", "count": {"$sum": f"${field}"}}},
+            {"$sort": {"count": -1, "_id": 1}},
+            {"$limit": limit},
+        ]
+        with MONGO_LATENCY.time(operation="aggregate"):
+            rows = await self.collection.aggregate(pipeline).to_list(length=limit)
+        return [(row["_id"], row["count"]) for row in rows]
+
+def create_trigger_stats(mongo: MongoService) -> TriggerStats:
+    """CONFIG bo'yicha hit/miss hisoblagichlari."""
+    return TriggerStats(
+        mongo,
+        "trigger_stats",
+        flush_interval=CONFIG.TRIGGER_STATS_FLUSH_INTERVAL,
+        hourly_days=CONFIG.TRIGGER_STATS_HOURLY_DAYS,
+        daily_days=CONFIG.TRIGGER_STATS_DAILY_DAYS,
+    )
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+from aiogram.types import User
+
+from config import CONFIG
+from db.mongo import MongoService
+from utils.metrics import MONGO_LATENCY
+
+class UserRegistry:
+    """
+    Botdan foydalangan foydalanuvchilar ro'yxati (e'lonlar uchun qabul qiluvchilar).
+    Har bir xabarda faqat xotiradagi bufer yangilanadi; bufer har flush_interval soniyada
+    bitta tartibsiz bulk_write (upsert) bilan yoziladi — javob DB ni kutmaydi.
+    Hujjat: _id — Telegram user_id, blocked — botni bloklagan/o'chirilgan akkaunt.
+    """
+
+    def __init__(self, mongo: MongoService, collection_name: str, flush_interval: float, max_pending: int = 50_000):
+        self.mongo = mongo
+        self.collection_name = collection_name
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        # user_id -> $set maydonlari (oxirgi xabar bo'yicha)
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        # Bufer to'lib qolganda yozilmay qolgan yangi foydalanuvchilar
+        self.dropped = 0
+
+    @property
+    def collection(self) -> AsyncIOMotorCollection:
+        return self.mongo.db[self.collection_name]
+
+    async def create_indexes(self):
+        # E'lon kursori (blocked=False, _id > checkpoint, _id bo'yicha tartib) va ETA uchun sanash
+        # shu indeksdan o'qiladi, bloklanganlar umuman ko'rilmaydi
+        await self.collection.create_index([("blocked", 1), ("_id", 1)], name="blocked_id_index")
+
+    # --- YOZISH (tarmoqsiz) ---
+
+    def touch(self, user: User):
+        """Foydalanuvchi xabar yubordi: keyingi flush'da upsert qilinadi."""
+        if user.is_bot:
+            return
+        if user.id not in self._pending and len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        # Xabar yozgan foydalanuvchi botni blokdan chiqargan bo'ladi
+        self._pending[user.id] = {
+            "first_name": user.first_name,
+            "username": user.username,
+            "language_code": user.language_code,
+            "last_seen": datetime.utcnow(),
+            "blocked": False,
+        }
+
+    def start(self):
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Fon vazifasini to'xtatib, buferni yozib qo'yish."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+        if self.dropped:
+            logging.warning(f"Foydalanuvchilar: {self.dropped} ta yozuv bufer to'lgani sababli tashlandi")
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self):
+        """Buferdagi foydalanuvchilarni upsert qilish. Xato bo'lsa keyingi flush'da qayta uriniladi."""
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+            operations = [
+                UpdateOne(
+                    {"_id": user_id},
+                    {"$set": fields, "$setOnInsert": {"created_at": fields["last_seen"]}},
+                    upsert=True,
+                )
+                for user_id, fields in pending.items()
+            ]
+            try:
+                with MONGO_LATENCY.time(operation="bulk_write"):
+                    await self.collection.bulk_write(operations, ordered=False)
+            except PyMongoError as e:
+                logging.warning(f"Foydalanuvchilarni yozib bo'lmadi: {e}")
+                # Oradagi yangiroq yozuvlar ustun
+                for user_id, fields in pending.items():
+                    self._pending.setdefault(user_id, fields)
+
+    async def mark_blocked(self, user_ids: Iterable[int]):
+        """Botni bloklagan yoki o'chirilgan akkauntlar keyingi e'lonlarda o'tkazib yuboriladi."""
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        with MONGO_LATENCY.time(operation="update_many"):
+            await self.collection.update_many(
+                {"_id": {"$in": user_ids}},
+                {"$set": {"blocked": True, "blocked_at": datetime.utcnow()}},
+            )
+
+    # --- O'QISH ---
+
+    async def count_active(self, after: Optional[int] = None) -> int:
+        """Bloklanmagan foydalanuvchilar soni (after — shu user_id dan keyingilari)."""
+        query: Dict[str, Any] = {"blocked": False}
+        if after is not None:
+            query["_id"] = {"$gt": after}
+        with MONGO_LATENCY.time(operation="count"):
+            return await self.collection.count_documents(query)
+
+    async def iter_active_ids(self, after: Optional[int] = None, batch_size: int = 500) -> AsyncIterator[List[int]]:
+        """
+        Bloklanmagan foydalanuvchilar _id tartibida, batch_size talik ro'yxatlar bilan.
+        Kursor oqim sifatida o'qiladi: xotirada faqat joriy batch turadi.
+        """
+        query: Dict[str, Any] = {"blocked": False}
+        if after is not None:
+            query["_id"] = {"$gt": after}
+        cursor = self.collection.find(query, {"_id": 1}).sort("_id", 1).batch_size(batch_size)
+        batch: List[int] = []
+        try:
+            async for document in cursor:
+                batch.append(document["_id"])
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+        finally:
+            await cursor.close()
+
+def create_user_registry(mongo: MongoService) -> UserRegistry:
+    """CONFIG bo'yicha foydalanuvchilar ro'yxati."""
+    return UserRegistry(mongo, "users", flush_interval=CONFIG.USERS_FLUSH_INTERVAL)
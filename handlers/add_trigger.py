@@ -4,8 +4,8 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.filters import StateFilter
 
-from db.mongo import db_service
-from db.models import Trigger, TriggerType, ContentType as DBContentType
+from db.mongo import MongoService
+from db.models import Trigger, TriggerType, ContentType as DBContentType, normalized_key
 from keyboards.admin_main import AdminCallback, get_admin_main_keyboard
 from keyboards.add_trigger import (
     AddTriggerCallback, 
@@ -15,9 +15,10 @@ from keyboards.add_trigger import (
     get_cancel_keyboard
 )
 from utils.category_calc import get_category_name
+from utils.media_store import MediaStore
 
 # Yangi router
-add_trigger_router = Router()
+add_trigger_router = Router(name="add_trigger")
 
 # --- HOLATLAR (STATES) ---
 class AddTriggerStates(StatesGroup):
@@ -61,7 +62,7 @@ async def set_trigger_type(call: CallbackQuery, state: FSMContext):
 
 # --- 3-QADAM: KONTENT TURINI SO'RASH ---
 @add_trigger_router.message(AddTriggerStates.WAITING_FOR_VALUE)
-async def set_trigger_value(message: Message, state: FSMContext):
+async def set_trigger_value(message: Message, state: FSMContext, db: MongoService):
     if not message.text:
         await message.answer("Iltimos, matn ko'rinishida yuboring.")
         return
@@ -70,14 +71,20 @@ async def set_trigger_value(message: Message, state: FSMContext):
     data = await state.get_data()
     
     # Agar raqamli trigger tanlangan bo'lsa, raqam ekanligini tekshiramiz
-    if data['trigger_type'] == TriggerType.NUMERIC and not value.isdigit():
+    if data['trigger_type'] == TriggerType.NUMERIC and not value.isdecimal():
         await message.answer("⚠️ Iltimos, faqat butun son yuboring (masalan: 7)")
         return
 
-    # DB da borligini tekshiramiz
-    existing = await db_service.get_trigger(value)
+    # Faqat emoji yoki tinish belgilaridan iborat trigger hech qachon topilmaydi
+    key = normalized_key(value, data['trigger_type'])
+    if not key:
+        await message.answer("⚠️ Trigger kamida bitta harf yoki raqamdan iborat bo'lishi kerak.")
+        return
+
+    # DB da borligini tekshiramiz (saqlanadigan kalit unique: "Salom" bor bo'lsa, "САЛОМ" ham band)
+    existing = await db.find_by_normalized(key)
     if existing:
-        await message.answer(f"⚠️ <b>'{value}'</b> triggeri allaqachon mavjud! Boshqasini kiriting yoki bekor qiling.", reply_markup=get_cancel_keyboard())
+        await message.answer(f"⚠️ <b>'{existing}'</b> triggeri allaqachon mavjud! Boshqasini kiriting yoki bekor qiling.", reply_markup=get_cancel_keyboard())
         return
 
     await state.update_data(trigger_value=value)
@@ -169,7 +176,7 @@ async def receive_content(message: Message, state: FSMContext):
 
 # --- 6-QADAM: SAQLASH ---
 @add_trigger_router.callback_query(AddTriggerStates.CONFIRMATION, F.data == AddTriggerCallback.CONFIRM_YES)
-async def save_trigger(call: CallbackQuery, state: FSMContext):
+async def save_trigger(call: CallbackQuery, state: FSMContext, db: MongoService, media_store: MediaStore):
     data = await state.get_data()
     
     # Kategoriyani hisoblash (faqat numeric uchun)
@@ -187,9 +194,12 @@ async def save_trigger(call: CallbackQuery, state: FSMContext):
     )
     
     # DB ga yozish
-    success = await db_service.add_trigger(new_trigger)
+    success = await db.add_trigger(new_trigger)
     
     if success:
+        # Media bo'lsa, lokal nusxasini oldindan yuklab qo'yamiz
+        if new_trigger.content_type != DBContentType.TEXT:
+            media_store.enqueue(new_trigger.file_id)
         await call.message.edit_text(
             f"✅ <b>Trigger ({new_trigger.trigger}) muvaffaqiyatli saqlandi!</b>",
             reply_markup=None
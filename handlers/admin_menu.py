@@ -1,16 +1,27 @@
-from typing import Union
+import html
+from typing import List, Tuple, Union
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import CommandStart, BaseFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
 from config import CONFIG
-from keyboards.admin_main import get_admin_main_keyboard, AdminCallback, get_categories_keyboard
+from db.mongo import MongoService
+from db.trigger_stats import TriggerStats
+from keyboards.admin_main import (
+    TOP_PERIODS,
+    AdminCallback,
+    TopTriggersCallback,
+    get_admin_main_keyboard,
+    get_categories_keyboard,
+    get_top_triggers_keyboard,
+)
 from utils.category_calc import get_all_categories
 
 # Admin uchun alohida router yaratamiz
-admin_router = Router()
+admin_router = Router(name="admin_menu")
 
 # --- States & Filters ---
 
@@ -44,11 +55,12 @@ async def cmd_start_admin(message: Message, state: FSMContext):
     await message.answer(welcome_text, reply_markup=get_admin_main_keyboard())
 
 @admin_router.callback_query(AdminStates.MAIN_MENU, F.data == AdminCallback.CATEGORIES)
-async def handle_categories_menu(call: CallbackQuery):
+async def handle_categories_menu(call: CallbackQuery, db: MongoService):
     """
     'Trigger Bo‘limlari' tugmasi bosilganda ishlaydi.
     """
-    categories = get_all_categories()
+    # Sonlar keshdan olinadi: kolleksiya faqat birinchi ochilishda aggregatsiya qilinadi
+    categories = get_all_categories(await db.get_category_counts())
     await call.message.edit_text(
         "📁 <b>Trigger Bo‘limlari</b>\n\n"
         "Triggerlar soniga qarab ajratilgan bo'limni tanlang. "
@@ -57,6 +69,42 @@ async def handle_categories_menu(call: CallbackQuery):
     )
     await call.answer()
 
+def format_top(title: str, rows: List[Tuple[str, int]]) -> str:
+    if not rows:
+        return f"<b>{title}</b>\n—"
+    lines = "\n".join(f"{place}. <code>{html.escape(key)}</code> — {count}" for place, (key, count) in enumerate(rows, 1))
+    return f"<b>{title}</b>\n{lines}"
+
+async def show_top_triggers(call: CallbackQuery, trigger_stats: TriggerStats, days: int):
+    # Buferdagi oxirgi hisoblar ham ko'rinishi uchun avval yozib olamiz
+    await trigger_stats.flush()
+    hits = await trigger_stats.top(days, field="hits")
+    misses = await trigger_stats.top(days, field="misses")
+    label = dict(TOP_PERIODS).get(days, f"{days} kun")
+    text = (
+        f"📊 <b>Top triggerlar ({label})</b>\n\n"
+        f"{format_top('🔥 Eng ko‘p so‘ralganlar', hits)}\n\n"
+        f"{format_top('❓ Topilmagan so‘rovlar', misses)}"
+    )
+    try:
+        await call.message.edit_text(text, reply_markup=get_top_triggers_keyboard())
+    except TelegramBadRequest as e:
+        # Shu davr qayta bosilganda statistika o'zgarmagan bo'lishi mumkin
+        if "message is not modified" not in (e.message or ""):
+            raise
+    await call.answer()
+
+@admin_router.callback_query(AdminStates.MAIN_MENU, F.data == AdminCallback.TOP_TRIGGERS)
+async def handle_top_triggers_menu(call: CallbackQuery, trigger_stats: TriggerStats):
+    """
+    'Top triggerlar' tugmasi: oldindan yig'ilgan soatlik/kunlik rollup'lardan o'qiladi.
+    """
+    await show_top_triggers(call, trigger_stats, TOP_PERIODS[0][0])
+
+@admin_router.callback_query(TopTriggersCallback.filter(), IsAdmin())
+async def handle_top_triggers_period(call: CallbackQuery, callback_data: TopTriggersCallback, trigger_stats: TriggerStats):
+    await show_top_triggers(call, trigger_stats, callback_data.days)
+
 @admin_router.callback_query(F.data == AdminCallback.MAIN_MENU)
 async def handle_back_to_main_menu(call: CallbackQuery, state: FSMContext):
     """
@@ -0,0 +1,91 @@
+import logging
+
+from aiogram import Router, F
+from aiogram.types import Message, CallbackQuery
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo.errors import PyMongoError
+
+from db.users import UserRegistry
+from handlers.admin_menu import AdminStates, IsAdmin
+from keyboards.admin_main import AdminCallback, get_admin_main_keyboard
+from keyboards.broadcast import (
+    BroadcastCallback,
+    BroadcastStopCallback,
+    get_broadcast_cancel_keyboard,
+    get_broadcast_confirm_keyboard,
+)
+from utils.broadcast import Broadcaster
+
+broadcast_router = Router(name="broadcast")
+
+class BroadcastStates(StatesGroup):
+    WAITING_FOR_MESSAGE = State()  # E'lon xabarini kutish
+    CONFIRM = State()              # Yuborishni tasdiqlash
+
+# --- XABARNI SO'RASH ---
+@broadcast_router.callback_query(F.data == AdminCallback.BROADCAST, IsAdmin())
+async def ask_broadcast_message(call: CallbackQuery, state: FSMContext):
+    await state.set_state(BroadcastStates.WAITING_FOR_MESSAGE)
+    await call.message.edit_text(
+        "📣 <b>E'lon yuborish</b>\n\n"
+        "Barcha foydalanuvchilarga yuboriladigan xabarni yuboring (matn, rasm, video...).\n"
+        "Xabar aynan shu ko'rinishda nusxalanadi. Botni bloklaganlar o'tkazib yuboriladi.",
+        reply_markup=get_broadcast_cancel_keyboard()
+    )
+    await call.answer()
+
+# --- XABARNI QABUL QILISH ---
+@broadcast_router.message(BroadcastStates.WAITING_FOR_MESSAGE)
+async def receive_broadcast_message(message: Message, state: FSMContext, users: UserRegistry):
+    # Qabul qiluvchilar soni indeks bo'yicha sanaladi
+    count = await users.count_active()
+    await state.update_data(from_chat_id=message.chat.id, message_id=message.message_id)
+    await state.set_state(BroadcastStates.CONFIRM)
+    await message.reply(
+        f"Shu xabar <b>{count}</b> ta foydalanuvchiga yuboriladi. Tasdiqlaysizmi?",
+        reply_markup=get_broadcast_confirm_keyboard()
+    )
+
+# --- TASDIQLASH ---
+@broadcast_router.callback_query(BroadcastStates.CONFIRM, F.data == BroadcastCallback.CONFIRM)
+async def confirm_broadcast(call: CallbackQuery, state: FSMContext, broadcaster: Broadcaster):
+    data = await state.get_data()
+    await state.set_state(AdminStates.MAIN_MENU)
+    # Shu xabar holat xabariga aylanadi: yuborish davomida tezlik va ETA bilan yangilanadi
+    status = await call.message.edit_text("⏳ E'lon boshlanmoqda...")
+    try:
+        await broadcaster.create(
+            from_chat_id=data["from_chat_id"],
+            message_id=data["message_id"],
+            status_chat_id=status.chat.id,
+            status_message_id=status.message_id,
+            created_by=call.from_user.id,
+        )
+    except PyMongoError as e:
+        logging.error(f"E'lonni boshlab bo'lmadi: {e}")
+        await status.edit_text("❌ E'lonni boshlashda xatolik yuz berdi. Keyinroq urinib ko'ring.")
+    await call.answer()
+    await call.message.answer("Bosh menyu:", reply_markup=get_admin_main_keyboard())
+
+@broadcast_router.callback_query(F.data == BroadcastCallback.CANCEL, IsAdmin())
+async def cancel_broadcast_setup(call: CallbackQuery, state: FSMContext):
+    await state.set_state(AdminStates.MAIN_MENU)
+    await call.message.edit_text("Bosh menyu. Iltimos, bo'limni tanlang:", reply_markup=get_admin_main_keyboard())
+    await call.answer("E'lon bekor qilindi")
+
+# --- TO'XTATISH ---
+@broadcast_router.callback_query(BroadcastStopCallback.filter(), IsAdmin())
+async def stop_broadcast(call: CallbackQuery, callback_data: BroadcastStopCallback, broadcaster: Broadcaster):
+    """Ishlayotgan e'lonni to'xtatish (holat xabari keyingi yangilanishda o'zgaradi)."""
+    try:
+        job_id = ObjectId(callback_data.job_id)
+    except InvalidId:
+        await call.answer()
+        return
+    if await broadcaster.cancel(job_id):
+        await call.answer("⛔ E'lon to'xtatilmoqda...")
+    else:
+        await call.answer("E'lon allaqachon tugagan", show_alert=True)
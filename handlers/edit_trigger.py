@@ -1,37 +1,80 @@
+from typing import Optional, Tuple
+
 from aiogram import Router, F
-from aiogram.types import CallbackQuery
+from aiogram.types import CallbackQuery, InlineKeyboardMarkup
 from aiogram.fsm.context import FSMContext
 
-from db.mongo import db_service
-from db.models import Trigger
-from keyboards.admin_main import AdminCallback
+from db.mongo import MongoService
+from db.models import Trigger, TriggerPage, unpack_id
+from keyboards.admin_main import CategoryCallback
 from keyboards.trigger_list import (
     TriggerAction, 
+    TriggerCallback,
+    TriggerPageCallback,
     get_trigger_list_keyboard, 
     get_trigger_detail_keyboard,
     get_delete_confirm_keyboard
 )
+from keyboards.render_cache import KeyboardCache
+
+edit_trigger_router = Router(name="edit_trigger")
 
-edit_trigger_router = Router()
+async def load_trigger(call: CallbackQuery, callback_data: TriggerCallback, db: MongoService) -> Optional[Trigger]:
+    """Callback dagi qisqa id bo'yicha triggerni _id indeksi orqali topish; topilmasa adminga xabar beriladi."""
+    doc_id = unpack_id(callback_data.id)
+    trigger = await db.get_trigger_by_id(doc_id) if doc_id is not None else None
+    if trigger is None:
+        await call.answer("Trigger topilmadi (o'chirilgan bo'lishi mumkin).", show_alert=True)
+    return trigger
 
-# --- 1. BO'LIM TANLANGANDA RO'YXATNI CHIQARISH ---
-@edit_trigger_router.callback_query(F.data.startswith(f"{AdminCallback.CATEGORIES}:"))
-async def show_trigger_list(call: CallbackQuery):
+async def render_trigger_list(
+    db: MongoService,
+    keyboard_cache: KeyboardCache,
+    category: str,
+    direction: Optional[str] = None,
+    cursor: Optional[str] = None,
+) -> Tuple[TriggerPage, InlineKeyboardMarkup]:
+    """
+    Ro'yxat sahifasi va uning klaviaturasi (keshdan yoki DB dan).
+    Kalitda bo'lim versiyasi bor: bo'lim o'zgarsa eski sahifalar o'z-o'zidan ishlatilmay qoladi.
+    Kesh to'ldiriladigan sahifa primary'dan o'qiladi: versiya yozuvdan keyin oshadi, orqada qolgan
+    secondary esa eski sahifani qaytarib, uni yangi versiya ostida TTL davomida keshlatib qo'yishi mumkin.
     """
-    Masalan: 'admin_cats:1-25' bosilganda shu bo'limdagi triggerlarni chiqaradi.
+    cache_key = (category, direction, cursor, db.category_versions.get(category))
+    cached = keyboard_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    page = None
+    doc_id = unpack_id(cursor) if cursor else None
+    boundary = await db.get_trigger_by_id(doc_id) if doc_id is not None else None
+    if boundary is not None:
+        if direction == TriggerAction.PREV:
+            page = await db.get_trigger_page(category, before=boundary.trigger, primary=True)
+        else:
+            page = await db.get_trigger_page(category, after=boundary.trigger, primary=True)
+
+    # Chegaradagi triggerlar o'chirilgan bo'lsa, birinchi sahifaga qaytamiz
+    if page is None or not page.triggers:
+        page = await db.get_trigger_page(category, primary=True)
+    rendered = page, get_trigger_list_keyboard(page, category)
+    keyboard_cache.put(cache_key, rendered)
+    return rendered
+
+# --- 1. BO'LIM TANLANGANDA RO'YXATNI CHIQARISH (yoki tafsilotlardan ro'yxatga qaytish) ---
+@edit_trigger_router.callback_query(CategoryCallback.filter())
+async def show_trigger_list(call: CallbackQuery, callback_data: CategoryCallback, db: MongoService, keyboard_cache: KeyboardCache):
     """
-    # Callbackdan bo'lim nomini ajratib olamiz
-    category = call.data.split(":")[1]
+    Masalan: 'cat:1-25' bosilganda shu bo'limdagi triggerlarni chiqaradi.
+    """
+    category = callback_data.name
     
-    # DB dan shu bo'limga tegishli triggerlarni olamiz
-    triggers = await db_service.get_triggers_by_category(category)
+    # Shu bo'limning faqat birinchi sahifasi va klaviaturasi
+    page, keyboard = await render_trigger_list(db, keyboard_cache, category)
     
-    if not triggers:
+    if not page.triggers:
         await call.answer("Bu bo'limda hali triggerlar yo'q.")
         return
-
-    # Klaviatura yaratish (0-sahifa)
-    keyboard = get_trigger_list_keyboard(triggers, category, page=0)
     
     await call.message.edit_text(
         f"📂 <b>Bo'lim: {category}</b>\n\nTriggerlardan birini tanlang:",
@@ -40,17 +83,16 @@ async def show_trigger_list(call: CallbackQuery):
     await call.answer()
 
 # --- 2. PAGINATION (SAHIFALASH) ---
-@edit_trigger_router.callback_query(F.data.startswith(f"{TriggerAction.PAGE}:"))
-async def paginate_trigger_list(call: CallbackQuery):
+@edit_trigger_router.callback_query(TriggerPageCallback.filter())
+async def paginate_trigger_list(
+    call: CallbackQuery, callback_data: TriggerPageCallback, db: MongoService, keyboard_cache: KeyboardCache
+):
     """
     Oldinga/Orqaga tugmalari bosilganda ishlaydi.
-    Data formati: 'tr_page:CATEGORY:PAGE_NUM'
+    Cursor — sahifa chegarasidagi triggerning id si; uning kaliti bo'yicha keyset sahifa olinadi.
     """
-    _, category, page_str = call.data.split(":")
-    page = int(page_str)
-    
-    triggers = await db_service.get_triggers_by_category(category)
-    keyboard = get_trigger_list_keyboard(triggers, category, page=page)
+    category = callback_data.category
+    _, keyboard = await render_trigger_list(db, keyboard_cache, category, callback_data.direction, callback_data.cursor)
     
     await call.message.edit_text(
         f"📂 <b>Bo'lim: {category}</b>\n\nTriggerlardan birini tanlang:",
@@ -59,18 +101,13 @@ async def paginate_trigger_list(call: CallbackQuery):
     await call.answer()
 
 # --- 3. TRIGGER TAFSILOTLARINI KO'RISH ---
-@edit_trigger_router.callback_query(F.data.startswith(f"{TriggerAction.SELECT}:"))
-async def show_trigger_details(call: CallbackQuery):
+@edit_trigger_router.callback_query(TriggerCallback.filter(F.action == TriggerAction.SELECT))
+async def show_trigger_details(call: CallbackQuery, callback_data: TriggerCallback, db: MongoService):
     """
     Trigger bosilganda uning tafsilotlari va boshqaruv tugmalari chiqadi.
-    Data formati: 'tr_sel:TRIGGER_KEY'
     """
-    trigger_key = call.data.split(":", 1)[1]
-    
-    trigger = await db_service.get_trigger(trigger_key)
+    trigger = await load_trigger(call, callback_data, db)
     if not trigger:
-        await call.answer("Trigger topilmadi (o'chirilgan bo'lishi mumkin).", show_alert=True)
-        # Ro'yxatni yangilash mantiqan to'g'ri bo'lardi, lekin hozircha shunchaki qaytamiz
         return
 
     # Tafsilotlar matni
@@ -83,42 +120,41 @@ async def show_trigger_details(call: CallbackQuery):
     )
     
     category = trigger.category if trigger.category else "Umumiy"
-    keyboard = get_trigger_detail_keyboard(trigger_key, category)
+    keyboard = get_trigger_detail_keyboard(callback_data.id, category)
     
     await call.message.edit_text(info_text, reply_markup=keyboard)
     await call.answer()
 
 # --- 4. O'CHIRISHNI SO'RASH ---
-@edit_trigger_router.callback_query(F.data.startswith(f"{TriggerAction.DELETE}:"))
-async def ask_delete_trigger(call: CallbackQuery):
-    trigger_key = call.data.split(":", 1)[1]
-    
-    # Triggerni qayta olamiz (category kerak bo'ladi orqaga qaytish uchun)
-    trigger = await db_service.get_trigger(trigger_key)
-    category = trigger.category if trigger and trigger.category else "Umumiy"
+@edit_trigger_router.callback_query(TriggerCallback.filter(F.action == TriggerAction.DELETE))
+async def ask_delete_trigger(call: CallbackQuery, callback_data: TriggerCallback, db: MongoService):
+    trigger = await load_trigger(call, callback_data, db)
+    if not trigger:
+        return
     
     await call.message.edit_text(
-        f"🗑 <b>Haqiqatan ham '{trigger_key}' triggerini o'chirmoqchimisiz?</b>",
-        reply_markup=get_delete_confirm_keyboard(trigger_key, category)
+        f"🗑 <b>Haqiqatan ham '{trigger.trigger}' triggerini o'chirmoqchimisiz?</b>",
+        reply_markup=get_delete_confirm_keyboard(callback_data.id)
     )
     await call.answer()
 
 # --- 5. O'CHIRISHNI TASDIQLASH ---
-@edit_trigger_router.callback_query(F.data.startswith(f"{TriggerAction.DELETE_CONFIRM}:"))
-async def confirm_delete_trigger(call: CallbackQuery):
-    trigger_key = call.data.split(":", 1)[1]
-    
+@edit_trigger_router.callback_query(TriggerCallback.filter(F.action == TriggerAction.DELETE_CONFIRM))
+async def confirm_delete_trigger(
+    call: CallbackQuery, callback_data: TriggerCallback, db: MongoService, keyboard_cache: KeyboardCache
+):
     # O'chirishdan oldin kategoriyani eslab qolamiz (ro'yxatga qaytish uchun)
-    trigger = await db_service.get_trigger(trigger_key)
-    category = trigger.category if trigger and trigger.category else "1-25" # Default fallback
+    trigger = await load_trigger(call, callback_data, db)
+    if not trigger:
+        return
+    category = trigger.category if trigger.category else "1-25" # Default fallback
     
-    success = await db_service.delete_trigger(trigger_key)
+    success = await db.delete_trigger(trigger.trigger)
     
     if success:
         await call.answer("✅ Trigger o'chirildi!", show_alert=True)
         # Ro'yxatga qaytamiz
-        triggers = await db_service.get_triggers_by_category(category)
-        keyboard = get_trigger_list_keyboard(triggers, category, page=0)
+        _, keyboard = await render_trigger_list(db, keyboard_cache, category)
         
         await call.message.edit_text(
             f"📂 <b>Bo'lim: {category}</b>\n\nTriggerlardan birini tanlang:",
@@ -127,22 +163,8 @@ async def confirm_delete_trigger(call: CallbackQuery):
     else:
         await call.answer("❌ Xatolik: Trigger o'chirilmay qoldi.", show_alert=True)
 
-# --- 6. RO'YXATGA QAYTISH (BACK) ---
-@edit_trigger_router.callback_query(F.data.startswith(f"{TriggerAction.BACK_TO_LIST}:"))
-async def back_to_list(call: CallbackQuery):
-    category = call.data.split(":", 1)[1]
-    
-    triggers = await db_service.get_triggers_by_category(category)
-    keyboard = get_trigger_list_keyboard(triggers, category, page=0)
-    
-    await call.message.edit_text(
-        f"📂 <b>Bo'lim: {category}</b>\n\nTriggerlardan birini tanlang:",
-        reply_markup=keyboard
-    )
-    await call.answer()
-
-# --- 7. TAHRIRLASH (TODO) ---
-@edit_trigger_router.callback_query(F.data.startswith(f"{TriggerAction.EDIT}:"))
+# --- 6. TAHRIRLASH (TODO) ---
+@edit_trigger_router.callback_query(TriggerCallback.filter(F.action == TriggerAction.EDIT))
 async def edit_trigger_placeholder(call: CallbackQuery):
     """
     Hozircha tahrirlash funksiyasi 'Yangi qo'shish' logikasiga o'xshash.
@@ -0,0 +1,135 @@
+import logging
+import os
+import tempfile
+from datetime import datetime
+
+from aiogram import Bot, Router, F
+from aiogram.types import Message, CallbackQuery, FSInputFile
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
+
+from db.mongo import MongoService
+from handlers.admin_menu import AdminStates, IsAdmin
+from keyboards.admin_main import AdminCallback, get_admin_main_keyboard
+from keyboards.import_export import (
+    ImportExportCallback,
+    get_import_export_keyboard,
+    get_import_cancel_keyboard
+)
+from utils.trigger_io import (
+    FORMAT_CSV,
+    FORMAT_JSONL,
+    ImportReport,
+    ProgressThrottle,
+    export_triggers,
+    import_triggers,
+    is_supported_file
+)
+
+import_export_router = Router(name="import_export")
+
+# Bot API orqali yuklab olinadigan faylning maksimal hajmi (20 MB)
+MAX_DOWNLOAD_SIZE = 20 * 1024 * 1024
+
+class ImportStates(StatesGroup):
+    WAITING_FOR_FILE = State()  # CSV/JSONL faylni kutish
+
+# --- MENYU ---
+@import_export_router.callback_query(F.data == AdminCallback.IMPORT_EXPORT, IsAdmin())
+async def show_import_export_menu(call: CallbackQuery):
+    await call.message.edit_text(
+        "📦 <b>Import/Export</b>\n\n"
+        "Triggerlarni fayl orqali ommaviy yuklash yoki yuklab olish.",
+        reply_markup=get_import_export_keyboard()
+    )
+    await call.answer()
+
+# --- IMPORT: FAYLNI SO'RASH ---
+@import_export_router.callback_query(F.data == ImportExportCallback.IMPORT, IsAdmin())
+async def ask_import_file(call: CallbackQuery, state: FSMContext):
+    await state.set_state(ImportStates.WAITING_FOR_FILE)
+    await call.message.edit_text(
+        "📥 <b>Import</b>\n\n"
+        "CSV yoki JSONL faylni hujjat sifatida yuboring (.gz ham mumkin, 20 MB gacha).\n"
+        "Maydonlar: <code>trigger, trigger_type, content_type, file_id</code>\n"
+        "Mavjud triggerlar yangilanadi, bo'limlar qayta hisoblanadi.",
+        reply_markup=get_import_cancel_keyboard()
+    )
+    await call.answer()
+
+# --- IMPORT: FAYLNI QABUL QILISH ---
+@import_export_router.message(ImportStates.WAITING_FOR_FILE)
+async def receive_import_file(message: Message, state: FSMContext, bot: Bot, db: MongoService):
+    document = message.document
+    if not document:
+        await message.answer("Iltimos, faylni hujjat (document) sifatida yuboring.", reply_markup=get_import_cancel_keyboard())
+        return
+
+    filename = document.file_name or ""
+    if not is_supported_file(filename):
+        await message.answer("⚠️ Faqat .csv, .jsonl (yoki .gz) fayllar qabul qilinadi.", reply_markup=get_import_cancel_keyboard())
+        return
+    if document.file_size and document.file_size > MAX_DOWNLOAD_SIZE:
+        await message.answer("⚠️ Fayl hajmi 20 MB dan oshmasligi kerak. Uni bo'laklarga ajrating.", reply_markup=get_import_cancel_keyboard())
+        return
+
+    status = await message.answer("⏳ Fayl yuklanmoqda...")
+    throttle = ProgressThrottle()
+
+    async def on_progress(report: ImportReport):
+        if throttle.ready():
+            await status.edit_text(
+                f"⏳ Import davom etmoqda...\n\n"
+                f"📄 {report.rows} qator o'qildi, ❌ {report.failed} ta xato"
+            )
+
+    # Fayl diskka yuklab olinadi va u yerdan qatorma-qator o'qiladi
+    fd, path = tempfile.mkstemp(suffix=os.path.basename(filename))
+    os.close(fd)
+    try:
+        await bot.download(document, destination=path)
+        report = await import_triggers(db, path, filename, progress=on_progress)
+    except Exception as e:
+        logging.error(f"Importda xato ({filename}): {e}")
+        await status.edit_text("❌ Importda xatolik yuz berdi. Fayl formatini tekshiring.")
+        return
+    finally:
+        os.remove(path)
+
+    await state.set_state(AdminStates.MAIN_MENU)
+    await status.edit_text(report.summary())
+    await message.answer("Bosh menyu:", reply_markup=get_admin_main_keyboard())
+
+# --- EXPORT ---
+@import_export_router.callback_query(F.data.in_([ImportExportCallback.EXPORT_JSONL, ImportExportCallback.EXPORT_CSV]), IsAdmin())
+async def export_all_triggers(call: CallbackQuery, db: MongoService):
+    """Butun kolleksiyani gzip fayl sifatida yuborish (zaxira nusxa / migratsiya uchun)."""
+    fmt = FORMAT_CSV if call.data == ImportExportCallback.EXPORT_CSV else FORMAT_JSONL
+    await call.answer("⏳ Eksport tayyorlanmoqda...")
+
+    try:
+        path, count = await export_triggers(db, fmt)
+    except Exception as e:
+        logging.error(f"Eksportda xato: {e}")
+        await call.message.answer("❌ Eksportda xatolik yuz berdi.")
+        return
+
+    filename = f"triggers-{datetime.now():%Y%m%d-%H%M}.{fmt}.gz"
+    try:
+        await call.message.answer_document(
+            FSInputFile(path, filename=filename),
+            caption=f"📤 {count} ta trigger eksport qilindi."
+        )
+    except Exception as e:
+        # Bot API orqali 50 MB dan katta fayl yuborib bo'lmaydi
+        logging.error(f"Eksport faylini yuborishda xato: {e}")
+        await call.message.answer("❌ Faylni yuborib bo'lmadi (hajmi juda katta bo'lishi mumkin).")
+    finally:
+        os.remove(path)
+
+# --- BEKOR QILISH ---
+@import_export_router.callback_query(F.data == ImportExportCallback.CANCEL)
+async def cancel_import(call: CallbackQuery, state: FSMContext):
+    await state.set_state(AdminStates.MAIN_MENU)
+    await call.message.edit_text("Bosh menyu. Iltimos, bo'limni tanlang:", reply_markup=get_admin_main_keyboard())
+    await call.answer()
\ No newline at end of file
@@ -1,66 +1,123 @@
+from typing import Union
 from aiogram import Router
-from aiogram.types import Message
+from aiogram.types import Message, FSInputFile
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.enums import ContentType as AiogramContentType # Aiogram turlari
+import html
 import logging
 
-from db.mongo import db_service
+from db.mongo import MongoService
 from db.models import ContentType as DBContentType # Bizning DB modelimizdagi turlar
+from db.trigger_stats import TriggerStats
+from db.users import UserRegistry
+from utils.media_store import MediaStore, is_dead_file_error
+from utils.metrics import TRIGGER_LOOKUPS
 
 # Foydalanuvchilar uchun alohida router
-user_router = Router()
+user_router = Router(name="user")
+
+async def send_trigger_content(message: Message, trigger_data, media: Union[str, FSInputFile]):
+    """
+    Trigger javobini yuborish.
+    media — Telegram file_id yoki lokal fayl (file_id yaroqsiz bo'lib qolganda).
+    """
+    content_type = trigger_data.content_type
+
+    if content_type == DBContentType.TEXT:
+        # Agar matn bo'lsa, file_id o'rnida matn saqlangan bo'ladi
+        await message.answer(media)
+
+    elif content_type == DBContentType.PHOTO:
+        await message.answer_photo(photo=media, caption=trigger_data.trigger)
+
+    elif content_type == DBContentType.VIDEO:
+        await message.answer_video(video=media, caption=trigger_data.trigger)
+
+    elif content_type == DBContentType.AUDIO:
+        await message.answer_audio(audio=media, caption=trigger_data.trigger)
+
+    elif content_type == DBContentType.VOICE:
+        await message.answer_voice(voice=media, caption=trigger_data.trigger)
+
+    elif content_type == DBContentType.DOCUMENT:
+        await message.answer_document(document=media, caption=trigger_data.trigger)
+
+    elif content_type == DBContentType.STICKER:
+        await message.answer_sticker(sticker=media)
+
+    else:
+        await message.answer("⚠️ Kechirasiz, bu kontent turi hozircha qo'llab-quvvatlanmaydi.")
 
 @user_router.message()
-async def handle_user_message(message: Message):
+async def handle_user_message(
+    message: Message,
+    db: MongoService,
+    media_store: MediaStore,
+    trigger_stats: TriggerStats,
+    users: UserRegistry,
+):
     """
     Foydalanuvchidan kelgan har qanday matnli xabarni qabul qiladi
     va DB dan mos triggerni qidiradi.
+    Servislar dispatcher workflow data orqali keladi (create_app).
     """
+    # E'lonlar uchun foydalanuvchini eslab qolamiz (faqat xotirada, fonda MongoDB ga yoziladi)
+    if message.chat.type == "private" and message.from_user:
+        users.touch(message.from_user)
+
     # Faqat matnli xabarlarni ko'rib chiqamiz
     if not message.text:
         return
 
     # Kalit so'zni tozalaymiz (bosh va oxiridagi bo'shliqlarni olib tashlaymiz)
     trigger_key = message.text.strip()
-    
-    # 1. DB dan qidirish
-    trigger_data = await db_service.get_trigger(trigger_key)
-    
+
+    # 1. Qidirish: matn normallashtiriladi (kirill/lotin, "№ 25", tinish belgilari),
+    # so'ng preload rejimida xotiradan, aks holda kesh/DB dan olinadi
+    trigger_data = await db.lookup_trigger(trigger_key)
+    suggestions = []
+    if trigger_data:
+        TRIGGER_LOOKUPS.inc(result="hit")
+    else:
+        # "Salom!" yoki xatoli yozilgan nomlar uchun xotiradagi indeksdan eng yaqin trigger
+        match = db.suggest_triggers(trigger_key)
+        if match.best is not None:
+            trigger_data = await db.lookup_trigger(match.best)
+        suggestions = match.suggestions
+        TRIGGER_LOOKUPS.inc(result="fuzzy" if trigger_data else "miss")
+
+    # Mashhurlik statistikasi (faqat xotirada, fonda MongoDB ga yoziladi)
+    if trigger_data:
+        trigger_stats.record_hit(trigger_data.trigger)
+    else:
+        trigger_stats.record_miss(trigger_key)
+
     # 2. Agar trigger topilsa, javob beramiz
     if trigger_data:
         file_id = trigger_data.file_id
-        content_type = trigger_data.content_type
-        
+
         try:
-            if content_type == DBContentType.TEXT:
-                # Agar matn bo'lsa, file_id o'rnida matn saqlangan bo'ladi
-                await message.answer(file_id)
-                
-            elif content_type == DBContentType.PHOTO:
-                await message.answer_photo(photo=file_id, caption=trigger_data.trigger)
-                
-            elif content_type == DBContentType.VIDEO:
-                await message.answer_video(video=file_id, caption=trigger_data.trigger)
-                
-            elif content_type == DBContentType.AUDIO:
-                await message.answer_audio(audio=file_id, caption=trigger_data.trigger)
-                
-            elif content_type == DBContentType.VOICE:
-                await message.answer_voice(voice=file_id, caption=trigger_data.trigger)
-                
-            elif content_type == DBContentType.DOCUMENT:
-                await message.answer_document(document=file_id, caption=trigger_data.trigger)
-                
-            elif content_type == DBContentType.STICKER:
-                await message.answer_sticker(sticker=file_id)
-                
-            else:
-                await message.answer("⚠️ Kechirasiz, bu kontent turi hozircha qo'llab-quvvatlanmaydi.")
-                
+            try:
+                await send_trigger_content(message, trigger_data, file_id)
+            except TelegramBadRequest as e:
+                # file_id yaroqsiz bo'lib qolgan: lokal nusxadan yuboramiz va fonda tiklaymiz
+                local_path = media_store.local_path(file_id) if is_dead_file_error(e) else None
+                if local_path is None:
+                    raise
+                logging.warning(f"Yaroqsiz file_id, lokal nusxa yuborilmoqda ({trigger_key})")
+                await send_trigger_content(message, trigger_data, FSInputFile(local_path))
+                media_store.schedule_repair(trigger_data.trigger, trigger_data.content_type, file_id)
+
         except Exception as e:
             logging.error(f"Trigger javobini yuborishda xato ({trigger_key}): {e}")
             await message.answer("⚠️ Texnik xatolik yuz berdi. Iltimos, keyinroq urinib ko'ring.")
-            
+
+    elif suggestions:
+        # 3. Bir nechta o'xshash trigger bo'lsa, ularni taklif qilamiz
+        lines = "\n".join(f"• <code>{html.escape(item)}</code>" for item in suggestions)
+        await message.answer(f"Afsuski, bunday buyruq topilmadi. 😕\nBalki shulardan birini nazarda tutgandirsiz:\n{lines}")
+
     else:
-        # 3. Agar trigger topilmasa
+        # 4. Agar trigger topilmasa
         # Kelajakda bu yerga "Default Reply" logikasini qo'shish mumkin
         await message.answer("Afsuski, bunday buyruq topilmadi. 😕")
\ No newline at end of file
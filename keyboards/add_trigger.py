@@ -1,5 +1,7 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
+from keyboards.render_cache import static_keyboard
+
 # Callback datalar uchun konstantalar
 class AddTriggerCallback:
     # Trigger turlari
@@ -22,6 +24,7 @@ class AddTriggerCallback:
     # Bekor qilish
     CANCEL = "cancel_wizard"
 
+@static_keyboard
 def get_trigger_type_keyboard() -> InlineKeyboardMarkup:
     """1-qadam: Trigger turini tanlash."""
     buttons = [
@@ -33,6 +36,7 @@ def get_trigger_type_keyboard() -> InlineKeyboardMarkup:
     ]
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
+@static_keyboard
 def get_content_type_keyboard() -> InlineKeyboardMarkup:
     """3-qadam: Javob turini tanlash."""
     buttons = [
@@ -55,6 +59,7 @@ def get_content_type_keyboard() -> InlineKeyboardMarkup:
     ]
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
+@static_keyboard
 def get_confirm_keyboard() -> InlineKeyboardMarkup:
     """5-qadam: Saqlashni tasdiqlash."""
     buttons = [
@@ -65,6 +70,7 @@ def get_confirm_keyboard() -> InlineKeyboardMarkup:
     ]
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
+@static_keyboard
 def get_cancel_keyboard() -> InlineKeyboardMarkup:
     """Faqat bekor qilish tugmasi (input kutilayotganda)."""
     buttons = [
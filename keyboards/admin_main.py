@@ -1,5 +1,8 @@
+from aiogram.filters.callback_data import CallbackData
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from typing import List
+from typing import List, Tuple
+
+from keyboards.render_cache import static_keyboard
 
 # Bosh menyu buttonlari uchun callback data prefixlari
 class AdminCallback:
@@ -9,8 +12,22 @@ class AdminCallback:
     IMPORT_EXPORT = "admin_import_export"
     ADMIN_LIST = "admin_admins"
     SETTINGS = "admin_settings"
+    TOP_TRIGGERS = "admin_top"
+    BROADCAST = "admin_broadcast"
     BACK = "back_to_menu"
 
+class CategoryCallback(CallbackData, prefix="cat"):
+    """Bo'lim ro'yxatini ochish: 'cat:1-25'."""
+    name: str
+
+class TopTriggersCallback(CallbackData, prefix="top"):
+    """Top triggerlar davri: 'top:7' — oxirgi 7 kun."""
+    days: int
+
+# Top triggerlar ekranidagi davrlar: (kunlar, tugma matni)
+TOP_PERIODS = ((1, "24 soat"), (7, "7 kun"), (30, "30 kun"))
+
+@static_keyboard
 def get_admin_main_keyboard() -> InlineKeyboardMarkup:
     """
     Admin paneli uchun asosiy menyu klaviaturasini yaratadi.
@@ -24,20 +41,36 @@ def get_admin_main_keyboard() -> InlineKeyboardMarkup:
             InlineKeyboardButton(text="📦 Import/Export", callback_data=AdminCallback.IMPORT_EXPORT),
             InlineKeyboardButton(text="👥 Adminlar", callback_data=AdminCallback.ADMIN_LIST),
         ],
+        [
+            InlineKeyboardButton(text="📊 Top triggerlar", callback_data=AdminCallback.TOP_TRIGGERS),
+            InlineKeyboardButton(text="📣 E'lon yuborish", callback_data=AdminCallback.BROADCAST),
+        ],
         [InlineKeyboardButton(text="⚙️ Sozlamalar", callback_data=AdminCallback.SETTINGS)],
     ]
     
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
-def get_categories_keyboard(categories: List[str]) -> InlineKeyboardMarkup:
+@static_keyboard
+def get_top_triggers_keyboard() -> InlineKeyboardMarkup:
+    """Top triggerlar ekrani: davrni tanlash va orqaga qaytish."""
+    buttons = [
+        [
+            InlineKeyboardButton(text=label, callback_data=TopTriggersCallback(days=days).pack())
+            for days, label in TOP_PERIODS
+        ],
+        [InlineKeyboardButton(text="⬅️ Orqaga", callback_data=AdminCallback.MAIN_MENU)],
+    ]
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+def get_categories_keyboard(categories: List[Tuple[str, int]]) -> InlineKeyboardMarkup:
     """
     Trigger bo'limlari ro'yxati uchun klaviatura yaratadi.
+    categories — (bo'lim nomi, triggerlar soni) juftliklari.
     """
     buttons = []
-    for cat in categories:
-        # Bo'lim nomlari button matni va callback datasi sifatida ishlatiladi
-        # Callback formati: "admin_cats:1-25"
-        buttons.append([InlineKeyboardButton(text=cat, callback_data=f"{AdminCallback.CATEGORIES}:{cat}")])
+    for cat, count in categories:
+        # Bo'lim nomi callback datasi sifatida ishlatiladi, tugmada esa soni ham ko'rinadi
+        buttons.append([InlineKeyboardButton(text=f"{cat} ({count})", callback_data=CategoryCallback(name=cat).pack())])
         
     buttons.append([InlineKeyboardButton(text="⬅️ Orqaga", callback_data=AdminCallback.MAIN_MENU)])
     
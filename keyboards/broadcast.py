@@ -0,0 +1,39 @@
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+
+from keyboards.render_cache import static_keyboard
+
+# E'lon yuborish bo'limi uchun callback datalar
+class BroadcastCallback:
+    CONFIRM = "bc_confirm"
+    CANCEL = "bc_cancel"
+
+class BroadcastStopCallback(CallbackData, prefix="bc_stop"):
+    """Ishlayotgan e'lonni to'xtatish: 'bc_stop:<job id>'."""
+    job_id: str
+
+@static_keyboard
+def get_broadcast_cancel_keyboard() -> InlineKeyboardMarkup:
+    """E'lon xabari kutilayotganda faqat bekor qilish tugmasi."""
+    buttons = [
+        [InlineKeyboardButton(text="❌ Bekor qilish", callback_data=BroadcastCallback.CANCEL)]
+    ]
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+@static_keyboard
+def get_broadcast_confirm_keyboard() -> InlineKeyboardMarkup:
+    """Yuborishdan oldin tasdiqlash."""
+    buttons = [
+        [
+            InlineKeyboardButton(text="✅ Yuborish", callback_data=BroadcastCallback.CONFIRM),
+            InlineKeyboardButton(text="❌ Bekor qilish", callback_data=BroadcastCallback.CANCEL),
+        ]
+    ]
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+def get_broadcast_progress_keyboard(job_id: str) -> InlineKeyboardMarkup:
+    """Holat xabari ostidagi to'xtatish tugmasi."""
+    buttons = [
+        [InlineKeyboardButton(text="⛔ To'xtatish", callback_data=BroadcastStopCallback(job_id=job_id).pack())]
+    ]
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
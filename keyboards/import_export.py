@@ -0,0 +1,32 @@
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+
+from keyboards.admin_main import AdminCallback
+from keyboards.render_cache import static_keyboard
+
+# Import/Export menyusi uchun callback datalar
+class ImportExportCallback:
+    IMPORT = "ie_import"
+    EXPORT_JSONL = "ie_export_jsonl"
+    EXPORT_CSV = "ie_export_csv"
+    CANCEL = "ie_cancel"
+
+@static_keyboard
+def get_import_export_keyboard() -> InlineKeyboardMarkup:
+    """Import/Export bo'limining asosiy menyusi."""
+    buttons = [
+        [InlineKeyboardButton(text="📥 Import (CSV/JSONL)", callback_data=ImportExportCallback.IMPORT)],
+        [
+            InlineKeyboardButton(text="📤 Export JSONL", callback_data=ImportExportCallback.EXPORT_JSONL),
+            InlineKeyboardButton(text="📤 Export CSV", callback_data=ImportExportCallback.EXPORT_CSV),
+        ],
+        [InlineKeyboardButton(text="⬅️ Orqaga", callback_data=AdminCallback.MAIN_MENU)],
+    ]
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+@static_keyboard
+def get_import_cancel_keyboard() -> InlineKeyboardMarkup:
+    """Fayl kutilayotganda faqat bekor qilish tugmasi."""
+    buttons = [
+        [InlineKeyboardButton(text="❌ Bekor qilish", callback_data=ImportExportCallback.CANCEL)]
+    ]
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
\ No newline at end of file
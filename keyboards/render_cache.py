@@ -0,0 +1,62 @@
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+from aiogram.types import InlineKeyboardMarkup
+
+from config import CONFIG
+
+def static_keyboard(build: Callable[[], InlineKeyboardMarkup]) -> Callable[[], InlineKeyboardMarkup]:
+    """
+    O'zgarmas klaviatura: import paytida bir marta quriladi, keyin har safar o'sha obyekt qaytadi.
+    aiogram markup obyektini o'zgartirmaydi, shuning uchun uni bo'lishish xavfsiz.
+    """
+    markup = build()
+
+    @wraps(build)
+    def get() -> InlineKeyboardMarkup:
+        return markup
+
+    return get
+
+class KeyboardCache:
+    """
+    Tayyor klaviaturalar uchun LRU + TTL keshi.
+    Kalitga ma'lumot versiyasi kiradi: versiya oshganda eski yozuvlar shunchaki ishlatilmay qoladi
+    va LRU bo'yicha chiqib ketadi. TTL change stream bo'lmagan holat uchun (boshqa replikalar o'zgarishi).
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: Hashable, value: Any):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+def create_keyboard_cache() -> KeyboardCache:
+    """Trigger ro'yxati sahifalari: (bo'lim, yo'nalish, cursor, bo'lim versiyasi) -> (TriggerPage, klaviatura)."""
+    return KeyboardCache(max_size=CONFIG.KEYBOARD_CACHE_SIZE, ttl=CONFIG.KEYBOARD_CACHE_TTL)
@@ -1,81 +1,93 @@
+from aiogram.filters.callback_data import CallbackData
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from typing import List
 
-from db.models import Trigger
-from keyboards.admin_main import AdminCallback
+from db.models import TriggerPage, pack_id
+from keyboards.admin_main import AdminCallback, CategoryCallback
 
 class TriggerAction:
-    """Trigger ustida bajariladigan amallar uchun callback prefixlari."""
-    SELECT = "tr_sel"   # Triggerni tanlash
-    DELETE = "tr_del"   # O'chirish
-    DELETE_CONFIRM = "tr_del_y" # O'chirishni tasdiqlash
-    EDIT = "tr_edit"    # Tahrirlash
-    PAGE = "tr_page"    # Sahifalash (Pagination)
-    BACK_TO_LIST = "tr_back_list" # Ro'yxatga qaytish
+    """Trigger ustida bajariladigan amallar (TriggerCallback.action qiymatlari)."""
+    SELECT = "sel"      # Triggerni tanlash
+    DELETE = "del"      # O'chirish
+    DELETE_CONFIRM = "del_y" # O'chirishni tasdiqlash
+    EDIT = "edit"       # Tahrirlash
+    NEXT = "n"          # Keyingi sahifa yo'nalishi
+    PREV = "p"          # Oldingi sahifa yo'nalishi
 
-def get_trigger_list_keyboard(triggers: List[Trigger], category: str, page: int = 0, page_size: int = 25) -> InlineKeyboardMarkup:
+class TriggerCallback(CallbackData, prefix="tr"):
     """
-    Berilgan bo'limdagi triggerlar ro'yxatini sahifalab chiqaradi.
+    Trigger ustidagi amal: 'tr:sel:<id>'.
+    Trigger matni emas, uning _id si (pack_id, 16 belgi) yuboriladi —
+    har qanday uzunlikdagi trigger 64 baytlik cheklovga sig'adi.
+    """
+    action: str
+    id: str
+
+class TriggerPageCallback(CallbackData, prefix="tp"):
+    """Sahifalash: 'tp:1-25:n:<chegaradagi trigger id si>'."""
+    category: str
+    direction: str
+    cursor: str
+
+def get_trigger_list_keyboard(page: TriggerPage, category: str) -> InlineKeyboardMarkup:
+    """
+    Berilgan bo'limdagi triggerlarning bitta sahifasini chiqaradi.
+    Sahifalash keyset usulida: tugmada sahifa raqami emas, chegaradagi trigger kaliti yuriladi.
     """
     builder = InlineKeyboardBuilder()
     
-    # 1. Triggerlarni qirqib olamiz (Pagination logic)
-    start_index = page * page_size
-    end_index = start_index + page_size
-    current_page_triggers = triggers[start_index:end_index]
-    
-    # 2. Har bir trigger uchun tugma yaratamiz
-    for trigger in current_page_triggers:
-        # Tugmada trigger nomi (kaliti) ko'rinadi
+    # 1. Har bir trigger uchun tugma yaratamiz
+    for trigger_key, doc_id in zip(page.triggers, page.ids):
+        # Tugmada trigger nomi (kaliti) ko'rinadi, callback da esa faqat qisqa id
         builder.row(InlineKeyboardButton(
-            text=f"🔹 {trigger.trigger}", 
-            callback_data=f"{TriggerAction.SELECT}:{trigger.trigger}"
+            text=f"🔹 {trigger_key}", 
+            callback_data=TriggerCallback(action=TriggerAction.SELECT, id=pack_id(doc_id)).pack()
         ))
     
-    # 3. Pagination tugmalari (Oldinga / Orqaga)
+    # 2. Pagination tugmalari (Oldinga / Orqaga): chegaradagi triggerning id si yuriladi
     pagination_buttons = []
-    if page > 0:
+    if page.has_prev and page.ids:
         pagination_buttons.append(InlineKeyboardButton(
             text="⬅️ Oldingi", 
-            callback_data=f"{TriggerAction.PAGE}:{category}:{page-1}"
+            callback_data=TriggerPageCallback(category=category, direction=TriggerAction.PREV, cursor=pack_id(page.ids[0])).pack()
         ))
     
-    if end_index < len(triggers):
+    if page.has_next and page.ids:
         pagination_buttons.append(InlineKeyboardButton(
             text="Keyingi ➡️", 
-            callback_data=f"{TriggerAction.PAGE}:{category}:{page+1}"
+            callback_data=TriggerPageCallback(category=category, direction=TriggerAction.NEXT, cursor=pack_id(page.ids[-1])).pack()
         ))
     
     if pagination_buttons:
         builder.row(*pagination_buttons)
     
-    # 4. Orqaga (Bo'limlar menyusiga)
+    # 3. Orqaga (Bo'limlar menyusiga)
     builder.row(InlineKeyboardButton(text="🔙 Bo'limlarga qaytish", callback_data=AdminCallback.CATEGORIES))
     
     return builder.as_markup()
 
-def get_trigger_detail_keyboard(trigger_key: str, category: str) -> InlineKeyboardMarkup:
+def get_trigger_detail_keyboard(trigger_id: str, category: str) -> InlineKeyboardMarkup:
     """
     Bitta trigger tanlanganda chiqadigan boshqaruv tugmalari.
+    trigger_id — pack_id natijasi.
     """
     buttons = [
         [
-            InlineKeyboardButton(text="✏️ Tahrirlash", callback_data=f"{TriggerAction.EDIT}:{trigger_key}"),
-            InlineKeyboardButton(text="🗑 O'chirish", callback_data=f"{TriggerAction.DELETE}:{trigger_key}")
+            InlineKeyboardButton(text="✏️ Tahrirlash", callback_data=TriggerCallback(action=TriggerAction.EDIT, id=trigger_id).pack()),
+            InlineKeyboardButton(text="🗑 O'chirish", callback_data=TriggerCallback(action=TriggerAction.DELETE, id=trigger_id).pack())
         ],
-        [InlineKeyboardButton(text="🔙 Ro'yxatga qaytish", callback_data=f"{TriggerAction.BACK_TO_LIST}:{category}")]
+        [InlineKeyboardButton(text="🔙 Ro'yxatga qaytish", callback_data=CategoryCallback(name=category).pack())]
     ]
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
-def get_delete_confirm_keyboard(trigger_key: str, category: str) -> InlineKeyboardMarkup:
+def get_delete_confirm_keyboard(trigger_id: str) -> InlineKeyboardMarkup:
     """
     O'chirishni tasdiqlash menyusi.
     """
     buttons = [
         [
-            InlineKeyboardButton(text="✅ Ha, o'chirish", callback_data=f"{TriggerAction.DELETE_CONFIRM}:{trigger_key}"),
-            InlineKeyboardButton(text="❌ Bekor qilish", callback_data=f"{TriggerAction.SELECT}:{trigger_key}")
+            InlineKeyboardButton(text="✅ Ha, o'chirish", callback_data=TriggerCallback(action=TriggerAction.DELETE_CONFIRM, id=trigger_id).pack()),
+            InlineKeyboardButton(text="❌ Bekor qilish", callback_data=TriggerCallback(action=TriggerAction.SELECT, id=trigger_id).pack())
         ]
     ]
     return InlineKeyboardMarkup(inline_keyboard=buttons)
\ No newline at end of file
@@ -1,96 +1,394 @@
+import time
+# Importlar vaqti ishga tushish hisobotida ko'rsatiladi
+IMPORT_STARTED = time.perf_counter()
+
 import sys
+import asyncio
 import logging
+import socket
+from functools import partial
+from typing import Optional
 from aiohttp import web
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 
 # Loyiha modullari
-from config import CONFIG
-from db.mongo import db_service
+from config import CONFIG, Settings
+from db.mongo import MongoService
+from db.fsm_storage import MongoStorage, create_fsm_storage
+from db.migrations import run_migrations
+from db.trigger_stats import TriggerStats, create_trigger_stats
+from db.users import UserRegistry, create_user_registry
+from keyboards.render_cache import create_keyboard_cache
+from utils.broadcast import Broadcaster, create_broadcaster
+from utils.media_store import MediaStore, create_media_store
+from utils.send_queue import SendQueue, create_send_queue
+from utils.metrics import REGISTRY, SEND_QUEUE_DEPTH, TRIGGER_CACHE
+from middlewares.metrics import HandlerLatencyMiddleware, UpdateLatencyMiddleware
+from middlewares.throttling import ThrottlingMiddleware, create_throttling_middleware
+from middlewares.drain import UpdateDrain
+from utils.update_pool import UpdatePool
+from utils.prefork import serve_prefork
+from utils.startup_timer import StartupTimer
 
 # Biz yaratgan routerlarni import qilamiz
 from handlers.admin_menu import admin_router
 from handlers.add_trigger import add_trigger_router
 from handlers.edit_trigger import edit_trigger_router
+from handlers.import_export import import_export_router
+from handlers.broadcast import broadcast_router
 from handlers.user_handler import user_router
 
+IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
+
 # Logging sozlash
 logging.basicConfig(level=logging.INFO, stream=sys.stdout)
 
-# Bot va Dispatcher obyektlari
-bot = Bot(token=CONFIG.BOT_TOKEN, parse_mode=ParseMode.HTML)
-dp = Dispatcher()
-
-# --- ROUTERLARNI ULASH ---
+# --- ROUTERLAR ---
 # Tartib juda muhim! Maxsus handlerlar oldin, umumiy handlerlar keyin turishi kerak.
+ROUTERS = (
+    # 1. Admin menyusi va navigatsiyasi
+    admin_router,
+    # 2. Yangi trigger qo'shish (Wizard)
+    add_trigger_router,
+    # 3. Triggerlarni tahrirlash va o'chirish
+    edit_trigger_router,
+    # 4. Import/Export (CSV/JSONL fayllar)
+    import_export_router,
+    # 5. E'lon yuborish (barcha foydalanuvchilarga)
+    broadcast_router,
+    # 6. Oddiy foydalanuvchi handlerlari (Trigger qidirish)
+    # DIQQAT: Bu router eng oxirida bo'lishi kerak, chunki u barcha matnli xabarlarni ushlaydi (@user_router.message())
+    user_router,
+)
 
-# 1. Admin menyusi va navigatsiyasi
-dp.include_router(admin_router)
+def used_update_types() -> list:
+    """Handlerlar ishlatadigan update turlari (dispatcher yaratmasdan, supervisor uchun ham)."""
+    return sorted(set().union(*(router.resolve_used_update_types() for router in ROUTERS)))
 
-# 2. Yangi trigger qo'shish (Wizard)
-dp.include_router(add_trigger_router)
+def create_bot(settings: Settings) -> Bot:
+    # Bot API manzili: lokal telegram-bot-api server yoki yuklama testidagi stub
+    session = AiohttpSession(api=TelegramAPIServer.from_base(settings.TELEGRAM_API_URL)) if settings.TELEGRAM_API_URL else None
+    return Bot(token=settings.BOT_TOKEN, parse_mode=ParseMode.HTML, session=session)
 
-# 3. Triggerlarni tahrirlash va o'chirish
-dp.include_router(edit_trigger_router)
-
-# 4. Oddiy foydalanuvchi handlerlari (Trigger qidirish)
-# DIQQAT: Bu router eng oxirida bo'lishi kerak, chunki u barcha matnli xabarlarni ushlaydi (@user_router.message())
-dp.include_router(user_router)
+# --- STARTUP / SHUTDOWN ---
 
+async def register_webhook(bot: Bot):
+    """
+    Webhookni faqat manzil yoki update turlari o'zgargan bo'lsa o'rnatish.
+    Deploy paytida yig'ilgan update lar saqlanadi (drop_pending_updates ishlatilmaydi),
+    webhook esa to'xtashda o'chirilmaydi: yangi replika ularni qabul qiladi.
+    """
+    allowed_updates = used_update_types()
+    info = await bot.get_webhook_info()
+    if info.url == CONFIG.WEBHOOK_URL and set(info.allowed_updates or []) == set(allowed_updates):
+        logging.info(f"Webhook o'zgarmagan ({info.pending_update_count} ta update kutmoqda)")
+        return
+    await bot.set_webhook(CONFIG.WEBHOOK_URL, allowed_updates=allowed_updates)
+    logging.info(f"🚀 Webhook o'rnatildi: {CONFIG.WEBHOOK_URL}")
 
-# --- STARTUP / SHUTDOWN ---
+async def on_startup(
+    bot: Bot,
+    dispatcher: Dispatcher,
+    db: MongoService,
+    media_store: MediaStore,
+    send_queue: SendQueue,
+    trigger_stats: TriggerStats,
+    users: UserRegistry,
+    broadcaster: Broadcaster,
+    update_pool: Optional[UpdatePool],
+    startup_timer: StartupTimer,
+    manage_webhook: bool,
+    background_jobs: bool,
+):
+    """Bot ishga tushganda bajariladigan ishlar (argumentlar dispatcher workflow data dan keladi)"""
+    # Chiquvchi xabarlar navbati worker'larini ishga tushirish
+    send_queue.start()
+    if update_pool is not None:
+        update_pool.start()
 
-async def on_startup(bot: Bot):
-    """Bot ishga tushganda bajariladigan ishlar"""
     # 1. DB indekslarini yaratish (tezkor qidiruv uchun)
-    await db_service.create_indexes()
-    
-    # 2. Webhookni o'rnatish
-    # drop_pending_updates=True -> Bot o'chiq payti yig'ilib qolgan eski xabarlarni tashlab yuboradi
-    await bot.set_webhook(CONFIG.WEBHOOK_URL, drop_pending_updates=True)
-    
-    logging.info(f"🚀 Bot ishga tushdi! Webhook: {CONFIG.WEBHOOK_URL}")
+    with startup_timer.phase("indexes"):
+        await db.create_indexes()
+        if isinstance(dispatcher.storage, MongoStorage):
+            await dispatcher.storage.create_indexes()
+        await trigger_stats.create_indexes()
+        await users.create_indexes()
+        await broadcaster.create_indexes()
+    # Eski triggerlarni joriy sxemaga o'tkazish (yangi hujjat bo'lmasa tezda tugaydi).
+    # Ko'p jarayonli rejimda faqat bitta worker bajaradi.
+    if background_jobs:
+        with startup_timer.phase("migrations"):
+            await run_migrations(db)
+
+    # Boshqa replikalardagi o'zgarishlarni kuzatib, trigger keshini yangilab turish.
+    # TRIGGER_PRELOAD yoqilgan bo'lsa, butun kolleksiya xotiraga yuklanadi.
+    db.start_watching(preload=CONFIG.TRIGGER_PRELOAD)
+
+    # Media fayllarning lokal nusxalari va file_id tekshiruvi (fon rejimida, tekshiruv bitta jarayonda)
+    media_store.start(bot, db, verify=background_jobs)
+    # Trigger hit/miss hisoblagichlarini davriy yozish
+    trigger_stats.start()
+    users.start()
+    # To'xtab qolgan e'lonlarni checkpoint dan davom ettirish
+    broadcaster.start(bot)
+
+    # 2. Webhookni o'rnatish (ko'p jarayonli rejimda buni supervisor bir marta qiladi)
+    if manage_webhook:
+        with startup_timer.phase("webhook"):
+            await register_webhook(bot)
+
+    logging.info("🚀 Bot ishga tushdi!")
     logging.info(f"Adminlar: {CONFIG.ADMIN_IDS}")
+    startup_timer.report()
+
+async def on_shutdown(
+    bot: Bot,
+    dispatcher: Dispatcher,
+    db: MongoService,
+    media_store: MediaStore,
+    send_queue: SendQueue,
+    trigger_stats: TriggerStats,
+    users: UserRegistry,
+    broadcaster: Broadcaster,
+    update_pool: Optional[UpdatePool],
+    drain: UpdateDrain,
+    throttling: ThrottlingMiddleware,
+):
+    """
+    Bot to'xtaganda (SIGTERM) bajariladigan ishlar.
+    Yangi update lar qabul qilinmaydi, ishlayotganlari CONFIG.SHUTDOWN_TIMEOUT gacha tugatiladi,
+    so'ng buferlar yoziladi va ulanishlar yopiladi.
+    """
+    deadline = time.monotonic() + CONFIG.SHUTDOWN_TIMEOUT
+    drain.stop_accepting()
+
+    # Navbatdagi va ishlayotgan update larni bajarib bo'lamiz
+    if update_pool is not None:
+        await update_pool.stop(timeout=CONFIG.SHUTDOWN_TIMEOUT)
+    await drain.wait(deadline - time.monotonic())
+
+    # E'lonlar joriy batch'ni tugatib, progressni saqlaydi (keyingi replika davom ettiradi)
+    await broadcaster.stop(deadline - time.monotonic())
+
+    # Xotiradagi hit/miss hisoblari va foydalanuvchilarni yozib qo'yamiz (update lar tugagandan keyin)
+    await trigger_stats.stop()
+    await users.stop()
+
+    # Kesh statistikasini yozib qo'yamiz va change stream'ni to'xtatamiz
+    logging.info(f"Trigger keshi: {db.cache.stats()}")
+    await db.stop_watching()
+    await media_store.stop()
+
+    # Navbatdagi xabarlarni yuborib bo'lamiz
+    logging.info(f"Yuborish navbati: {send_queue.stats()}")
+    await send_queue.stop()
+    await bot.session.close()
+
+    # FSM storage va throttling ulanishlarini yopish (Redis bo'lsa)
+    await dispatcher.storage.close()
+    await throttling.backend.close()
 
-async def on_shutdown(bot: Bot):
-    """Bot to'xtaganda bajariladigan ishlar"""
-    # Webhookni o'chirish
-    await bot.delete_webhook()
-    logging.info("🛑 Webhook o'chirildi")
-    
     # DB ulanishini yopish
-    db_service.client.close()
+    db.close()
     logging.info("MongoDB ulanishi yopildi")
 
-# --- MAIN SERVER ---
+# --- METRIKALAR ---
+
+def collect_runtime_metrics(db: MongoService, send_queue: SendQueue, update_pool: Optional[UpdatePool]):
+    """/metrics so'ralganda joriy holat gauge'larini yangilash."""
+    SEND_QUEUE_DEPTH.set(send_queue.depth)
+    for stat, value in db.cache.stats().items():
+        TRIGGER_CACHE.set(value, stat=stat)
+    if update_pool is not None:
+        update_pool.collect_metrics()
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    """Prometheus text formatidagi metrikalar."""
+    return web.Response(text=REGISTRY.render(), content_type="text/plain")
+
+def metrics_server(host: str, port: int, path: str):
+    """Worker metrikalari uchun alohida port (aiohttp cleanup_ctx: ilova bilan birga ochiladi va yopiladi)."""
+    async def serve(app: web.Application):
+        metrics_app = web.Application()
+        metrics_app.router.add_get(path, metrics_handler)
+        runner = web.AppRunner(metrics_app)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        logging.info(f"Metrikalar: http://{host}:{port}{path}")
+        yield
+        await runner.cleanup()
+    return serve
+
+# --- ILOVA ---
+
+def create_app(
+    settings: Settings,
+    manage_webhook: bool = True,
+    db: Optional[MongoService] = None,
+    timer: Optional[StartupTimer] = None,
+    background_jobs: bool = True,
+    worker_index: Optional[int] = None,
+) -> web.Application:
+    """
+    Bot, dispatcher, FSM storage va servislarni yaratib, aiohttp ilovasini qaytarish.
+    Servislar handlerlarga global o'zgaruvchilar orqali emas, dispatcher workflow data orqali
+    argument sifatida uzatiladi (db, media_store, trigger_stats, users, broadcaster, keyboard_cache).
+    Routerlar modul darajasida, shuning uchun bitta jarayonda bir marta chaqiriladi.
+
+    manage_webhook=False — prefork worker'lari uchun (webhookni supervisor o'rnatadi).
+    background_jobs=False — migratsiyalar va media tekshiruvi boshqa worker'da bajariladi.
+    worker_index — prefork worker raqami: metrikalar umumiy portda emas, METRICS_PORT + worker_index da.
+    db — oldindan tayyorlangan MongoService (masalan, yuklama testida to'ldirilgan baza).
+    timer — main() da importlar va Settings() o'qilishi o'lchangan taymer (bo'lmasa shu yerdan boshlanadi).
+    """
+    timer = timer or StartupTimer()
+    CONFIG.configure(settings)
+
+    with timer.phase("services"):
+        # MongoDB klienti birinchi so'rovda ochiladi
+        db = db or MongoService()
+        media_store = create_media_store()
+        trigger_stats = create_trigger_stats(db)
+        users = create_user_registry(db)
+        broadcaster = create_broadcaster(db, users)
+        send_queue = create_send_queue()
+
+    with timer.phase("bot"):
+        bot = create_bot(settings)
+        # Barcha chiquvchi xabarlar rate limit navbatidan o'tadi
+        bot.session.middleware(send_queue)
+
+    with timer.phase("dispatcher"):
+        drain = UpdateDrain(settings.WEBHOOK_PATH)
+        throttling = create_throttling_middleware()
+        # FSM holatlari CONFIG.FSM_STORAGE ga qarab xotira, Redis yoki MongoDB da saqlanadi
+        dp = Dispatcher(
+            storage=create_fsm_storage(db),
+            db=db,
+            media_store=media_store,
+            trigger_stats=trigger_stats,
+            users=users,
+            broadcaster=broadcaster,
+            send_queue=send_queue,
+            keyboard_cache=create_keyboard_cache(),
+            drain=drain,
+            throttling=throttling,
+            startup_timer=timer,
+            manage_webhook=manage_webhook,
+            background_jobs=background_jobs,
+        )
+
+        # --- MIDDLEWARELAR ---
+        # Eng tashqi qatlam: to'xtash paytida ishlayotgan update lar tugashini kutish uchun
+        dp.update.outer_middleware(drain)
+        # Butun update vaqti (outer) va har bir handler vaqti (inner, barcha routerlarga ta'sir qiladi)
+        dp.update.outer_middleware(UpdateLatencyMiddleware())
+        # Takroriy update lar va limitdan oshgan foydalanuvchilar handler va DB gacha yetib bormaydi
+        dp.update.outer_middleware(throttling)
+        dp.message.middleware(HandlerLatencyMiddleware())
+        dp.callback_query.middleware(HandlerLatencyMiddleware())
+
+        dp.include_routers(*ROUTERS)
+
+        # queue rejimida update lar webhook so'rovidan tashqarida, fon worker'larida bajariladi
+        update_pool = None
+        if settings.WEBHOOK_MODE == "queue":
+            update_pool = UpdatePool(
+                dispatcher=dp,
+                bot=bot,
+                workers=settings.UPDATE_WORKERS,
+                queue_size=settings.UPDATE_QUEUE_SIZE,
+                overload=settings.UPDATE_OVERLOAD,
+            )
+        dp["update_pool"] = update_pool
+
+        dp.startup.register(on_startup)
+        dp.shutdown.register(on_shutdown)
+
+    with timer.phase("app"):
+        # Aiohttp web ilovasini yaratish
+        app = web.Application(middlewares=[drain.web_middleware])
+
+        # Aiogram kontekstini sozlash: startup/shutdown workflow data bilan chaqiriladi.
+        # Webhook handleridan oldin ulanadi, shunda on_shutdown bot sessiyasi yopilishidan oldin bajariladi.
+        setup_application(app, dp, bot=bot)
+
+        # Webhook URL ga handlerni ulash (masalan: /webhook)
+        if update_pool is not None:
+            # Update darhol tasdiqlanadi va navbatga qo'yiladi
+            app.router.add_post(settings.WEBHOOK_PATH, update_pool.handle)
+        else:
+            # Dispatcher va Webhook handlerini sozlash
+            webhook_requests_handler = SimpleRequestHandler(
+                dispatcher=dp,
+                bot=bot,
+            )
+            webhook_requests_handler.register(app, path=settings.WEBHOOK_PATH)
+
+        # Prometheus metrikalari (masalan: /metrics)
+        if worker_index is None:
+            app.router.add_get(settings.METRICS_PATH, metrics_handler)
+        elif settings.METRICS_PORT is not None:
+            # Umumiy portda har bir scrape tasodifiy worker'ga tushib, hisoblagichlar sakrab turadi
+            REGISTRY.set_const_labels(worker=worker_index)
+            app.cleanup_ctx.append(metrics_server(
+                settings.WEB_SERVER_HOST, settings.METRICS_PORT + worker_index, settings.METRICS_PATH,
+            ))
+        REGISTRY.on_collect("runtime", partial(collect_runtime_metrics, db, send_queue, update_pool))
+    return app
+
+# --- KO'P JARAYONLI REJIM ---
+
+async def _register_once(settings: Settings):
+    """Supervisor'da webhookni bir marta o'rnatib, sessiyani yopish (fork'dan oldin)."""
+    bot = create_bot(settings)
+    try:
+        await register_webhook(bot)
+    finally:
+        await bot.session.close()
+
+def prefork_start(settings: Settings):
+    # Supervisor MongoDB klientini umuman ochmaydi, har bir worker birinchi so'rovda o'zinikini ochadi
+    CONFIG.configure(settings)
+    if settings.METRICS_PORT is None:
+        logging.warning("WEB_WORKERS > 1 va METRICS_PORT berilmagan: metrikalar o'chiq.")
+    asyncio.run(_register_once(settings))
+
+def run_worker(settings: Settings, sock: socket.socket, index: int):
+    """
+    Fork qilingan worker: o'z bot, MongoDB klienti va event loop'i bilan umumiy socket'ni tinglaydi.
+    Migratsiyalar va media tekshiruvi faqat #0 worker'da (umumiy MEDIA_CACHE_DIR va getFile limiti).
+    """
+    app = create_app(settings, manage_webhook=False, background_jobs=index == 0, worker_index=index)
+    web.run_app(app, sock=sock)
 
 def main():
-    # Aiohttp web ilovasini yaratish
-    app = web.Application()
-
-    # Dispatcher va Webhook handlerini sozlash
-    webhook_requests_handler = SimpleRequestHandler(
-        dispatcher=dp,
-        bot=bot,
-    )
-    
-    # Webhook URL ga handlerni ulash (masalan: /webhook)
-    webhook_requests_handler.register(app, path=CONFIG.WEBHOOK_PATH)
-    
-    # Aiogram kontekstini sozlash
-    setup_application(app, dp, bot=bot)
-
-    # Startup va Shutdown hodisalarini ulash
-    app.on_startup.append(lambda app: on_startup(bot))
-    app.on_shutdown.append(lambda app: on_shutdown(bot))
+    # Hisobot boshlanishi — main.py importi boshlangan payt
+    timer = StartupTimer(IMPORT_STARTED)
+    timer.add("imports", IMPORT_SECONDS)
+    # .env va muhit o'zgaruvchilarini o'qish va validatsiya
+    with timer.phase("settings"):
+        settings = Settings()
+    # settings.WEB_SERVER_PORT Railway tomonidan berilgan PORT (yoki default 8080) bo'ladi
+    if settings.WEB_WORKERS > 1:
+        serve_prefork(
+            host=settings.WEB_SERVER_HOST,
+            port=settings.WEB_SERVER_PORT,
+            workers=settings.WEB_WORKERS,
+            run_worker=partial(run_worker, settings),
+            on_start=partial(prefork_start, settings),
+        )
+        return
 
     # Serverni ishga tushirish
-    # CONFIG.WEB_SERVER_PORT Railway tomonidan berilgan PORT (yoki default 8080) bo'ladi
-    web.run_app(app, host=CONFIG.WEB_SERVER_HOST, port=CONFIG.WEB_SERVER_PORT)
+    web.run_app(create_app(settings, timer=timer), host=settings.WEB_SERVER_HOST, port=settings.WEB_SERVER_PORT)
 
 if __name__ == "__main__":
     try:
         main()
     except (KeyboardInterrupt, SystemExit):
-        logging.info("Bot manually stopped")
\ No newline at end of file
+        logging.info("Bot manually stopped")
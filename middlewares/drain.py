@@ -0,0 +1,58 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+from aiohttp import web
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from utils.metrics import UPDATES_DROPPED
+
+class UpdateDrain(BaseMiddleware):
+    """
+    Outer middleware (dp.update): bajarilayotgan update larni sanaydi.
+    To'xtash paytida webhook yangi update larni 503 bilan qaytaradi (Telegram ularni keyinroq
+    qayta yuboradi — yangi replikaga), ishlayotganlari esa timeout gacha tugatiladi.
+    """
+
+    def __init__(self, webhook_path: str):
+        self.webhook_path = webhook_path
+        self.accepting = True
+        self.active = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        self.active += 1
+        self._idle.clear()
+        try:
+            return await handler(event, data)
+        finally:
+            self.active -= 1
+            if not self.active:
+                self._idle.set()
+
+    @web.middleware
+    async def web_middleware(self, request: web.Request, handler):
+        """aiohttp middleware: to'xtash boshlangandan keyin webhook so'rovlarini qabul qilmaslik."""
+        if not self.accepting and request.path == self.webhook_path:
+            UPDATES_DROPPED.inc(reason="stopping")
+            return web.Response(status=503)
+        return await handler(request)
+
+    def stop_accepting(self):
+        self.accepting = False
+
+    async def wait(self, timeout: float) -> bool:
+        """Ishlayotgan update lar tugashini kutish; timeout da tugamasa False."""
+        try:
+            await asyncio.wait_for(self._idle.wait(), max(timeout, 0))
+        except asyncio.TimeoutError:
+            logging.warning(f"To'xtash vaqtida {self.active} ta update tugallanmay qoldi")
+            return False
+        return True
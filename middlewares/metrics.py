@@ -0,0 +1,47 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from utils.metrics import HANDLER_LATENCY, UPDATE_LATENCY
+
+class UpdateLatencyMiddleware(BaseMiddleware):
+    """
+    Outer middleware (dp.update): bitta update ni filtrlar va handler bilan birga
+    to'liq qayta ishlash vaqtini o'lchaydi.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        start = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            UPDATE_LATENCY.observe(time.perf_counter() - start, event_type=event.event_type)
+
+class HandlerLatencyMiddleware(BaseMiddleware):
+    """
+    Inner middleware: faqat tanlangan handler vaqtini router va handler nomi bilan o'lchaydi.
+    Dispatcher observer'iga ulanganda barcha ichki routerlarga ham ta'sir qiladi.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        handler_object = data.get("handler")
+        router = data.get("event_router")
+        handler_name = getattr(getattr(handler_object, "callback", None), "__name__", "unknown")
+        router_name = getattr(router, "name", "unknown")
+        start = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            HANDLER_LATENCY.observe(time.perf_counter() - start, router=router_name, handler=handler_name)
\ No newline at end of file
@@ -0,0 +1,169 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.exceptions import TelegramAPIError
+from aiogram.types import Chat, TelegramObject, Update, User
+
+from config import CONFIG
+from utils.metrics import UPDATES_DROPPED
+
+THROTTLE_NOTICE = "⏳ Juda ko'p xabar yuboryapsiz. Iltimos, biroz kutib qayta urinib ko'ring."
+
+class MemoryThrottleBackend:
+    """
+    Bitta jarayon uchun: takroriy update_id lar va foydalanuvchi limitlari xotirada.
+    Limit — sliding window counter: joriy va oldingi oyna hisoblari, oldingisi
+    oynaning qolgan ulushiga ko'paytiriladi (foydalanuvchiga 4 ta son, vaqt belgilari ro'yxati emas).
+    """
+
+    def __init__(self, dedup_ttl: float, dedup_size: int, max_users: int = 100_000):
+        self.dedup_ttl = dedup_ttl
+        self.dedup_size = dedup_size
+        self.max_users = max_users
+        # update_id -> tugash vaqti (qo'shilish tartibida, eskisi oldinda)
+        self._seen: "OrderedDict[int, float]" = OrderedDict()
+        # user_id -> [oyna boshi, oldingi oyna hisobi, joriy oyna hisobi, ogohlantirish muddati]
+        self._users: "OrderedDict[int, List[float]]" = OrderedDict()
+
+    async def seen(self, update_id: int) -> bool:
+        """update_id avval kelgan bo'lsa True, aks holda uni eslab qoladi."""
+        now = time.monotonic()
+        while self._seen:
+            oldest, expires = next(iter(self._seen.items()))
+            if expires > now and len(self._seen) < self.dedup_size:
+                break
+            del self._seen[oldest]
+        if update_id in self._seen:
+            return True
+        self._seen[update_id] = now + self.dedup_ttl
+        return False
+
+    async def hit(self, user_id: int, limit: int, window: float) -> Tuple[bool, bool]:
+        """(ruxsat berildimi, ogohlantirish yuborish kerakmi)."""
+        now = time.monotonic()
+        state = self._users.get(user_id)
+        if state is None:
+            state = [now, 0.0, 0.0, 0.0]
+            self._users[user_id] = state
+            if len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        else:
+            self._users.move_to_end(user_id)
+
+        elapsed = now - state[0]
+        if elapsed >= window:
+            # Bitta oyna o'tgan bo'lsa joriy hisob oldingiga aylanadi, ko'proq bo'lsa ikkalasi ham nol
+            state[1] = state[2] if elapsed < 2 * window else 0.0
+            state[2] = 0.0
+            state[0] = now - elapsed % window
+            elapsed = now - state[0]
+        estimate = state[1] * (1 - elapsed / window) + state[2]
+        if estimate < limit:
+            state[2] += 1
+            return True, False
+        if now >= state[3]:
+            state[3] = now + window
+            return False, True
+        return False, False
+
+    async def close(self):
+        pass
+
+class RedisThrottleBackend:
+    """
+    Bir nechta replika uchun umumiy holat (Redis).
+    update_id — SET NX EX, limit — ikki qat'iy oyna kalitidan sliding window counter.
+    """
+
+    def __init__(self, url: str, dedup_ttl: float, prefix: str = "throttle"):
+        # redis paketi faqat shu rejimda kerak
+        from redis.asyncio import Redis
+        self.redis = Redis.from_url(url)
+        self.dedup_ttl = dedup_ttl
+        self.prefix = prefix
+
+    async def seen(self, update_id: int) -> bool:
+        created = await self.redis.set(f"{self.prefix}:update:{update_id}", 1, nx=True, ex=int(self.dedup_ttl))
+        return not created
+
+    async def hit(self, user_id: int, limit: int, window: float) -> Tuple[bool, bool]:
+        now = time.time()
+        slot = int(now // window)
+        current_key = f"{self.prefix}:user:{user_id}:{slot}"
+        previous_key = f"{self.prefix}:user:{user_id}:{slot - 1}"
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.incr(current_key)
+            pipe.expire(current_key, int(window * 2) + 1)
+            pipe.get(previous_key)
+            current, _, previous = await pipe.execute()
+        # current allaqachon shu xabarni ham o'z ichiga oladi
+        estimate = int(previous or 0) * (1 - (now % window) / window) + current - 1
+        if estimate < limit:
+            return True, False
+        notify = await self.redis.set(f"{self.prefix}:notice:{user_id}", 1, nx=True, ex=max(1, int(window)))
+        return False, bool(notify)
+
+    async def close(self):
+        await self.redis.aclose()
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Outer middleware (dp.update):
+    1. Telegram qayta yuborgan (javob kechikkanda) update_id lar tashlab yuboriladi.
+    2. Foydalanuvchi window soniyada limit tadan ko'p update yuborsa, ortig'i handler va DB ga yetmaydi;
+       limit oshgan paytda bitta ogohlantirish yuboriladi, keyingilari jimgina tashlanadi.
+    Adminlar limitga kirmaydi.
+    """
+
+    def __init__(self, backend, limit: int, window: float, exempt_ids: Iterable[int] = ()):
+        self.backend = backend
+        self.limit = limit
+        self.window = window
+        self.exempt_ids = set(exempt_ids)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        if await self.backend.seen(event.update_id):
+            UPDATES_DROPPED.inc(reason="duplicate")
+            return None
+
+        user: Optional[User] = data.get("event_from_user")
+        if user is None or user.id in self.exempt_ids or self.limit <= 0:
+            return await handler(event, data)
+
+        allowed, notify = await self.backend.hit(user.id, self.limit, self.window)
+        if allowed:
+            return await handler(event, data)
+
+        UPDATES_DROPPED.inc(reason="throttled")
+        chat: Optional[Chat] = data.get("event_chat")
+        if notify and chat is not None and chat.type == "private":
+            await self._notify(data["bot"], chat.id)
+        return None
+
+    @staticmethod
+    async def _notify(bot: Bot, chat_id: int):
+        try:
+            await bot.send_message(chat_id, THROTTLE_NOTICE)
+        except TelegramAPIError as e:
+            logging.debug(f"Throttle ogohlantirishini yuborib bo'lmadi ({chat_id}): {e}")
+
+def create_throttling_middleware() -> ThrottlingMiddleware:
+    """CONFIG.THROTTLE_BACKEND bo'yicha middleware yaratish."""
+    if CONFIG.THROTTLE_BACKEND == "redis":
+        backend = RedisThrottleBackend(CONFIG.REDIS_URL, dedup_ttl=CONFIG.DEDUP_TTL)
+    else:
+        backend = MemoryThrottleBackend(dedup_ttl=CONFIG.DEDUP_TTL, dedup_size=CONFIG.DEDUP_MAX_SIZE)
+    return ThrottlingMiddleware(
+        backend,
+        limit=CONFIG.THROTTLE_RATE,
+        window=CONFIG.THROTTLE_WINDOW,
+        exempt_ids=CONFIG.ADMIN_IDS,
+    )
@@ -0,0 +1,88 @@
+"""
+MongoStorage testi (mongod o'rniga mongomock_motor).
+
+Repo ildizidan:
+    pip install pytest mongomock-motor
+    python -m pytest tests
+mongomock-motor o'rnatilmagan bo'lsa testlar o'tkazib yuboriladi.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+pytest.importorskip("aiogram")
+
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.base import StorageKey
+
+from db.fsm_storage import MongoStorage
+
+class WizardStates(StatesGroup):
+    STEP = State()
+
+KEY = StorageKey(bot_id=1, chat_id=100, user_id=100)
+
+def _storage() -> MongoStorage:
+    # MongoStorage faqat mongo.db ni ishlatadi
+    mongo = SimpleNamespace(db=mongomock_motor.AsyncMongoMockClient()["fsm_test"])
+    return MongoStorage(mongo, "fsm_states", state_ttl=60)
+
+def test_state_and_data_roundtrip():
+    async def scenario():
+        storage = _storage()
+        assert await storage.get_state(KEY) is None
+        assert await storage.get_data(KEY) == {}
+
+        await storage.set_state(KEY, WizardStates.STEP)
+        await storage.set_data(KEY, {"trigger_type": "numeric", "trigger_value": "25"})
+        assert await storage.get_state(KEY) == WizardStates.STEP.state
+        assert await storage.get_data(KEY) == {"trigger_type": "numeric", "trigger_value": "25"}
+
+        # Boshqa chat holati aralashmaydi
+        other = StorageKey(bot_id=1, chat_id=200, user_id=200)
+        assert await storage.get_state(other) is None
+
+        await storage.set_state(KEY, None)
+        assert await storage.get_state(KEY) is None
+        assert await storage.get_data(KEY) == {"trigger_type": "numeric", "trigger_value": "25"}
+
+    asyncio.run(scenario())
+
+def test_expired_state_is_ignored():
+    async def scenario():
+        storage = _storage()
+        await storage.set_state(KEY, WizardStates.STEP)
+        await storage.set_data(KEY, {"trigger_value": "salom"})
+
+        # TTL monitor hali o'chirmagan muddati o'tgan hujjat
+        await storage.collection.update_one(
+            {"_id": storage._build_key(KEY)},
+            {"$set": {"expires_at": datetime.utcnow() - timedelta(seconds=1)}},
+        )
+        assert await storage.get_state(KEY) is None
+        assert await storage.get_data(KEY) == {}
+
+        # Yangi yozuv muddatni uzaytiradi, lekin eski wizard ma'lumotini qaytarmaydi
+        await storage.set_state(KEY, WizardStates.STEP)
+        assert await storage.get_state(KEY) == WizardStates.STEP.state
+        assert await storage.get_data(KEY) == {}
+
+    asyncio.run(scenario())
+
+def test_expired_data_is_not_revived_by_set_data():
+    async def scenario():
+        storage = _storage()
+        await storage.set_state(KEY, WizardStates.STEP)
+        await storage.collection.update_one(
+            {"_id": storage._build_key(KEY)},
+            {"$set": {"expires_at": datetime.utcnow() - timedelta(seconds=1)}},
+        )
+
+        await storage.set_data(KEY, {"trigger_value": "salom"})
+        assert await storage.get_state(KEY) is None
+        assert await storage.get_data(KEY) == {"trigger_value": "salom"}
+
+    asyncio.run(scenario())
@@ -0,0 +1,45 @@
+"""
+normalize_trigger va lookup_keys testlari (tashqi paketlarsiz).
+
+Repo ildizidan:
+    python -m pytest tests
+"""
+import pytest
+
+from utils.normalize import lookup_keys, normalize_trigger
+
+@pytest.mark.parametrize("text, expected", [
+    ("№ 25", "25"),
+    ("25-qism", "25"),
+    ("Seriya 3 🔥", "3"),
+    ("007", "7"),
+    ("Kino 2", "2"),
+    ("САЛОМ!", "salom"),
+    ("Oʻzbek", "ozbek"),
+    ("Ерназар", "yernazar"),
+    ("1 va 2", "1 va 2"),
+    ("🔥🔥", ""),
+])
+def test_normalize_trigger(text, expected):
+    assert normalize_trigger(text) == expected
+
+def test_text_triggers_keep_numbers():
+    assert normalize_trigger("Kino 2", collapse_numbers=False) == "kino 2"
+    assert normalize_trigger("007", collapse_numbers=False) == "007"
+
+@pytest.mark.parametrize("text", ["²", "x³", "№ ②", "² qism"])
+def test_non_decimal_digits_do_not_raise(text):
+    # "²".isdigit() True, lekin int("²") ValueError beradi
+    assert normalize_trigger(text) == normalize_trigger(text, collapse_numbers=False)
+    assert lookup_keys(text) == [normalize_trigger(text)]
+
+@pytest.mark.parametrize("text, expected", [
+    ("Kino 2", ["kino 2", "2"]),
+    ("№ 25", ["25"]),
+    ("007", ["007", "7"]),
+    ("Salom", ["salom"]),
+    ("🔥", []),
+    ("", []),
+])
+def test_lookup_keys(text, expected):
+    assert lookup_keys(text) == expected
@@ -0,0 +1,114 @@
+"""
+TokenBucket va SendQueue testlari (soxta make_request bilan, Telegram kerak emas).
+
+Repo ildizidan:
+    python -m pytest tests
+"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiogram")
+pytest.importorskip("pydantic_settings")
+
+from aiogram.exceptions import TelegramRetryAfter
+
+from utils.send_queue import PRIORITY_BULK, SendQueue, TokenBucket, priority
+
+class SendMessage:
+    """Soxta Bot API metodi: SendQueue faqat chat_id va klass nomini o'qiydi."""
+
+    def __init__(self, chat_id: int, text: str):
+        self.chat_id = chat_id
+        self.text = text
+
+class FakeApi:
+    """Yuborilgan matnlarni tartib bilan yozadi; flood dagi matnlar birinchi urinishda 429 oladi."""
+
+    def __init__(self, flood=(), retry_after: float = 0.05):
+        self.sent = []
+        self.flood = set(flood)
+        self.retry_after = retry_after
+
+    async def __call__(self, bot, method):
+        if method.text in self.flood:
+            self.flood.discard(method.text)
+            error = TelegramRetryAfter(method=method, message="Too Many Requests", retry_after=1)
+            error.retry_after = self.retry_after
+            raise error
+        self.sent.append(method.text)
+        return method.text
+
+def _queue(**kwargs) -> SendQueue:
+    options = dict(global_rate=1000, chat_rate=1000, chat_burst=100, workers=1, max_retries=3, admin_ids=[1])
+    options.update(kwargs)
+    return SendQueue(**options)
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=2, capacity=2)
+    now = bucket.updated
+    assert bucket.reserve(now) == 0
+    assert bucket.reserve(now) == 0
+    assert bucket.delay(now) == pytest.approx(0.5)
+    assert bucket.reserve(now) == pytest.approx(0.5)
+    # Yarim soniyada bitta token tiklanadi, sig'imdan oshmaydi
+    assert bucket.delay(now + 1.0) == 0
+    assert bucket.delay(now + 100) == 0 and bucket.tokens == 2
+
+    bucket.penalize(3)
+    assert bucket.delay(now + 100) == pytest.approx(3.5)
+
+def test_priority_order():
+    async def scenario():
+        api = FakeApi()
+        queue = _queue()
+        # Worker'lar ishga tushmasidan oldin navbatga qo'yamiz
+        queue._running = True
+
+        async def bulk(text):
+            with priority(PRIORITY_BULK):
+                return await queue(api, None, SendMessage(50, text))
+
+        calls = [
+            asyncio.create_task(bulk("e'lon")),
+            asyncio.create_task(queue(api, None, SendMessage(2, "foydalanuvchi"))),
+            asyncio.create_task(queue(api, None, SendMessage(1, "admin"))),
+        ]
+        await asyncio.sleep(0)
+        assert queue.depth == 3
+        queue.start()
+        assert await asyncio.gather(*calls) == ["e'lon", "foydalanuvchi", "admin"]
+        assert api.sent == ["admin", "foydalanuvchi", "e'lon"]
+        await queue.stop()
+
+    asyncio.run(scenario())
+
+def test_retry_after_holds_chat_in_order():
+    async def scenario():
+        api = FakeApi(flood={"1"})
+        queue = _queue()
+        queue.start()
+        calls = [asyncio.create_task(queue(api, None, SendMessage(7, text))) for text in ("1", "2", "3")]
+        other = asyncio.create_task(queue(api, None, SendMessage(8, "boshqa chat")))
+
+        assert await asyncio.gather(*calls) == ["1", "2", "3"]
+        await other
+        # 429 olgan xabardan keyingilari undan o'zib ketmaydi, boshqa chat kutmaydi
+        assert api.sent == ["boshqa chat", "1", "2", "3"]
+        assert queue.retried == 1
+        assert queue._held == {}
+        await queue.stop()
+
+    asyncio.run(scenario())
+
+def test_retry_after_gives_up_after_max_retries():
+    async def scenario():
+        api = FakeApi(flood={"1"})
+        queue = _queue(max_retries=0)
+        queue.start()
+        with pytest.raises(TelegramRetryAfter):
+            await queue(api, None, SendMessage(7, "1"))
+        assert queue.depth == 0
+        await queue.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,78 @@
+"""
+TextMatcher testlari: aniq, prefiks va xatoli (trigram + OSA masofa) qidiruv.
+
+Repo ildizidan:
+    python -m pytest tests
+"""
+import pytest
+
+from utils.text_index import MatchResult, TextMatcher, bounded_distance, max_distance
+
+TRIGGERS = {
+    1: "Assalomu alaykum",
+    2: "Salom",
+    3: "Kitoblar ro'yxati",
+    4: "Kino 2",
+    5: "Kino 3",
+    6: "Qo'shiqlar",
+}
+
+@pytest.fixture
+def matcher() -> TextMatcher:
+    matcher = TextMatcher()
+    matcher.replace_all({"_id": doc_id, "trigger": trigger} for doc_id, trigger in TRIGGERS.items())
+    return matcher
+
+@pytest.mark.parametrize("a, b, limit, expected", [
+    ("salom", "salom", 1, 0),
+    ("salom", "slaom", 1, 1),      # qo'shni harflar almashinuvi — bitta xato
+    ("salom", "xalqa", 1, 2),      # limit dan oshdi: limit + 1
+    ("kitob", "kitoblar", 2, 3),   # uzunlik farqi darhol to'xtatadi
+    ("qoshiqlar", "qoshiqla", 2, 1),
+])
+def test_bounded_distance(a, b, limit, expected):
+    assert bounded_distance(a, b, limit) == expected
+
+def test_max_distance_grows_with_length():
+    assert [max_distance(length) for length in (3, 4, 7, 8, 20)] == [0, 1, 1, 2, 2]
+
+@pytest.mark.parametrize("text, expected", [
+    ("САЛОМ!", MatchResult("Salom", [])),
+    ("slaom", MatchResult("Salom", [])),
+    ("xalom", MatchResult("Salom", [])),
+    ("qoshiqla", MatchResult("Qo'shiqlar", [])),
+    ("kitoblar royhati", MatchResult("Kitoblar ro'yxati", [])),
+    # Yagona prefiks moslik (kamida MIN_PREFIX_MATCH belgi)
+    ("assal", MatchResult("Assalomu alaykum", [])),
+    ("sal", MatchResult("Salom", [])),
+    # Bir nechta nomzod — faqat takliflar
+    ("kino", MatchResult(None, ["Kino 2", "Kino 3"])),
+    ("kino 4", MatchResult(None, ["Kino 2", "Kino 3"])),
+    # Qisqa prefiks avtomatik javob bermaydi
+    ("s", MatchResult(None, ["Salom"])),
+    # Qisqa so'zda xatoga ruxsat yo'q, ikki xato esa limitdan oshadi
+    ("xal", MatchResult(None, [])),
+    ("xaloo", MatchResult(None, [])),
+    ("🔥", MatchResult(None, [])),
+])
+def test_match(matcher, text, expected):
+    assert matcher.match(text) == expected
+
+def test_suggestions_limit(matcher):
+    assert matcher.match("kino", limit=1) == MatchResult(None, ["Kino 2"])
+
+def test_add_and_remove(matcher):
+    matcher.remove(2)
+    assert matcher.match("salom") == MatchResult(None, [])
+    assert len(matcher) == len(TRIGGERS) - 1
+
+    # Nomi o'zgargan trigger eski kalit bo'yicha topilmaydi
+    matcher.add(1, "Assalom")
+    assert matcher.match("assalomu") == MatchResult("Assalom", [])
+    assert matcher.match("assalomu alaykum") == MatchResult(None, [])
+    assert matcher._sorted == sorted(matcher._keys)
+
+def test_text_keys_do_not_collapse_numbers(matcher):
+    # Matnli "Kino 2" kaliti "kino 2", raqamli "2" emas
+    assert "kino 2" in matcher._keys
+    assert matcher.match("2") == MatchResult(None, [])
@@ -0,0 +1,75 @@
+"""
+MemoryThrottleBackend testlari: takroriy update_id lar va sliding window limiti.
+
+Repo ildizidan:
+    python -m pytest tests
+"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiogram")
+pytest.importorskip("pydantic_settings")
+
+import middlewares.throttling
+from middlewares.throttling import MemoryThrottleBackend
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(middlewares.throttling.time, "monotonic", clock)
+    return clock
+
+def _hits(backend: MemoryThrottleBackend, count: int, user_id: int = 1, limit: int = 3, window: float = 10):
+    return [asyncio.run(backend.hit(user_id, limit, window)) for _ in range(count)]
+
+def test_limit_and_single_notice(clock):
+    backend = MemoryThrottleBackend(dedup_ttl=60, dedup_size=100)
+    assert _hits(backend, 5) == [(True, False)] * 3 + [(False, True), (False, False)]
+    # Boshqa foydalanuvchining limiti alohida
+    assert _hits(backend, 1, user_id=2) == [(True, False)]
+
+def test_sliding_window_weights_previous_window(clock):
+    backend = MemoryThrottleBackend(dedup_ttl=60, dedup_size=100)
+    _hits(backend, 3)
+
+    # Yangi oyna boshida oldingi oyna hali to'liq hisoblanadi; ogohlantirish har oynada bir marta
+    clock.now += 10
+    assert _hits(backend, 1) == [(False, True)]
+
+    # Oyna yarmida oldingi hisobning yarmi qoladi: 3 * 0.5 = 1.5
+    clock.now += 5
+    assert _hits(backend, 3) == [(True, False), (True, False), (False, False)]
+
+    # Ikki oynadan ko'p jimlikdan keyin hisob to'liq tozalanadi
+    clock.now += 25
+    assert _hits(backend, 3) == [(True, False)] * 3
+
+def test_user_states_are_bounded(clock):
+    backend = MemoryThrottleBackend(dedup_ttl=60, dedup_size=100, max_users=2)
+    for user_id in (1, 2, 3):
+        _hits(backend, 1, user_id=user_id)
+    assert list(backend._users) == [2, 3]
+
+def test_seen_deduplicates_with_ttl_and_size(clock):
+    backend = MemoryThrottleBackend(dedup_ttl=60, dedup_size=3)
+
+    def seen(update_id: int) -> bool:
+        return asyncio.run(backend.seen(update_id))
+
+    assert seen(1) is False
+    assert seen(1) is True
+    clock.now += 61
+    assert seen(1) is False
+
+    assert [seen(2), seen(3), seen(4)] == [False, False, False]
+    # Hajm chegarasi: eng eskisi unutildi
+    assert list(backend._seen) == [2, 3, 4]
+    assert seen(1) is False
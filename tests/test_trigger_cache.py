@@ -0,0 +1,73 @@
+"""
+TriggerCache testlari (LRU, TTL, miss TTL, generation).
+
+Repo ildizidan:
+    python -m pytest tests
+"""
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("pydantic_settings")
+
+import db.mongo
+from db.mongo import TriggerCache
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(db.mongo.time, "monotonic", clock)
+    return clock
+
+def test_lru_evicts_least_recently_used(clock):
+    cache = TriggerCache(max_size=2, ttl=60, miss_ttl=5)
+    cache.put("a", "A", doc_id=1)
+    cache.put("b", "B", doc_id=2)
+    assert cache.get("a") == (True, "A")
+    cache.put("c", "C", doc_id=3)
+
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, "A")
+    assert cache.get("c") == (True, "C")
+    # Chiqarib yuborilgan yozuvning _id si ham unutiladi
+    assert 2 not in cache._ids
+
+def test_ttl_and_miss_ttl(clock):
+    cache = TriggerCache(max_size=10, ttl=60, miss_ttl=5)
+    cache.put("bor", "B", doc_id=1)
+    cache.put("yoq", None)
+    assert cache.get("yoq") == (True, None)
+
+    clock.now += 6
+    assert cache.get("yoq") == (False, None)
+    assert cache.get("bor") == (True, "B")
+
+    clock.now += 60
+    assert cache.get("bor") == (False, None)
+    assert cache.stats()["size"] == 0
+
+def test_put_skips_result_from_before_invalidation(clock):
+    cache = TriggerCache(max_size=10, ttl=60, miss_ttl=5)
+    generation = cache.generation
+    # DB so'rovi davomida trigger o'zgardi
+    cache.invalidate("salom")
+    cache.put("salom", "eski", doc_id=1, generation=generation)
+    assert cache.get("salom") == (False, None)
+
+    cache.put("salom", "yangi", doc_id=1, generation=cache.generation)
+    assert cache.get("salom") == (True, "yangi")
+
+def test_invalidate_id(clock):
+    cache = TriggerCache(max_size=10, ttl=60, miss_ttl=5)
+    cache.put("salom", "S", doc_id=7)
+    cache.invalidate_id(7)
+    assert cache.get("salom") == (False, None)
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (0, 1)
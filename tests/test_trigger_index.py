@@ -0,0 +1,80 @@
+"""
+TriggerIndex testlari (preload indeksi: to'liq yuklash, delta, watermark).
+
+Repo ildizidan:
+    python -m pytest tests
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("pydantic_settings")
+
+from db.models import SCHEMA_VERSION
+from db.mongo import TriggerIndex
+
+T0 = datetime(2026, 1, 5, 12)
+
+def _document(doc_id, trigger, normalized, minute=0, trigger_type="text"):
+    return {
+        "_id": doc_id,
+        "trigger": trigger,
+        "normalized": normalized,
+        "trigger_type": trigger_type,
+        "content_type": "text",
+        "file_id": f"javob {trigger}",
+        "schema_version": SCHEMA_VERSION,
+        "updated_at": T0.replace(minute=minute),
+    }
+
+def _loaded() -> TriggerIndex:
+    index = TriggerIndex()
+    index.replace_all([
+        _document(1, "Salom", "salom", minute=1),
+        _document(2, "25", "25", minute=3, trigger_type="numeric"),
+    ])
+    return index
+
+def test_replace_all():
+    index = _loaded()
+    assert index.loaded
+    assert len(index) == 2
+    assert index.get("salom").file_id == "javob Salom"
+    assert index.get_by_id(2).trigger == "25"
+    assert index.watermark == T0.replace(minute=3)
+
+def test_apply_upsert_rename_and_delete():
+    index = _loaded()
+    records = index._records
+    index.apply(
+        upserts=[
+            # Trigger nomi o'zgardi: eski kalit olib tashlanadi
+            _document(1, "Assalom", "assalom", minute=5),
+            _document(3, "Kino", "kino", minute=4),
+        ],
+        deleted_ids=[2],
+    )
+    assert index.get("salom") is None
+    assert index.get("assalom").trigger == "Assalom"
+    assert index.get("kino").trigger == "Kino"
+    assert index.get("25") is None
+    assert index.get_by_id(2) is None
+    assert len(index) == 2
+    # O'quvchilar ushlab turgan eski nusxa o'zgarmaydi
+    assert "salom" in records and "assalom" not in records
+    assert index.watermark == T0.replace(minute=5)
+
+def test_apply_skips_invalid_documents():
+    index = _loaded()
+    broken = _document(4, "Buzuq", "buzuq")
+    del broken["file_id"]
+    index.apply(upserts=[broken])
+    assert index.get("buzuq") is None
+    assert len(index) == 2
+
+def test_delta_since_overlaps_watermark():
+    index = TriggerIndex()
+    assert index.delta_since() is None
+    index.replace_all([_document(1, "Salom", "salom", minute=10)])
+    assert index.delta_since() == T0.replace(minute=10) - timedelta(seconds=TriggerIndex.WATERMARK_OVERLAP)
@@ -0,0 +1,67 @@
+"""
+MongoService.get_trigger_page testlari (keyset sahifalash, mongod o'rniga mongomock_motor).
+
+Repo ildizidan:
+    pip install pytest mongomock-motor
+    python -m pytest tests
+"""
+import asyncio
+
+import pytest
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+pytest.importorskip("pydantic_settings")
+
+import db.mongo
+from config import CONFIG, Settings
+from db.mongo import MongoService
+
+# Bir xil uzunlikdagi kodlar: tartib numericOrdering collation'ga bog'liq emas
+CODES = [str(code) for code in range(10, 23)]
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setenv("BOT_TOKEN", "123456:TEST")
+    monkeypatch.setenv("ADMIN_IDS", "[1]")
+    monkeypatch.setenv("RAILWAY_PUBLIC_DOMAIN", "test.invalid")
+    monkeypatch.setattr(db.mongo, "AsyncIOMotorClient", mongomock_motor.AsyncMongoMockClient)
+    CONFIG.configure(Settings(_env_file=None))
+    service = MongoService()
+    documents = [{"trigger": code, "category": "1-25"} for code in CODES]
+    documents.append({"trigger": "30", "category": "26-50"})
+    asyncio.run(service.collection.insert_many(documents))
+    return service
+
+def _page(service: MongoService, **kwargs):
+    return asyncio.run(service.get_trigger_page("1-25", page_size=5, **kwargs))
+
+def test_first_and_next_pages(service):
+    page = _page(service)
+    assert page.triggers == CODES[0:5]
+    assert (page.has_prev, page.has_next) == (False, True)
+    assert len(page.ids) == 5
+
+    page = _page(service, after=page.triggers[-1])
+    assert page.triggers == CODES[5:10]
+    assert (page.has_prev, page.has_next) == (True, True)
+
+    page = _page(service, after=page.triggers[-1])
+    assert page.triggers == CODES[10:]
+    assert (page.has_prev, page.has_next) == (True, False)
+
+def test_prev_pages_keep_ascending_order(service):
+    page = _page(service, before="20")
+    assert page.triggers == CODES[5:10]
+    assert (page.has_prev, page.has_next) == (True, True)
+
+    page = _page(service, before=page.triggers[0])
+    assert page.triggers == CODES[0:5]
+    assert (page.has_prev, page.has_next) == (False, True)
+
+def test_last_page_exactly_full(service):
+    page = _page(service, after="17")
+    assert page.triggers == CODES[8:]
+    assert (page.has_prev, page.has_next) == (True, False)
+
+def test_primary_reads_same_page(service):
+    assert _page(service, primary=True).triggers == CODES[0:5]
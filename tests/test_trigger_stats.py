@@ -0,0 +1,110 @@
+"""
+TriggerStats flush testlari (soxta kolleksiya bilan, MongoDB kerak emas).
+
+Repo ildizidan:
+    python -m pytest tests
+"""
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("pydantic_settings")
+
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+from db.trigger_stats import PERIOD_DAY, PERIOD_HOUR, TriggerStats
+
+HOUR = datetime(2026, 1, 5, 14)
+
+class FakeCollection:
+    """bulk_write chaqiruvlarini yozib boradi; errors navbatidagi xato keyingi chaqiruvda ko'tariladi."""
+
+    def __init__(self):
+        self.calls = []
+        self.errors = []
+
+    async def bulk_write(self, operations, ordered=True):
+        self.calls.append([(operation._filter, operation._doc) for operation in operations])
+        if self.errors:
+            raise self.errors.pop(0)
+
+def _stats(collection: FakeCollection) -> TriggerStats:
+    mongo = SimpleNamespace(db={"trigger_stats": collection})
+    return TriggerStats(mongo, "trigger_stats", flush_interval=60, hourly_days=2, daily_days=30)
+
+def _incs(call):
+    return {
+        (query["period"], query["start"], query["trigger"]): (update["$inc"]["hits"], update["$inc"]["misses"])
+        for query, update in call
+    }
+
+def test_operations_roll_hours_into_days():
+    stats = _stats(FakeCollection())
+    rows = stats._rollups({
+        (HOUR, "salom"): [2, 0],
+        (HOUR.replace(hour=15), "salom"): [1, 0],
+        (HOUR, "kino"): [0, 3],
+    })
+    day = HOUR.replace(hour=0)
+    assert rows == {
+        (PERIOD_HOUR, HOUR, "salom"): [2, 0],
+        (PERIOD_HOUR, HOUR.replace(hour=15), "salom"): [1, 0],
+        (PERIOD_HOUR, HOUR, "kino"): [0, 3],
+        (PERIOD_DAY, day, "salom"): [3, 0],
+        (PERIOD_DAY, day, "kino"): [0, 3],
+    }
+    operations = stats._operations(rows)
+    assert len(operations) == len(rows)
+    assert operations[0]._doc["$setOnInsert"]["expires_at"] == datetime(2026, 1, 7, 14)
+    assert operations[-1]._doc["$setOnInsert"]["expires_at"] == datetime(2026, 2, 4)
+
+def test_partial_bulk_error_requeues_only_failed_rollups():
+    async def scenario():
+        collection = FakeCollection()
+        stats = _stats(collection)
+        stats._buffer = {(HOUR, "salom"): [2, 0], (HOUR, "kino"): [0, 1]}
+        # 1-operatsiya (kino, soatlik) unique poygasi, 3-operatsiya qayta urinib bo'lmaydigan xato
+        collection.errors.append(BulkWriteError({
+            "writeErrors": [{"index": 1, "code": 11000}, {"index": 3, "code": 2}],
+            "nUpserted": 2,
+        }))
+        await stats.flush()
+        assert stats._retry == {(PERIOD_HOUR, HOUR, "kino"): [0, 1]}
+
+        stats._add("salom", 0)
+        await stats.flush()
+        incs = _incs(collection.calls[-1])
+        assert incs[(PERIOD_HOUR, HOUR, "kino")] == (0, 1)
+        # Yozilgan soatlik "salom" qayta yuborilmaydi
+        assert (PERIOD_HOUR, HOUR, "salom") not in incs
+        assert stats._retry == {}
+
+        await stats.flush()
+        assert len(collection.calls) == 2
+
+    asyncio.run(scenario())
+
+def test_network_error_requeues_everything():
+    async def scenario():
+        collection = FakeCollection()
+        stats = _stats(collection)
+        stats._buffer = {(HOUR, "salom"): [2, 0]}
+        collection.errors.append(AutoReconnect("ulanish uzildi"))
+        await stats.flush()
+        assert stats._buffer == {}
+        assert stats._retry == {
+            (PERIOD_HOUR, HOUR, "salom"): [2, 0],
+            (PERIOD_DAY, HOUR.replace(hour=0), "salom"): [2, 0],
+        }
+
+        await stats.flush()
+        assert _incs(collection.calls[-1]) == {
+            (PERIOD_HOUR, HOUR, "salom"): (2, 0),
+            (PERIOD_DAY, HOUR.replace(hour=0), "salom"): (2, 0),
+        }
+        assert stats._retry == {}
+
+    asyncio.run(scenario())
@@ -0,0 +1,426 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+from contextlib import aclosing
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramBadRequest, TelegramForbiddenError
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+
+from config import CONFIG
+from db.mongo import MongoService
+from db.users import UserRegistry
+from keyboards.broadcast import get_broadcast_progress_keyboard
+from utils.metrics import BROADCAST_MESSAGES, MONGO_LATENCY
+from utils.send_queue import PRIORITY_BULK, priority
+
+# E'lon holatlari
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_CANCELLED = "cancelled"
+
+# Bitta qabul qiluvchiga yuborish natijalari
+RESULT_SENT = "sent"
+RESULT_BLOCKED = "blocked"
+RESULT_FAILED = "failed"
+
+# Chat endi mavjud emas: foydalanuvchi keyingi e'lonlarda o'tkazib yuboriladi
+GONE_CHAT_ERRORS = ("chat not found", "user not found", "peer_id_invalid")
+
+# Kursor yoki DB xatosidan keyin qayta urinish oralig'i (soniya)
+RETRY_DELAY = 5.0
+
+def is_gone_chat_error(error: TelegramBadRequest) -> bool:
+    text = (error.message or "").lower()
+    return any(marker in text for marker in GONE_CHAT_ERRORS)
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    return f"{hours}:{rest // 60:02d}:{rest % 60:02d}" if hours else f"{rest // 60:02d}:{rest % 60:02d}"
+
+class BroadcastJob:
+    """Ishlayotgan e'lonning xotiradagi holati (hujjat davriy ravishda shundan yangilanadi)."""
+
+    def __init__(self, document: Dict[str, Any], remaining: int):
+        self.id: ObjectId = document["_id"]
+        self.from_chat_id: int = document["from_chat_id"]
+        self.message_id: int = document["message_id"]
+        self.status_chat_id: int = document["status_chat_id"]
+        self.status_message_id: int = document["status_message_id"]
+        # Oxirgi to'liq yuborilgan batch'dagi eng katta user_id: qayta ishga tushganda shundan davom etiladi
+        self.checkpoint: Optional[int] = document.get("checkpoint")
+        self.sent: int = document.get("sent", 0)
+        self.blocked: int = document.get("blocked", 0)
+        self.failed: int = document.get("failed", 0)
+        self.total = self.processed + remaining
+        self.base_elapsed: float = document.get("elapsed", 0.0)
+        # Tezlik va ETA joriy jarayon boshidan hisoblanadi
+        self.started = time.monotonic()
+        self.processed_at_start = self.processed
+        self.cancelled = False
+        # Lease boshqa replikaga o'tgan: bu jarayon yuborishni to'xtatadi
+        self.lease_lost = False
+
+    @property
+    def processed(self) -> int:
+        return self.sent + self.blocked + self.failed
+
+    def elapsed(self) -> float:
+        return self.base_elapsed + time.monotonic() - self.started
+
+    def rate(self) -> float:
+        """Soniyasiga qayta ishlangan qabul qiluvchilar."""
+        run_time = time.monotonic() - self.started
+        return (self.processed - self.processed_at_start) / run_time if run_time > 0 else 0.0
+
+    def eta(self) -> Optional[float]:
+        rate = self.rate()
+        return max(self.total - self.processed, 0) / rate if rate > 0 else None
+
+    def add(self, result: str):
+        if result == RESULT_SENT:
+            self.sent += 1
+        elif result == RESULT_BLOCKED:
+            self.blocked += 1
+        else:
+            self.failed += 1
+
+    def progress_text(self, status: str) -> str:
+        title = {
+            STATUS_RUNNING: "⏳ E'lon yuborilmoqda...",
+            STATUS_DONE: "✅ E'lon yuborildi",
+            STATUS_CANCELLED: "⛔ E'lon to'xtatildi",
+        }[status]
+        # E'lon davomida qo'shilgan foydalanuvchilar ham yuboriladi
+        total = max(self.total, self.processed)
+        percent = self.processed * 100 / total if total else 100.0
+        lines = [
+            f"<b>{title}</b>\n",
+            f"📨 Yuborildi: {self.sent}",
+            f"🚫 Bloklagan: {self.blocked}",
+            f"❌ Xato: {self.failed}",
+            f"📊 {self.processed} / {total} ({percent:.1f}%)",
+        ]
+        if status == STATUS_RUNNING:
+            eta = self.eta()
+            lines.append(f"⚡ {self.rate():.1f} xabar/s, ⏱ qoldi: {format_duration(eta) if eta is not None else '—'}")
+        else:
+            lines.append(f"⏱ Davomiyligi: {format_duration(self.elapsed())}")
+        return "\n".join(lines)
+
+class Broadcaster:
+    """
+    Barcha faol foydalanuvchilarga admin xabarining nusxasini (copyMessage) yuborish.
+
+    - Qabul qiluvchilar users kolleksiyasidan _id tartibida kursor bilan oqim sifatida o'qiladi:
+      xotirada faqat joriy batch turadi, 1M foydalanuvchi ham ro'yxatga yuklanmaydi.
+    - Bir vaqtda concurrency tadan ko'p xabar yuborilmaydi; tezlikni esa PRIORITY_BULK bilan
+      yuborish navbati (Telegram limitlari) belgilaydi, foydalanuvchi javoblari oldinroq ketadi.
+    - Progress (checkpoint, hisoblar) broadcasts kolleksiyasiga progress_interval soniyada saqlanadi.
+      Jarayon to'xtasa, e'lon checkpoint dan davom etadi (bir necha soniyalik xabarlar qayta ketishi mumkin).
+    - Bir nechta replika: e'lonni lease olgan bitta jarayon yuboradi; lease muddati o'tsa boshqasi oladi.
+    - Botni bloklagan va o'chirilgan akkauntlar blocked deb belgilanadi va keyingi safar o'qilmaydi.
+    """
+
+    def __init__(
+        self,
+        mongo: MongoService,
+        users: UserRegistry,
+        collection_name: str,
+        concurrency: int,
+        batch_size: int,
+        progress_interval: float,
+        lease_seconds: float,
+    ):
+        self.mongo = mongo
+        self.users = users
+        self.collection_name = collection_name
+        self.batch_size = batch_size
+        self.progress_interval = progress_interval
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.bot: Optional[Bot] = None
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._jobs: Dict[ObjectId, BroadcastJob] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._claim_task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    @property
+    def collection(self) -> AsyncIOMotorCollection:
+        return self.mongo.db[self.collection_name]
+
+    async def create_indexes(self):
+        # Davom ettirilishi kerak bo'lgan e'lonlarni qidirish
+        await self.collection.create_index([("status", 1), ("lease_until", 1)], name="status_lease_index")
+
+    # --- BOSHQARISH ---
+
+    def start(self, bot: Bot):
+        """Tugallanmagan e'lonlarni davom ettirish va boshqa replikalarnikini kuzatish."""
+        self.bot = bot
+        self._claim_task = asyncio.create_task(self._claim_loop())
+
+    async def stop(self, timeout: float):
+        """
+        Joriy batch'lar tugashini kutib, progressni saqlash va lease'ni bo'shatish:
+        keyingi replika e'lonni darhol davom ettiradi.
+        """
+        self._stopping = True
+        if self._claim_task is not None:
+            self._claim_task.cancel()
+            await asyncio.gather(self._claim_task, return_exceptions=True)
+            self._claim_task = None
+        if not self._tasks:
+            return
+        _, pending = await asyncio.wait(set(self._tasks), timeout=max(timeout, 0.1))
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    async def create(self, from_chat_id: int, message_id: int, status_chat_id: int, status_message_id: int, created_by: int) -> ObjectId:
+        """Yangi e'lon: hujjat shu jarayon lease'i bilan yoziladi va yuborish fonda boshlanadi."""
+        now = datetime.utcnow()
+        document = {
+            "status": STATUS_RUNNING,
+            "from_chat_id": from_chat_id,
+            "message_id": message_id,
+            "status_chat_id": status_chat_id,
+            "status_message_id": status_message_id,
+            "created_by": created_by,
+            "created_at": now,
+            "checkpoint": None,
+            "sent": 0,
+            "blocked": 0,
+            "failed": 0,
+            "elapsed": 0.0,
+            "owner": self.owner,
+            "lease_until": now + timedelta(seconds=self.lease_seconds),
+        }
+        # Oxirgi xabar yozganlar ham ro'yxatda bo'lsin
+        await self.users.flush()
+        with MONGO_LATENCY.time(operation="insert"):
+            result = await self.collection.insert_one(document)
+        document["_id"] = result.inserted_id
+        await self._launch(document)
+        return result.inserted_id
+
+    async def cancel(self, job_id: ObjectId) -> bool:
+        """E'lonni to'xtatish. Boshqa replikadagi e'lon keyingi progress saqlashda to'xtaydi."""
+        with MONGO_LATENCY.time(operation="update"):
+            result = await self.collection.update_one(
+                {"_id": job_id, "status": STATUS_RUNNING},
+                {"$set": {"status": STATUS_CANCELLED, "finished_at": datetime.utcnow()}},
+            )
+        job = self._jobs.get(job_id)
+        if job is not None:
+            job.cancelled = True
+        return result.modified_count > 0
+
+    # --- LEASE ---
+
+    async def _claim_loop(self):
+        while True:
+            try:
+                while not self._stopping:
+                    document = await self._claim()
+                    if document is None:
+                        break
+                    if document["_id"] in self._jobs:
+                        # Shu jarayonda ishlayapti (lease DB uzilishida eskirgan): qayta boshlanmaydi
+                        continue
+                    logging.info(f"E'lon davom ettirilmoqda: {document['_id']} (checkpoint {document.get('checkpoint')})")
+                    await self._launch(document)
+            except PyMongoError as e:
+                logging.warning(f"E'lonlarni tekshirib bo'lmadi: {e}")
+            await asyncio.sleep(self.lease_seconds)
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        """Lease muddati o'tgan (egasi to'xtagan) bitta e'lonni olish."""
+        now = datetime.utcnow()
+        with MONGO_LATENCY.time(operation="find_one_and_update"):
+            return await self.collection.find_one_and_update(
+                {"status": STATUS_RUNNING, "lease_until": {"$lt": now}},
+                {"$set": {"owner": self.owner, "lease_until": now + timedelta(seconds=self.lease_seconds)}},
+                return_document=ReturnDocument.AFTER,
+            )
+
+    async def _launch(self, document: Dict[str, Any]):
+        # Qolganlar soni indeks bo'yicha sanaladi (ETA uchun), ro'yxat o'qilmaydi
+        remaining = await self.users.count_active(after=document.get("checkpoint"))
+        job = BroadcastJob(document, remaining)
+        self._jobs[job.id] = job
+        task = asyncio.create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _save(self, job: BroadcastJob, **extra) -> bool:
+        """
+        Progressni saqlash va lease'ni uzaytirish. E'lon bekor qilingan yoki boshqa replikaga
+        o'tgan bo'lsa False. DB vaqtinchalik ishlamasa True (keyingi safar qayta saqlanadi).
+        """
+        fields = {
+            "checkpoint": job.checkpoint,
+            "sent": job.sent,
+            "blocked": job.blocked,
+            "failed": job.failed,
+            "elapsed": job.elapsed(),
+            "lease_until": datetime.utcnow() + timedelta(seconds=self.lease_seconds),
+            **extra,
+        }
+        try:
+            with MONGO_LATENCY.time(operation="update"):
+                result = await self.collection.update_one(
+                    {"_id": job.id, "status": STATUS_RUNNING, "owner": self.owner},
+                    {"$set": fields},
+                )
+        except PyMongoError as e:
+            logging.warning(f"E'lon progressini saqlab bo'lmadi ({job.id}): {e}")
+            return True
+        if result.matched_count:
+            return True
+        # Hujjat holati: bekor qilinganmi yoki lease boshqa replikadami
+        current = await self.collection.find_one({"_id": job.id}, {"status": 1})
+        if current is None or current["status"] == STATUS_CANCELLED:
+            job.cancelled = True
+        else:
+            job.lease_lost = True
+        return False
+
+    # --- YUBORISH ---
+
+    async def _run(self, job: BroadcastJob):
+        reporter = asyncio.create_task(self._report_loop(job))
+        finished = False
+        try:
+            finished = await self._send_all(job)
+        except Exception as e:
+            logging.error(f"E'lon yuborishda xato ({job.id}): {e}")
+        finally:
+            reporter.cancel()
+            await asyncio.gather(reporter, return_exceptions=True)
+            del self._jobs[job.id]
+            await self._finish(job, finished)
+
+    async def _send_all(self, job: BroadcastJob) -> bool:
+        """Checkpoint dan oxirigacha yuborish. Hammasi yuborilgan bo'lsa True."""
+        while True:
+            try:
+                # aclosing: e'lon to'xtaganda kursor serverda ochiq qolmaydi
+                async with aclosing(self.users.iter_active_ids(after=job.checkpoint, batch_size=self.batch_size)) as batches:
+                    async for batch in batches:
+                        if job.cancelled or job.lease_lost or self._stopping:
+                            return False
+                        await self._send_batch(job, batch)
+                        job.checkpoint = batch[-1]
+                return not (job.cancelled or job.lease_lost)
+            except PyMongoError as e:
+                # Kursor uzilgan (masalan, primary almashgan): checkpoint dan qayta ochiladi
+                logging.warning(f"E'lon kursori uzildi ({job.id}), qayta urinilmoqda: {e}")
+                await asyncio.sleep(RETRY_DELAY)
+
+    async def _send_batch(self, job: BroadcastJob, user_ids: List[int]):
+        results = await asyncio.gather(*(self._send_limited(job, user_id) for user_id in user_ids))
+        blocked = []
+        for user_id, result in zip(user_ids, results):
+            if result is None:
+                continue
+            job.add(result)
+            BROADCAST_MESSAGES.inc(result=result)
+            if result == RESULT_BLOCKED:
+                blocked.append(user_id)
+        try:
+            await self.users.mark_blocked(blocked)
+        except PyMongoError as e:
+            logging.warning(f"Bloklangan foydalanuvchilarni belgilab bo'lmadi: {e}")
+
+    async def _send_limited(self, job: BroadcastJob, user_id: int) -> Optional[str]:
+        async with self._semaphore:
+            # To'xtatilgan e'lonning navbatdagi xabarlari yuborilmaydi
+            if job.cancelled or job.lease_lost:
+                return None
+            return await self._send_one(job, user_id)
+
+    async def _send_one(self, job: BroadcastJob, user_id: int) -> str:
+        try:
+            # Foydalanuvchilarning trigger javoblari e'londan oldin yuboriladi
+            with priority(PRIORITY_BULK):
+                await self.bot.copy_message(chat_id=user_id, from_chat_id=job.from_chat_id, message_id=job.message_id)
+        except TelegramForbiddenError:
+            # "bot was blocked by the user", "user is deactivated"
+            return RESULT_BLOCKED
+        except TelegramBadRequest as e:
+            if is_gone_chat_error(e):
+                return RESULT_BLOCKED
+            logging.debug(f"E'lon yuborilmadi ({user_id}): {e}")
+            return RESULT_FAILED
+        except TelegramAPIError as e:
+            # Tarmoq xatosi yoki qayta urinishlardan keyin ham 429
+            logging.debug(f"E'lon yuborilmadi ({user_id}): {e}")
+            return RESULT_FAILED
+        return RESULT_SENT
+
+    async def _finish(self, job: BroadcastJob, finished: bool):
+        if finished:
+            await self._save(job, status=STATUS_DONE, finished_at=datetime.utcnow())
+            logging.info(f"E'lon tugadi ({job.id}): {job.sent} yuborildi, {job.blocked} bloklagan, {job.failed} xato")
+            await self._report(job, STATUS_DONE)
+        elif job.cancelled:
+            # Holat allaqachon cancelled: faqat yakuniy hisoblar yoziladi
+            try:
+                await self.collection.update_one(
+                    {"_id": job.id, "owner": self.owner},
+                    {"$set": {"sent": job.sent, "blocked": job.blocked, "failed": job.failed, "elapsed": job.elapsed()}},
+                )
+            except PyMongoError as e:
+                logging.warning(f"E'lon hisoblarini saqlab bo'lmadi ({job.id}): {e}")
+            await self._report(job, STATUS_CANCELLED)
+        elif job.lease_lost:
+            logging.warning(f"E'lon boshqa replikaga o'tdi ({job.id})")
+        else:
+            # To'xtash yoki xato: progress saqlanadi va lease bo'shatiladi, keyingi jarayon davom ettiradi
+            if await self._save(job, lease_until=datetime.utcnow()):
+                logging.info(f"E'lon to'xtatib turildi ({job.id}), checkpoint {job.checkpoint}")
+
+    # --- HOLAT XABARI ---
+
+    async def _report_loop(self, job: BroadcastJob):
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            if not await self._save(job):
+                return
+            await self._report(job, STATUS_RUNNING)
+
+    async def _report(self, job: BroadcastJob, status: str):
+        """Admin chatidagi holat xabarini yangilash (xato e'lonni to'xtatmaydi)."""
+        markup = get_broadcast_progress_keyboard(str(job.id)) if status == STATUS_RUNNING else None
+        try:
+            await self.bot.edit_message_text(
+                job.progress_text(status),
+                chat_id=job.status_chat_id,
+                message_id=job.status_message_id,
+                reply_markup=markup,
+            )
+        except TelegramAPIError as e:
+            if "message is not modified" not in str(e):
+                logging.debug(f"E'lon holat xabarini yangilab bo'lmadi: {e}")
+
+def create_broadcaster(mongo: MongoService, users: UserRegistry) -> Broadcaster:
+    """CONFIG bo'yicha e'lon yuboruvchi."""
+    return Broadcaster(
+        mongo,
+        users,
+        "broadcasts",
+        concurrency=CONFIG.BROADCAST_CONCURRENCY,
+        batch_size=CONFIG.BROADCAST_BATCH_SIZE,
+        progress_interval=CONFIG.BROADCAST_PROGRESS_INTERVAL,
+        lease_seconds=CONFIG.BROADCAST_LEASE_SECONDS,
+    )
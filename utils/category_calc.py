@@ -1,44 +1,81 @@
-from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from typing import List
-
-# Bosh menyu buttonlari uchun callback data prefixlari
-class AdminCallback:
-    MAIN_MENU = "admin_main"
-    CATEGORIES = "admin_cats"
-    ADD_TRIGGER = "admin_add_trigger"
-    IMPORT_EXPORT = "admin_import_export"
-    ADMIN_LIST = "admin_admins"
-    SETTINGS = "admin_settings"
-    BACK = "back_to_menu"
-
-def get_admin_main_keyboard() -> InlineKeyboardMarkup:
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config import CONFIG
+
+def get_category_name(number: int, width: Optional[int] = None) -> str:
     """
-    Admin paneli uchun asosiy menyu klaviaturasini yaratadi.
+    Raqamli trigger tushadigan bo'lim nomini arifmetik hisoblaydi.
+    Masalan, kenglik 25 bo'lsa: 7 -> '1-25', 25 -> '1-25', 26 -> '26-50'.
+    0 va manfiy sonlar birinchi bo'limga tushadi.
     """
-    
-    buttons = [
-        # Bosh menyu (4-qadam)
-        [InlineKeyboardButton(text="📁 Trigger Bo‘limlari", callback_data=AdminCallback.CATEGORIES)],
-        [InlineKeyboardButton(text="➕ Yangi Javob", callback_data=AdminCallback.ADD_TRIGGER)],
-        [
-            InlineKeyboardButton(text="📦 Import/Export", callback_data=AdminCallback.IMPORT_EXPORT),
-            InlineKeyboardButton(text="👥 Adminlar", callback_data=AdminCallback.ADMIN_LIST),
-        ],
-        [InlineKeyboardButton(text="⚙️ Sozlamalar", callback_data=AdminCallback.SETTINGS)],
-    ]
-    
-    return InlineKeyboardMarkup(inline_keyboard=buttons)
-
-def get_categories_keyboard(categories: List[str]) -> InlineKeyboardMarkup:
+    width = width or CONFIG.CATEGORY_SIZE
+    start = (max(number, 1) - 1) // width * width + 1
+    return f"{start}-{start + width - 1}"
+
+def category_sort_key(category: str) -> Tuple[int, str]:
+    """Bo'limlarni boshlang'ich raqami bo'yicha tartiblash ('26-50' '101-125' dan oldin)."""
+    head = category.split("-", 1)[0]
+    if head.isdecimal():
+        return int(head), category
+    return 1 << 62, category
+
+class CategoryCounter:
     """
-    Trigger bo'limlari ro'yxati uchun klaviatura yaratadi.
+    Har bir bo'limdagi triggerlar soni.
+    Bir marta aggregatsiya natijasidan yuklanadi, keyin qo'shish/o'chirishda inkremental yangilanadi.
     """
-    buttons = []
-    for cat in categories:
-        # Bo'lim nomlari button matni va callback datasi sifatida ishlatiladi
-        # Callback formati: "admin_cats:1-25"
-        buttons.append([InlineKeyboardButton(text=cat, callback_data=f"{AdminCallback.CATEGORIES}:{cat}")])
-        
-    buttons.append([InlineKeyboardButton(text="⬅️ Orqaga", callback_data=AdminCallback.MAIN_MENU)])
-    
-    return InlineKeyboardMarkup(inline_keyboard=buttons)
\ No newline at end of file
+
+    def __init__(self):
+        self._counts: Dict[str, int] = {}
+        self.loaded = False
+
+    def load(self, rows: Iterable[Dict[str, Any]]):
+        """Aggregatsiya natijasini ({'_id': bo'lim, 'count': n}) yuklash."""
+        self._counts = {row["_id"]: row["count"] for row in rows if row.get("_id") and row.get("count")}
+        self.loaded = True
+
+    def increment(self, category: Optional[str], delta: int = 1):
+        if not self.loaded or not category:
+            return
+        count = self._counts.get(category, 0) + delta
+        if count > 0:
+            self._counts[category] = count
+        else:
+            self._counts.pop(category, None)
+
+    def invalidate(self):
+        """Keyingi so'rovda aggregatsiya qaytadan bajarilishi uchun."""
+        self.loaded = False
+
+    def snapshot(self) -> Dict[str, int]:
+        return dict(self._counts)
+
+class CategoryVersions:
+    """
+    Bo'limlar tarkibi versiyasi (ro'yxat sahifalari keshining kaliti uchun).
+    Bo'limga trigger qo'shilsa yoki o'chirilsa o'sha bo'lim versiyasi oshadi;
+    qaysi bo'lim o'zgargani noma'lum bo'lsa (ommaviy import, stream uzilishi) hammasi eskiradi.
+    """
+
+    def __init__(self):
+        self._versions: Dict[str, int] = {}
+        self._epoch = 0
+
+    def get(self, category: str) -> Tuple[int, int]:
+        return self._epoch, self._versions.get(category, 0)
+
+    def bump(self, category: Optional[str]):
+        if category:
+            self._versions[category] = self._versions.get(category, 0) + 1
+
+    def bump_all(self):
+        self._epoch += 1
+        self._versions.clear()
+
+def get_all_categories(counts: Dict[str, int]) -> List[Tuple[str, int]]:
+    """Faqat bo'sh bo'lmagan bo'limlar va ulardagi triggerlar soni (tartiblangan)."""
+    return [
+        (category, counts[category])
+        for category in sorted(counts, key=category_sort_key)
+        if counts[category] > 0
+    ]
\ No newline at end of file
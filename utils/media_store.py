@@ -0,0 +1,219 @@
+import asyncio
+import hashlib
+import logging
+import os
+from typing import Optional, Set
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import FSInputFile, Message
+
+from config import CONFIG
+from db.models import ContentType
+from db.mongo import MongoService
+
+# Kontent turi -> (Bot metodi, fayl parametri nomi)
+SEND_METHODS = {
+    ContentType.PHOTO: ("send_photo", "photo"),
+    ContentType.VIDEO: ("send_video", "video"),
+    ContentType.AUDIO: ("send_audio", "audio"),
+    ContentType.VOICE: ("send_voice", "voice"),
+    ContentType.DOCUMENT: ("send_document", "document"),
+    ContentType.STICKER: ("send_sticker", "sticker"),
+}
+
+# Telegram file_id yaroqsiz bo'lganda qaytaradigan xato matnlari
+DEAD_FILE_ERRORS = ("wrong file identifier", "wrong remote file identifier", "invalid file_id", "file reference")
+
+def is_dead_file_error(error: TelegramBadRequest) -> bool:
+    """Xato file_id yaroqsizligi sababli bo'lganini aniqlash."""
+    text = (error.message or "").lower()
+    return any(marker in text for marker in DEAD_FILE_ERRORS)
+
+def extract_file_id(message: Message, content_type: str) -> Optional[str]:
+    """Yuborilgan xabardan yangi file_id ni olish."""
+    if content_type == ContentType.PHOTO:
+        return message.photo[-1].file_id if message.photo else None
+    media = getattr(message, content_type, None)
+    return media.file_id if media else None
+
+class MediaStore:
+    """
+    Trigger media fayllarining lokal nusxalari.
+    Fayllar bir marta cheklangan sondagi worker'lar orqali yuklab olinadi.
+    Fon vazifasi file_id larni tekshirib, yaroqsizlarini lokal nusxadan qayta yuklaydi.
+    Qaysi fayl diskda borligi xotirada saqlanadi, shuning uchun tekshiruv tarmoqsiz.
+    Ko'p jarayonli rejimda papka umumiy: tekshiruv faqat bitta jarayonda ishlaydi,
+    yuklab olish esa har bir jarayonning o'z .part faylida, tayyor fayl atomar almashtiriladi.
+    """
+
+    def __init__(self, directory: str, workers: int, verify_interval: float):
+        self.directory = directory
+        self.workers = workers
+        self.verify_interval = verify_interval
+        self.bot: Optional[Bot] = None
+        self.db: Optional[MongoService] = None
+        # Diskdagi fayl nomlari (file_id xeshi)
+        self._names: Set[str] = set()
+        # Navbatdagi va yuklab bo'lmagan file_id lar (qayta urinmaslik uchun)
+        self._pending: Set[str] = set()
+        self._failed: Set[str] = set()
+        self._repairing: Set[str] = set()
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=1000)
+        self._tasks: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def _name(file_id: str) -> str:
+        return hashlib.sha1(file_id.encode()).hexdigest()
+
+    def local_path(self, file_id: str) -> Optional[str]:
+        """Lokal nusxa yo'li (faqat xotiradan tekshiriladi)."""
+        name = self._name(file_id)
+        if name in self._names:
+            return os.path.join(self.directory, name)
+        # Boshqa jarayon yuklagan bo'lishi mumkin (umumiy papka): disk faqat xotirada yo'q bo'lsa tekshiriladi
+        path = os.path.join(self.directory, name)
+        if os.path.exists(path):
+            self._names.add(name)
+            return path
+        return None
+
+    def enqueue(self, file_id: str):
+        """Faylni yuklab olish navbatiga qo'yish (navbat to'la bo'lsa keyingi tekshiruvda)."""
+        if self.local_path(file_id) or file_id in self._pending or file_id in self._failed:
+            return
+        try:
+            self._queue.put_nowait(file_id)
+            self._pending.add(file_id)
+        except asyncio.QueueFull:
+            pass
+
+    def start(self, bot: Bot, db: MongoService, verify: bool = True):
+        """verify=False — file_id tekshiruvi boshqa jarayonda ishlaydi (prefork worker'lari)."""
+        self.bot = bot
+        self.db = db
+        os.makedirs(self.directory, exist_ok=True)
+        # Yarim yuklangan (.part) fayllarni hisobga olmaymiz
+        self._names = {name for name in os.listdir(self.directory) if not name.endswith(".part")}
+        for _ in range(self.workers):
+            self._spawn(self._download_worker())
+        if verify:
+            self._spawn(self._verify_loop())
+        logging.info(f"Media keshi: diskda {len(self._names)} ta fayl bor")
+
+    async def stop(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def schedule_repair(self, trigger_key: str, content_type: str, file_id: str):
+        """Yaroqsiz file_id ni fon rejimida tiklash (hot path kutmaydi)."""
+        if file_id not in self._repairing:
+            self._repairing.add(file_id)
+            self._spawn(self.repair(trigger_key, content_type, file_id))
+
+    async def repair(self, trigger_key: str, content_type: str, file_id: str) -> Optional[str]:
+        """
+        Lokal nusxani saqlash chatiga qayta yuklab, yangi file_id ni DB ga yozish.
+        Yangi file_id qaytaradi (tiklab bo'lmasa None).
+        """
+        try:
+            path = self.local_path(file_id)
+            chat_id = CONFIG.MEDIA_STORAGE_CHAT_ID or (CONFIG.ADMIN_IDS[0] if CONFIG.ADMIN_IDS else None)
+            if path is None or chat_id is None or content_type not in SEND_METHODS:
+                logging.warning(f"Media tiklab bo'lmaydi ({trigger_key}): lokal nusxa yoki saqlash chati yo'q")
+                return None
+
+            method, param = SEND_METHODS[content_type]
+            sent = await getattr(self.bot, method)(chat_id=chat_id, **{param: FSInputFile(path)})
+            new_file_id = extract_file_id(sent, content_type)
+            if not new_file_id:
+                return None
+
+            if not await self.db.replace_file_id(trigger_key, file_id, new_file_id):
+                # Boshqa jarayon (yoki admin) file_id ni allaqachon almashtirgan: DB dagisi to'g'ri,
+                # yuklangan nusxa hech qayerda saqlanmaydi va lokal fayl eski nomida qoladi
+                current = await self.db.get_file_id(trigger_key)
+                logging.info(f"Media allaqachon yangilangan: {trigger_key}")
+                return current if current != file_id else None
+            logging.info(f"Media tiklandi: {trigger_key}")
+            # Lokal nusxani yangi file_id nomiga o'tkazamiz
+            new_path = os.path.join(self.directory, self._name(new_file_id))
+            os.replace(path, new_path)
+            self._names.discard(self._name(file_id))
+            self._names.add(self._name(new_file_id))
+            return new_file_id
+        except Exception as e:
+            logging.error(f"Mediani qayta yuklashda xato ({trigger_key}): {e}")
+            return None
+        finally:
+            self._repairing.discard(file_id)
+
+    async def verify_all(self):
+        """Barcha media triggerlarni tekshirish: yo'q nusxalarni yuklash, o'lik file_id larni tiklash."""
+        query = {"content_type": {"$in": list(SEND_METHODS)}}
+        projection = {"_id": 0, "trigger": 1, "content_type": 1, "file_id": 1}
+        checked = repaired = 0
+        async for document in self.db.iter_triggers(projection=projection, query=query):
+            file_id = document["file_id"]
+            try:
+                await self.bot.get_file(file_id)
+            except TelegramBadRequest as e:
+                if is_dead_file_error(e):
+                    if await self.repair(document["trigger"], document["content_type"], file_id):
+                        repaired += 1
+                    continue
+                # Masalan, "file is too big" — file_id tirik, lekin yuklab bo'lmaydi
+            checked += 1
+            if self.local_path(file_id) is None and file_id not in self._failed and file_id not in self._pending:
+                self._pending.add(file_id)
+                await self._queue.put(file_id)
+            # Bot API ni to'ldirib yubormaslik uchun
+            await asyncio.sleep(0.05)
+        logging.info(f"Media tekshiruvi: {checked} ta tirik, {repaired} ta tiklandi")
+
+    async def _verify_loop(self):
+        while True:
+            try:
+                await self.verify_all()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Media tekshiruvida xato: {e}")
+            await asyncio.sleep(self.verify_interval)
+
+    async def _download_worker(self):
+        while True:
+            file_id = await self._queue.get()
+            path = os.path.join(self.directory, self._name(file_id))
+            # Jarayonga xos vaqtinchalik nom: bir xil faylni yuklayotgan worker'lar bir-birini buzmaydi
+            part = f"{path}.{os.getpid()}.part"
+            try:
+                await self.bot.download(file_id, destination=part)
+                os.replace(part, path)
+                self._names.add(self._name(file_id))
+            except TelegramBadRequest as e:
+                # 20 MB dan katta fayllarni Bot API orqali yuklab bo'lmaydi
+                logging.warning(f"Media yuklab olinmadi: {e.message}")
+                self._failed.add(file_id)
+            except Exception as e:
+                logging.error(f"Media yuklashda xato: {e}")
+            finally:
+                if os.path.exists(part):
+                    os.remove(part)
+                self._pending.discard(file_id)
+                self._queue.task_done()
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+def create_media_store() -> MediaStore:
+    """CONFIG bo'yicha media keshi."""
+    return MediaStore(
+        directory=CONFIG.MEDIA_CACHE_DIR,
+        workers=CONFIG.MEDIA_WORKERS,
+        verify_interval=CONFIG.MEDIA_VERIFY_INTERVAL,
+    )
\ No newline at end of file
@@ -0,0 +1,162 @@
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+# Latency gistogrammalari uchun standart chegaralar (soniya)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+class _Metric:
+    """Prometheus metrikasi uchun umumiy asos: nom, tavsif va label nomlari."""
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(label, "")) for label in self.labelnames)
+
+    def _format_labels(self, key: Tuple[str, ...], extra: Sequence[Tuple[str, str]] = ()) -> str:
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def render(self, const: Sequence[Tuple[str, str]] = ()) -> List[str]:
+        """const — barcha qatorlarga qo'shiladigan doimiy label'lar (masalan, worker raqami)."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples(const))
+        return lines
+
+    def _samples(self, const: Sequence[Tuple[str, str]]) -> List[str]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self, const: Sequence[Tuple[str, str]]) -> List[str]:
+        return [f"{self.name}{self._format_labels(key, const)} {value}" for key, value in self._values.items()]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label kaliti -> [har bir chegaradagi sonlar..., yig'indi, umumiy soni]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = [0.0] * (len(self.buckets) + 2)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                state[i] += 1
+                break
+        state[-2] += value
+        state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Blok bajarilish vaqtini o'lchash (xato bo'lsa ham yoziladi)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self, const: Sequence[Tuple[str, str]]) -> List[str]:
+        lines = []
+        for key, state in self._values.items():
+            cumulative = 0.0
+            for i, bound in enumerate(self.buckets):
+                cumulative += state[i]
+                lines.append(f"{self.name}_bucket{self._format_labels(key, [*const, ('le', repr(bound))])} {cumulative}")
+            lines.append(f"{self.name}_bucket{self._format_labels(key, [*const, ('le', '+Inf')])} {state[-1]}")
+            lines.append(f"{self.name}_sum{self._format_labels(key, const)} {state[-2]}")
+            lines.append(f"{self.name}_count{self._format_labels(key, const)} {state[-1]}")
+        return lines
+
+class Registry:
+    """Barcha metrikalar ro'yxati va Prometheus text formatida chiqarish."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        # /metrics so'ralganda gauge'larni yangilash uchun chaqiriladigan funksiyalar (nomi bo'yicha)
+        self._collectors: Dict[str, Callable[[], None]] = {}
+        # Har bir qatorga qo'shiladigan label'lar: prefork rejimida worker raqami
+        self._const: Tuple[Tuple[str, str], ...] = ()
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def on_collect(self, name: str, callback: Callable[[], None]):
+        """Shu nomdagi avvalgi collector almashtiriladi (ilova qayta yaratilganda eski servislar qolmaydi)."""
+        self._collectors[name] = callback
+
+    def set_const_labels(self, **labels: object):
+        """
+        Barcha seriyalarga doimiy label'lar. Prefork rejimida har bir worker o'z registriga ega,
+        worker label'i bo'lmasa turli jarayonlar hisoblari bitta seriyaga aralashib ketadi.
+        """
+        self._const = tuple((name, str(value)) for name, value in labels.items())
+
+    def render(self) -> str:
+        for callback in self._collectors.values():
+            callback()
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render(self._const))
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+# --- Loyiha metrikalari ---
+
+HANDLER_LATENCY = REGISTRY.register(Histogram(
+    "bot_handler_latency_seconds", "Handler bajarilish vaqti", ["router", "handler"]))
+UPDATE_LATENCY = REGISTRY.register(Histogram(
+    "bot_update_latency_seconds", "Bitta update ni to'liq qayta ishlash vaqti", ["event_type"]))
+MONGO_LATENCY = REGISTRY.register(Histogram(
+    "bot_mongo_latency_seconds", "MongoDB so'rovlari vaqti", ["operation"]))
+TRIGGER_LOOKUPS = REGISTRY.register(Counter(
+    "bot_trigger_lookups_total", "Foydalanuvchi xabarlari bo'yicha trigger qidiruvlari", ["result"]))
+TELEGRAM_LATENCY = REGISTRY.register(Histogram(
+    "bot_telegram_request_latency_seconds", "Bot API so'rovlari vaqti", ["method"]))
+SEND_QUEUE_WAIT = REGISTRY.register(Histogram(
+    "bot_send_queue_wait_seconds", "Xabar yuborish navbatida kutish vaqti"))
+SEND_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "bot_send_queue_depth", "Yuborish navbatidagi xabarlar soni"))
+TRIGGER_CACHE = REGISTRY.register(Gauge(
+    "bot_trigger_cache", "Trigger keshi holati", ["stat"]))
+UPDATE_QUEUE_LAG = REGISTRY.register(Histogram(
+    "bot_update_queue_lag_seconds", "Update webhook'dan kelib, worker olguncha o'tgan vaqt"))
+UPDATE_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "bot_update_queue_depth", "Qayta ishlanishini kutayotgan update lar soni"))
+UPDATES_DROPPED = REGISTRY.register(Counter(
+    "bot_updates_dropped_total", "Navbat to'lgani yoki to'xtash sababli qabul qilinmagan update lar", ["reason"]))
+STARTUP_DURATION = REGISTRY.register(Gauge(
+    "bot_startup_phase_seconds", "Ishga tushish bosqichlari davomiyligi", ["phase"]))
+BROADCAST_MESSAGES = REGISTRY.register(Counter(
+    "bot_broadcast_messages_total", "E'lon xabarlari natijalari", ["result"]))
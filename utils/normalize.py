@@ -0,0 +1,56 @@
+import re
+from typing import List
+
+# O'zbek kirill -> lotin (ў -> o, ғ -> g: tutuq belgisi kalitda saqlanmaydi)
+CYRILLIC_TO_LATIN = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "yo", "ж": "j",
+    "з": "z", "и": "i", "й": "y", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o",
+    "п": "p", "р": "r", "с": "s", "т": "t", "у": "u", "ф": "f", "х": "x", "ц": "ts",
+    "ч": "ch", "ш": "sh", "щ": "sh", "ъ": "", "ы": "i", "ь": "", "э": "e", "ю": "yu",
+    "я": "ya", "ў": "o", "қ": "q", "ғ": "g", "ҳ": "h",
+}
+# Tutuq belgisining barcha ko'rinishlari: "o'zbek", "oʻzbek", "o`zbek" va "ozbek" bir xil kalit beradi
+APOSTROPHES = "'`ʻʼ‘’´"
+_TRANSLIT_TABLE = str.maketrans({**CYRILLIC_TO_LATIN, **{ch: "" for ch in APOSTROPHES}})
+
+# So'z boshidagi kirill "е" lotinda "ye" bo'ladi (Ерназар -> Yernazar)
+_WORD_INITIAL_YE = re.compile(r"(?<![^\W\d_])е")
+
+# Raqam va harf bo'laklari: "25-qism" -> ["25", "qism"], "№25" -> ["25"]
+_TOKEN = re.compile(r"\d+|[^\W\d_]+")
+
+# Raqam atrofida kelganda ma'no bermaydigan so'zlar ("25-qism", "№ 25", "seriya 3")
+NUMBER_NOISE_WORDS = frozenset({
+    "n", "no", "nomer", "raqam", "raqami", "son", "soni", "kod", "kodi",
+    "qism", "qismi", "seriya", "seriyasi", "epizod", "chast", "part", "ep",
+    "film", "kino", "multfilm",
+})
+
+def _tokens(text: str) -> List[str]:
+    text = _WORD_INITIAL_YE.sub("ye", text.casefold())
+    return _TOKEN.findall(text.translate(_TRANSLIT_TABLE))
+
+def normalize_trigger(text: str, collapse_numbers: bool = True) -> str:
+    """
+    Trigger qidiruvi uchun yagona kalit.
+    Kichik harf, kirill -> lotin, tutuq belgilari, tinish belgilari va emoji olib tashlanadi.
+    collapse_numbers: yagona raqam faqat "qism", "№" kabi so'zlar bilan kelsa, kalit shu raqamning
+    o'zi bo'ladi: "№ 25", "25-qism" va "025" -> "25". Bu faqat raqamli triggerlar kaliti uchun;
+    matnli trigger ("Kino 2") o'z kalitini saqlaydi va raqamli "2" ni to'sib qo'ymaydi.
+    """
+    tokens = _tokens(text)
+    if collapse_numbers:
+        # isdecimal: "²", "③" kabi belgilar isdigit() da raqam, lekin int() ularni qabul qilmaydi
+        numbers = [token for token in tokens if token.isdecimal()]
+        if len(numbers) == 1 and all(token.isdecimal() or token in NUMBER_NOISE_WORDS for token in tokens):
+            return str(int(numbers[0]))
+    return " ".join(tokens)
+
+def lookup_keys(text: str) -> List[str]:
+    """
+    Foydalanuvchi matni uchun tekshiriladigan kalitlar, ustuvorlik tartibida:
+    avval matnli trigger kaliti ("kino 2"), keyin raqamli trigger kaliti ("2").
+    """
+    text_key = normalize_trigger(text, collapse_numbers=False)
+    numeric_key = normalize_trigger(text)
+    return [key for key in dict.fromkeys((text_key, numeric_key)) if key]
@@ -0,0 +1,92 @@
+import logging
+import os
+import signal
+import socket
+import time
+from typing import Callable, Dict, Optional
+
+# Ishdan chiqqan worker qayta ishga tushirilishidan oldingi pauza (crash loop bo'lmasligi uchun)
+RESPAWN_DELAY = 1.0
+
+def serve_prefork(
+    host: str,
+    port: int,
+    workers: int,
+    run_worker: Callable[[socket.socket, int], None],
+    on_start: Optional[Callable[[], None]] = None,
+    on_stop: Optional[Callable[[], None]] = None,
+):
+    """
+    Supervisor: portni bir marta ochib, N ta worker jarayonini fork qiladi.
+    Barcha worker'lar bitta oldindan ochilgan socket'dan ulanishlarni qabul qiladi,
+    yadro ularni jarayonlar orasida taqsimlaydi.
+
+    run_worker(sock, index) — index 0..workers-1, qayta ishga tushganda ham o'sha raqam
+    (fon vazifalarini faqat bitta worker bajarishi uchun).
+    on_start — fork'dan oldin bir marta (masalan, webhookni o'rnatish),
+    on_stop — barcha worker'lar to'xtagandan keyin bir marta bajariladi.
+    SIGTERM/SIGINT worker'larga uzatiladi va supervisor ularning tugashini kutadi.
+    Kutilmaganda to'xtagan worker qayta ishga tushiriladi.
+    """
+    if not hasattr(os, "fork"):
+        raise RuntimeError("Ko'p jarayonli rejim faqat fork qo'llab-quvvatlanadigan tizimlarda ishlaydi.")
+
+    sock = socket.create_server((host, port), backlog=2048)
+    sock.set_inheritable(True)
+
+    if on_start is not None:
+        on_start()
+
+    children: Dict[int, int] = {}
+    stopping = False
+
+    def spawn(index: int):
+        pid = os.fork()
+        if pid == 0:
+            # Worker: supervisor signal handlerlari meros bo'lib qolmasin
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                run_worker(sock, index)
+            except BaseException:
+                logging.exception(f"Worker #{index} xato bilan to'xtadi")
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = index
+        logging.info(f"Worker #{index} ishga tushdi (pid={pid})")
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for index in range(workers):
+        spawn(index)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = children.pop(pid, None)
+        if index is None:
+            continue
+        if not stopping:
+            logging.warning(f"Worker #{index} kutilmaganda to'xtadi (status={status}), qayta ishga tushiriladi")
+            time.sleep(RESPAWN_DELAY)
+            if not stopping:
+                spawn(index)
+
+    sock.close()
+    logging.info("Barcha worker'lar to'xtadi")
+    if on_stop is not None:
+        on_stop()
\ No newline at end of file
@@ -0,0 +1,277 @@
+import asyncio
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Set
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+
+from config import CONFIG
+from utils.metrics import SEND_QUEUE_WAIT, TELEGRAM_LATENCY
+
+# Navbatdagi ustuvorliklar: kichik qiymat — oldinroq yuboriladi
+PRIORITY_ADMIN = 0
+PRIORITY_USER = 1
+PRIORITY_BULK = 2
+
+# Joriy kontekst uchun ustuvorlik (masalan, ommaviy yuborishda PRIORITY_BULK)
+send_priority: ContextVar[Optional[int]] = ContextVar("send_priority", default=None)
+
+@contextmanager
+def priority(value: int):
+    """Blok ichidagi barcha so'rovlar shu ustuvorlik bilan navbatga qo'yiladi."""
+    token = send_priority.set(value)
+    try:
+        yield
+    finally:
+        send_priority.reset(token)
+
+class TokenBucket:
+    """
+    Token bucket: rate — soniyasiga token, capacity — maksimal portlash (burst).
+    Tokenlar manfiy bo'lishi mumkin: bu keyingi so'rov qancha kutishi kerakligini bildiradi.
+    """
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Token olmasdan, keyingi token uchun kutish vaqtini hisoblash."""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def reserve(self, now: float) -> float:
+        """Token band qilish va unga qadar kutish kerak bo'lgan vaqtni qaytarish."""
+        self._refill(now)
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def penalize(self, seconds: float):
+        """Telegram retry_after qaytarganda bucket'ni shu vaqtga to'xtatish."""
+        self.tokens = min(self.tokens, 0) - seconds * self.rate
+
+class _Job:
+    __slots__ = ("priority", "seq", "enqueued_at", "chat_id", "make_request", "bot", "method", "future", "attempts")
+
+    def __init__(self, priority, seq, chat_id, make_request, bot, method, future):
+        self.priority = priority
+        self.seq = seq
+        self.enqueued_at = time.monotonic()
+        self.chat_id = chat_id
+        self.make_request = make_request
+        self.bot = bot
+        self.method = method
+        self.future = future
+        self.attempts = 0
+
+    def __lt__(self, other: "_Job") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+class SendQueue(BaseRequestMiddleware):
+    """
+    Bot API ga chiquvchi xabarlar navbati (session middleware).
+    chat_id bo'lgan har bir so'rov global va chat bo'yicha token bucket'lardan o'tadi,
+    adminlarga javoblar foydalanuvchilarnikidan oldin yuboriladi,
+    429 (retry_after) bo'lsa butun chat muddat tugaguncha to'xtatiladi va xabarlar asl tartibida qayta yuboriladi.
+    Chaqiruvchi natijani kutadi, shuning uchun xatolar handlerga avvalgidek qaytadi.
+    """
+
+    # Xotirada saqlanadigan chat bucket'lari soni
+    MAX_CHAT_BUCKETS = 50_000
+
+    def __init__(
+        self,
+        global_rate: float,
+        chat_rate: float,
+        chat_burst: float,
+        workers: int,
+        max_retries: int,
+        admin_ids: List[int],
+    ):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.workers = workers
+        self.max_retries = max_retries
+        self.admin_ids = set(admin_ids)
+        self._chat_buckets: "OrderedDict[Any, TokenBucket]" = OrderedDict()
+        self._queue: "asyncio.PriorityQueue[_Job]" = asyncio.PriorityQueue()
+        self._seq = itertools.count()
+        self._tasks: Set[asyncio.Task] = set()
+        # Natijasi hali qaytmagan barcha xabarlar (navbatda yoki kechiktirilgan)
+        self._jobs: Set[_Job] = set()
+        # To'xtatilgan chatlar: chat_id -> muddat tugashini kutayotgan xabarlar
+        self._held: Dict[Any, List[_Job]] = {}
+        self._running = False
+        # Metrikalar
+        self.sent = 0
+        self.retried = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    @property
+    def depth(self) -> int:
+        """Yuborilishini kutayotgan xabarlar soni (kechiktirilganlar ham)."""
+        return len(self._jobs)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "depth": self.depth,
+            "sent": self.sent,
+            "retried": self.retried,
+            "wait_avg": self.wait_total / self.sent if self.sent else 0.0,
+            "wait_max": self.wait_max,
+        }
+
+    def start(self):
+        self._running = True
+        for _ in range(self.workers):
+            task = asyncio.create_task(self._worker())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def stop(self, timeout: float = 5.0):
+        """Navbatdagi xabarlarni timeout gacha yuborib, worker'larni to'xtatish."""
+        self._running = False
+        deadline = time.monotonic() + timeout
+        while self._jobs and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self._jobs:
+            logging.warning(f"Yuborish navbatida {len(self._jobs)} ta xabar qoldi")
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for job in list(self._jobs):
+            if not job.future.done():
+                job.future.set_exception(RuntimeError("Yuborish navbati to'xtatildi"))
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        chat_id = getattr(method, "chat_id", None)
+        # chat_id siz so'rovlar (answerCallbackQuery, getFile, setWebhook...) limitga kirmaydi
+        if chat_id is None or not self._running:
+            with TELEGRAM_LATENCY.time(method=type(method).__name__):
+                return await make_request(bot, method)
+
+        job_priority = send_priority.get()
+        if job_priority is None:
+            job_priority = PRIORITY_ADMIN if chat_id in self.admin_ids else PRIORITY_USER
+        future = asyncio.get_running_loop().create_future()
+        job = _Job(job_priority, next(self._seq), chat_id, make_request, bot, method, future)
+        self._jobs.add(job)
+        future.add_done_callback(lambda _: self._jobs.discard(job))
+        self._queue.put_nowait(job)
+        return await future
+
+    def _chat_bucket(self, chat_id: Any) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            self._chat_buckets[chat_id] = bucket
+            if len(self._chat_buckets) > self.MAX_CHAT_BUCKETS:
+                self._chat_buckets.popitem(last=False)
+        else:
+            self._chat_buckets.move_to_end(chat_id)
+        return bucket
+
+    def _hold(self, job: _Job, delay: float):
+        """
+        Chatni worker'ni band qilmasdan delay soniyaga to'xtatish. Shu chatning keyingi xabarlari ham
+        shu ro'yxatga tushadi va muddat tugagach birga, asl tartibida navbatga qaytadi —
+        javoblar foydalanuvchiga aralashib bormaydi. Chat allaqachon to'xtatilgan bo'lsa, delay e'tiborsiz.
+        """
+        held = self._held.get(job.chat_id)
+        if held is None:
+            held = self._held[job.chat_id] = []
+            asyncio.get_running_loop().call_later(delay, self._release, job.chat_id)
+        held.append(job)
+
+    def _release(self, chat_id: Any):
+        # Bucket hali bo'sh bo'lsa, birinchi xabar chatni yana to'xtatadi, qolganlari unga qo'shiladi
+        for job in sorted(self._held.pop(chat_id, ())):
+            self._queue.put_nowait(job)
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.future.cancelled():
+                    continue
+                held = self._held.get(job.chat_id)
+                if held is not None:
+                    # Chat to'xtatilgan: oldingi xabarlardan o'zib ketmasligi uchun navbatda kutadi
+                    held.append(job)
+                    continue
+                now = time.monotonic()
+                bucket = self._chat_bucket(job.chat_id)
+                chat_delay = bucket.delay(now)
+                if chat_delay > 0:
+                    self._hold(job, chat_delay)
+                    continue
+                bucket.reserve(now)
+                global_delay = self.global_bucket.reserve(now)
+                if global_delay > 0:
+                    await asyncio.sleep(global_delay)
+                await self._send(job, bucket)
+            finally:
+                self._queue.task_done()
+
+    async def _send(self, job: _Job, bucket: TokenBucket):
+        waited = time.monotonic() - job.enqueued_at
+        try:
+            # Metod nomi kontent turini ham bildiradi: SendPhoto, SendVideo, SendMessage...
+            with TELEGRAM_LATENCY.time(method=type(job.method).__name__):
+                result = await job.make_request(job.bot, job.method)
+        except TelegramRetryAfter as e:
+            job.attempts += 1
+            if job.attempts > self.max_retries:
+                if not job.future.done():
+                    job.future.set_exception(e)
+                return
+            self.retried += 1
+            bucket.penalize(e.retry_after)
+            # Shu paytda yuborilayotgan (allaqachon worker'dagi) xabarlarni qaytarib bo'lmaydi,
+            # navbatdagilari esa shu xabardan keyin yuboriladi
+            self._hold(job, e.retry_after)
+            return
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+            return
+
+        self.sent += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+        SEND_QUEUE_WAIT.observe(waited)
+        if not job.future.done():
+            job.future.set_result(result)
+
+def create_send_queue() -> SendQueue:
+    """CONFIG bo'yicha yuborish navbati (Bot sessiyasiga middleware sifatida ulanadi)."""
+    return SendQueue(
+        global_rate=CONFIG.SEND_GLOBAL_RATE,
+        chat_rate=CONFIG.SEND_CHAT_RATE,
+        chat_burst=CONFIG.SEND_CHAT_BURST,
+        workers=CONFIG.SEND_WORKERS,
+        max_retries=CONFIG.SEND_MAX_RETRIES,
+        admin_ids=CONFIG.ADMIN_IDS,
+    )
\ No newline at end of file
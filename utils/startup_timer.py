@@ -0,0 +1,36 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+from utils.metrics import STARTUP_DURATION
+
+class StartupTimer:
+    """
+    Ishga tushish bosqichlari vaqti: importlar, sozlamalar, servislar va on_startup qadamlari.
+    Natija logga bitta qator bo'lib yoziladi va bot_startup_phase_seconds gauge'ida ko'rinadi.
+    """
+
+    def __init__(self, started: Optional[float] = None):
+        self.started = time.perf_counter() if started is None else started
+        self.phases: List[Tuple[str, float]] = []
+
+    def add(self, name: str, seconds: float):
+        self.phases.append((name, seconds))
+        STARTUP_DURATION.set(seconds, phase=name)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def report(self) -> str:
+        total = time.perf_counter() - self.started
+        STARTUP_DURATION.set(total, phase="total")
+        parts = ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in self.phases)
+        line = f"⏱ Ishga tushish: {total * 1000:.0f}ms ({parts})"
+        logging.info(line)
+        return line
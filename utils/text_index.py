@@ -0,0 +1,216 @@
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from utils.normalize import normalize_trigger
+
+# Trigram (3 belgili bo'lak) indeksi
+GRAM_SIZE = 3
+# Bitta xato (qo'shni harflar almashinuvi bilan) ko'pi bilan shuncha trigramni buzadi
+GRAMS_PER_EDIT = GRAM_SIZE + 1
+# Bitta qidiruvda edit distance bilan tekshiriladigan nomzodlar chegarasi
+MAX_VERIFY = 200
+# Yagona prefiks moslik avtomatik javob bo'lishi uchun minimal uzunlik
+MIN_PREFIX_MATCH = 3
+
+def max_distance(length: int) -> int:
+    """Kalit uzunligiga qarab ruxsat etilgan xatolar soni (qisqa so'zlarda xato ko'p moslik beradi)."""
+    if length < 4:
+        return 0
+    if length < 8:
+        return 1
+    return 2
+
+def _grams(text: str) -> Set[str]:
+    padded = "\x00\x00" + text + "\x00\x00"
+    return {padded[i:i + GRAM_SIZE] for i in range(len(padded) - GRAM_SIZE + 1)}
+
+def bounded_distance(a: str, b: str, limit: int) -> int:
+    """
+    Damerau-Levenshtein (OSA) masofasi: qo'shni harflar almashinuvi ham bitta xato.
+    limit dan oshgan zahoti to'xtaydi va limit + 1 qaytaradi.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        row_min = i
+        for j, cb in enumerate(b, 1):
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                value = min(value, before[j - 2] + 1)
+            current.append(value)
+            if value < row_min:
+                row_min = value
+        if row_min > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+class MatchResult(NamedTuple):
+    """best — ishonchli topilgan trigger, suggestions — foydalanuvchiga taklif qilinadigan triggerlar."""
+    best: Optional[str]
+    suggestions: List[str]
+
+class TextMatcher:
+    """
+    Matnli triggerlar uchun xotiradagi qidiruv indeksi.
+    Saralangan kalitlar ro'yxati prefiks qidiruvni, trigram indeksi esa
+    xatoli yozilgan so'zlar uchun nomzodlarni beradi (keyin edit distance bilan tekshiriladi).
+    """
+
+    def __init__(self):
+        # hujjat _id -> (asl trigger, normallashtirilgan kalit)
+        self._docs: Dict[Any, Tuple[str, str]] = {}
+        # normallashtirilgan kalit -> {hujjat _id: asl trigger}
+        self._keys: Dict[str, Dict[Any, str]] = {}
+        self._sorted: List[str] = []
+        self._postings: Dict[str, Set[str]] = {}
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def replace_all(self, documents: Iterable[Dict[str, Any]]):
+        """Indeksni hujjatlar ro'yxatidan qaytadan qurish."""
+        self._docs = {}
+        self._keys = {}
+        self._postings = {}
+        for document in documents:
+            self._add(document["_id"], document["trigger"])
+        self._sorted = sorted(self._keys)
+        self.loaded = True
+
+    def add(self, doc_id: Any, trigger: str):
+        """Triggerni qo'shish yoki (o'zgargan bo'lsa) yangilash."""
+        current = self._docs.get(doc_id)
+        if current is not None and current[0] == trigger:
+            return
+        self.remove(doc_id)
+        if self._add(doc_id, trigger):
+            insort(self._sorted, self._docs[doc_id][1])
+
+    def remove(self, doc_id: Any):
+        current = self._docs.pop(doc_id, None)
+        if current is None:
+            return
+        key = current[1]
+        owners = self._keys.get(key)
+        if owners is None:
+            return
+        owners.pop(doc_id, None)
+        if owners:
+            return
+        del self._keys[key]
+        position = bisect_left(self._sorted, key)
+        if position < len(self._sorted) and self._sorted[position] == key:
+            del self._sorted[position]
+        for gram in _grams(key):
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(key)
+                if not posting:
+                    del self._postings[gram]
+
+    def match(self, text: str, limit: int = 5) -> MatchResult:
+        """
+        Aniq moslik topilmagan matn uchun eng yaqin trigger(lar)ni qidirish.
+        Bitta aniq eng yaqin nomzod bo'lsa best to'ldiriladi, aks holda faqat takliflar.
+        """
+        query = normalize_trigger(text, collapse_numbers=False)
+        if not query:
+            return MatchResult(None, [])
+        owners = self._keys.get(query)
+        if owners:
+            return MatchResult(next(iter(owners.values())), [])
+
+        prefixed = self._prefix(query, limit + 1)
+        fuzzy = self._fuzzy(query)
+
+        best = None
+        if fuzzy and (len(fuzzy) == 1 or fuzzy[0][0] < fuzzy[1][0]):
+            best = fuzzy[0][1]
+        elif not fuzzy and len(prefixed) == 1 and len(query) >= MIN_PREFIX_MATCH:
+            best = prefixed[0]
+        if best is not None:
+            return MatchResult(self._original(best), [])
+
+        suggestions: List[str] = []
+        for key in [key for _, key in fuzzy] + prefixed:
+            original = self._original(key)
+            if original not in suggestions:
+                suggestions.append(original)
+            if len(suggestions) >= limit:
+                break
+        return MatchResult(None, suggestions)
+
+    def _add(self, doc_id: Any, trigger: str) -> bool:
+        """Yangi kalit paydo bo'lsa True (saralangan ro'yxatga qo'shish kerak)."""
+        # Matnli triggerlar kaliti raqamni yig'maydi ("Kino 2" -> "kino 2"), bazadagi kalit bilan bir xil
+        key = normalize_trigger(trigger, collapse_numbers=False)
+        if not key:
+            return False
+        self._docs[doc_id] = (trigger, key)
+        owners = self._keys.get(key)
+        if owners is not None:
+            owners[doc_id] = trigger
+            return False
+        self._keys[key] = {doc_id: trigger}
+        for gram in _grams(key):
+            self._postings.setdefault(gram, set()).add(key)
+        return True
+
+    def _original(self, key: str) -> str:
+        return next(iter(self._keys[key].values()))
+
+    def _prefix(self, query: str, limit: int) -> List[str]:
+        result = []
+        position = bisect_left(self._sorted, query)
+        while position < len(self._sorted) and len(result) < limit:
+            key = self._sorted[position]
+            if not key.startswith(query):
+                break
+            result.append(key)
+            position += 1
+        return result
+
+    def _fuzzy(self, query: str) -> List[Tuple[int, str]]:
+        """Ruxsat etilgan masofadagi kalitlar, (masofa, kalit) bo'yicha saralangan."""
+        limit = max_distance(len(query))
+        if limit == 0:
+            return []
+        grams = sorted(_grams(query), key=lambda gram: len(self._postings.get(gram, ())))
+        # q-gram filtri: k ta tahrirdan keyin kamida shuncha umumiy trigram qoladi
+        need = len(grams) - GRAMS_PER_EDIT * limit
+        if need <= 0:
+            return []
+
+        # Eng kam uchraydigan trigramlardan nomzodlar; qolganlari faqat sanash uchun
+        seeds = len(grams) - need + 1
+        counts: Dict[str, int] = {}
+        for gram in grams[:seeds]:
+            for key in self._postings.get(gram, ()):
+                counts[key] = counts.get(key, 0) + 1
+        if not counts:
+            return []
+        for gram in grams[seeds:]:
+            posting = self._postings.get(gram)
+            if not posting:
+                continue
+            for key in counts:
+                if key in posting:
+                    counts[key] += 1
+
+        candidates = [
+            key for key, count in counts.items()
+            if count >= need and abs(len(key) - len(query)) <= limit
+        ]
+        candidates.sort(key=lambda key: -counts[key])
+        result = []
+        for key in candidates[:MAX_VERIFY]:
+            distance = bounded_distance(query, key, limit)
+            if distance <= limit:
+                result.append((distance, key))
+        result.sort()
+        return result
@@ -0,0 +1,227 @@
+import asyncio
+import csv
+import gzip
+import html
+import io
+import json
+import os
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from db.models import Trigger, TriggerType
+from db.mongo import MongoService
+from utils.category_calc import get_category_name
+
+# Bir bulk_write da yoziladigan hujjatlar soni
+IMPORT_BATCH_SIZE = 1000
+# Hisobotda ko'rsatiladigan xatolar soni (qolganlari faqat sanaladi)
+MAX_REPORTED_ERRORS = 20
+
+SUPPORTED_EXTENSIONS = (".csv", ".jsonl", ".json", ".csv.gz", ".jsonl.gz", ".json.gz")
+
+# Eksport formatlari
+FORMAT_JSONL = "jsonl"
+FORMAT_CSV = "csv"
+# Eksportda kursor bir marta olib keladigan hujjatlar soni
+EXPORT_BATCH_SIZE = 1000
+# CSV ustunlari Trigger modelidagi tartibda
+# Trigger dan hisoblanadigan maydonlar zaxira nusxaga yozilmaydi (import paytida qayta hisoblanadi)
+DERIVED_FIELDS = {"normalized", "schema_version"}
+EXPORT_FIELDS = [field for field in Trigger.model_fields if field not in DERIVED_FIELDS]
+
+class ImportReport:
+    """Import natijalari: sonlar va qator raqami bilan xatolar."""
+
+    def __init__(self):
+        self.rows = 0
+        self.inserted = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors: List[Tuple[int, str]] = []
+
+    def add_error(self, row: int, message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((row, message))
+
+    def summary(self) -> str:
+        lines = [
+            "<b>Import yakunlandi</b>\n",
+            f"📄 Qatorlar: {self.rows}",
+            f"➕ Qo'shildi: {self.inserted}",
+            f"♻️ Yangilandi: {self.updated}",
+            f"❌ Xato: {self.failed}",
+        ]
+        if self.errors:
+            lines.append("\n<b>Xatolar:</b>")
+            lines.extend(f"{row}-qator: {html.escape(message[:100])}" for row, message in self.errors)
+            if self.failed > len(self.errors):
+                lines.append(f"... va yana {self.failed - len(self.errors)} ta")
+        return "\n".join(lines)
+
+def is_supported_file(filename: str) -> bool:
+    return filename.lower().endswith(SUPPORTED_EXTENSIONS)
+
+def open_text(path: str, filename: str) -> io.TextIOBase:
+    """Faylni matn rejimida ochish (.gz bo'lsa, oqim sifatida ochiladi)."""
+    if filename.lower().endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8-sig", newline="")
+    return open(path, "r", encoding="utf-8-sig", newline="")
+
+def iter_rows(stream: io.TextIOBase, filename: str) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    Faylni qatorma-qator o'qish: (qator raqami, ma'lumot, xato) qaytaradi.
+    Butun fayl hech qachon xotiraga yuklanmaydi.
+    """
+    name = filename.lower().removesuffix(".gz")
+    if name.endswith(".csv"):
+        reader = csv.DictReader(stream)
+        for row in reader:
+            # CSV da bo'sh katakcha — qiymat yo'q degani
+            yield reader.line_num, {k: v for k, v in row.items() if k and v not in ("", None)}, None
+        return
+
+    for number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield number, None, f"JSON xato: {e.msg}"
+            continue
+        if not isinstance(data, dict):
+            yield number, None, "JSON obyekt kutilgan edi"
+            continue
+        yield number, data, None
+
+def build_trigger(data: Dict[str, Any]) -> Trigger:
+    """Qatorni Trigger modeliga aylantirish va bo'limni qayta hisoblash."""
+    data.pop("_id", None)
+    trigger = Trigger.model_validate(data)
+    trigger.trigger = trigger.trigger.strip()
+    if trigger.trigger_type == TriggerType.NUMERIC:
+        if not trigger.trigger.isdecimal():
+            raise ValueError("raqamli trigger butun son bo'lishi kerak")
+        trigger.category = get_category_name(int(trigger.trigger))
+    else:
+        trigger.category = None
+    return trigger
+
+def read_batch(
+    rows: Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]],
+    report: ImportReport,
+    batch_size: int,
+) -> Tuple[List[Trigger], List[int]]:
+    """
+    iter_rows dan keyingi batch_size ta yaroqli triggerni o'qish (qator raqamlari bilan).
+    Dekodlash va validatsiya sinxron: import_triggers buni asyncio.to_thread da chaqiradi.
+    """
+    batch: List[Trigger] = []
+    batch_rows: List[int] = []
+    for row_number, data, error in rows:
+        report.rows += 1
+        if error is not None:
+            report.add_error(row_number, error)
+            continue
+        try:
+            trigger = build_trigger(data)
+        except ValidationError as e:
+            first = e.errors()[0]
+            field = ".".join(str(part) for part in first.get("loc", ()))
+            report.add_error(row_number, f"{field}: {first.get('msg')}")
+            continue
+        except ValueError as e:
+            report.add_error(row_number, str(e))
+            continue
+
+        batch.append(trigger)
+        batch_rows.append(row_number)
+        if len(batch) >= batch_size:
+            break
+    return batch, batch_rows
+
+async def import_triggers(
+    db: MongoService,
+    path: str,
+    filename: str,
+    progress: Optional[Callable[[ImportReport], Awaitable[None]]] = None,
+    batch_size: int = IMPORT_BATCH_SIZE,
+) -> ImportReport:
+    """
+    CSV/JSONL faylni oqim sifatida o'qib, triggerlarni partiyalab yozish.
+    Kaliti ('normalized') bazadagi yoki fayldagi boshqa trigger bilan bir xil qatorlar yozilmaydi,
+    hisobotda xato sifatida ko'rsatiladi.
+    progress — har bir partiyadan keyin chaqiriladi.
+    Fayl o'qish va validatsiya alohida oqimda: katta import paytida ham event loop webhook'larni qabul qiladi.
+    """
+    report = ImportReport()
+    try:
+        with open_text(path, filename) as stream:
+            rows = iter_rows(stream, filename)
+            while True:
+                batch, batch_rows = await asyncio.to_thread(read_batch, rows, report, batch_size)
+                if not batch:
+                    break
+                inserted, updated, errors = await db.bulk_upsert_triggers(batch)
+                report.inserted += inserted
+                report.updated += updated
+                for index, message in errors.items():
+                    report.add_error(batch_rows[index], message)
+                if progress is not None:
+                    await progress(report)
+    finally:
+        # Xato bilan to'xtasa ham yozilgan partiyalar kesh, indeks va hisoblagichlarda ko'rinsin
+        await db.refresh_after_bulk_change()
+    return report
+
+class ProgressThrottle:
+    """Telegram xabarini tez-tez tahrirlamaslik uchun (flood limit)."""
+
+    def __init__(self, interval: float = 2.0):
+        self.interval = interval
+        self._last = 0.0
+
+    def ready(self) -> bool:
+        now = time.monotonic()
+        if now - self._last < self.interval:
+            return False
+        self._last = now
+        return True
+
+async def export_triggers(db: MongoService, fmt: str = FORMAT_JSONL) -> Tuple[str, int]:
+    """
+    Kolleksiyani gzip bilan siqilgan JSONL/CSV vaqtinchalik faylga oqim sifatida yozish.
+    Har bir hujjat Trigger orqali o'tkaziladi, shuning uchun fayl importga qaytadan yaroqli.
+    (fayl yo'li, yozilgan triggerlar soni) qaytaradi; faylni chaqiruvchi o'chiradi.
+    """
+    fd, path = tempfile.mkstemp(suffix=f".{fmt}.gz")
+    os.close(fd)
+    count = 0
+    projection = {field: 1 for field in EXPORT_FIELDS}
+    projection["_id"] = 0
+    try:
+        with gzip.open(path, "wt", encoding="utf-8", newline="") as stream:
+            writer = None
+            if fmt == FORMAT_CSV:
+                writer = csv.DictWriter(stream, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+                writer.writeheader()
+            async for document in db.iter_triggers(projection=projection, batch_size=EXPORT_BATCH_SIZE):
+                try:
+                    row = Trigger.model_validate(document).model_dump(mode="json", exclude_none=True, exclude=DERIVED_FIELDS)
+                except ValidationError:
+                    # Buzilgan hujjatlar zaxira nusxaga tushmaydi
+                    continue
+                if writer is not None:
+                    writer.writerow(row)
+                else:
+                    stream.write(json.dumps(row, ensure_ascii=False))
+                    stream.write("\n")
+                count += 1
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, count
\ No newline at end of file
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+
+from utils.metrics import UPDATE_QUEUE_DEPTH, UPDATE_QUEUE_LAG, UPDATES_DROPPED
+
+# Navbat to'lganda: 'reject' — 503 qaytarib Telegram'ga keyinroq qayta yuborishni aytish,
+# 'shed' — 200 qaytarib update ni tashlab yuborish
+OVERLOAD_REJECT = "reject"
+OVERLOAD_SHED = "shed"
+
+def extract_chat_id(update: Dict[str, Any]) -> Optional[int]:
+    """Xom update dan chat (yoki foydalanuvchi) id sini pydantic validatsiyasisiz olish."""
+    for key, value in update.items():
+        if key == "update_id" or not isinstance(value, dict):
+            continue
+        chat = value.get("chat") or (value.get("message") or {}).get("chat")
+        if chat:
+            return chat.get("id")
+        user = value.get("from")
+        if user:
+            return user.get("id")
+    return None
+
+class UpdatePool:
+    """
+    Webhook update larini darhol tasdiqlab, cheklangan navbat orqali fonda qayta ishlash.
+    Har bir worker o'z navbatiga ega va bitta chat doim bitta navbatga tushadi,
+    shuning uchun bir chatning update lari kelgan tartibda bajariladi.
+    """
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, workers: int, queue_size: int, overload: str):
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.workers = workers
+        self.overload = overload
+        shard_size = max(1, queue_size // workers)
+        self._queues: List["asyncio.Queue[Tuple[float, Dict[str, Any]]]"] = [
+            asyncio.Queue(maxsize=shard_size) for _ in range(workers)
+        ]
+        self._tasks: Set[asyncio.Task] = set()
+        self._accepting = False
+
+    @property
+    def depth(self) -> int:
+        return sum(queue.qsize() for queue in self._queues)
+
+    def start(self):
+        self._accepting = True
+        for queue in self._queues:
+            task = asyncio.create_task(self._worker(queue))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def stop(self, timeout: float = 10.0):
+        """Yangi update qabul qilishni to'xtatib, navbatdagilarni timeout gacha bajarish."""
+        self._accepting = False
+        try:
+            await asyncio.wait_for(asyncio.gather(*(queue.join() for queue in self._queues)), timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"Update navbatida {self.depth} ta update qoldi")
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        """aiohttp webhook handler: update ni navbatga qo'yib, darhol javob qaytaradi."""
+        if not self._accepting:
+            UPDATES_DROPPED.inc(reason="stopping")
+            return web.Response(status=503)
+        try:
+            update = await request.json()
+        except ValueError:
+            return web.Response(status=400)
+        # Update faqat JSON obyekt bo'ladi (ro'yxat yoki son — noto'g'ri so'rov, qayta yuborilmasin)
+        if not isinstance(update, dict):
+            return web.Response(status=400)
+
+        key = extract_chat_id(update)
+        if key is None:
+            key = update.get("update_id", 0)
+        queue = self._queues[hash(key) % self.workers]
+        try:
+            queue.put_nowait((time.monotonic(), update))
+        except asyncio.QueueFull:
+            UPDATES_DROPPED.inc(reason=self.overload)
+            if self.overload == OVERLOAD_SHED:
+                return web.Response(status=200)
+            return web.Response(status=503)
+        return web.Response(status=200)
+
+    async def _worker(self, queue: "asyncio.Queue[Tuple[float, Dict[str, Any]]]"):
+        while True:
+            enqueued_at, update = await queue.get()
+            UPDATE_QUEUE_LAG.observe(time.monotonic() - enqueued_at)
+            try:
+                await self.dispatcher.feed_raw_update(self.bot, update)
+            except Exception as e:
+                logging.error(f"Update ni qayta ishlashda xato: {e}")
+            finally:
+                queue.task_done()
+
+    def collect_metrics(self):
+        UPDATE_QUEUE_DEPTH.set(self.depth)
\ No newline at end of file